@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.benchmark_service import run_benchmarks, compare
+
+
+class Command(BaseCommand):
+    help = (
+        "Times query_properties (per filter shape and fallback tier, on SQLite and, with NumPy installed, "
+        "the columnar engine), get_property_stats and calculate_results_stats against the listings database, "
+        "optionally writing JSON for comparing runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark.")
+        parser.add_argument('--warmup', type=int, default=1, help="Untimed runs per benchmark before timing.")
+        parser.add_argument('--only', help="Only run benchmarks whose name contains this text (e.g. 'search.tier').")
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+        parser.add_argument('--label', help="Free-form label stored in the JSON (e.g. a branch or dataset size).")
+        parser.add_argument('--compare', help="A previous --output file to compare medians against.")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be positive.")
+        try:
+            report = run_benchmarks(repeat=options['repeat'], warmup=options['warmup'], only=options['only'], log=self.stdout.write)
+        except (ValueError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+        report['meta']['label'] = options['label']
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(report['benchmarks'])} benchmark(s) to {options['output']}."))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            self.stdout.write(f"\nMedian vs {options['compare']} ({baseline['meta'].get('label') or baseline['meta'].get('startedAt')}):")
+            for name, before, after, ratio in compare(baseline, report):
+                change = f"{ratio:.2f}x" if ratio is not None else "n/a"
+                self.stdout.write(f"{name:<36} {before:>9.2f} -> {after:>9.2f} ms   {change}")
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from api.services.fake_openai_service import FakeOpenAI, make_server
+
+
+class Command(BaseCommand):
+    help = (
+        "Serves a local OpenAI-compatible stand-in (chat completions, streaming and JSON mode) for load tests. "
+        "Run the app with OPENAI_API_KEY=fake OPENAI_BASE_URL=http://HOST:PORT/v1 to use it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.4, help="Seconds before the first byte of every call.")
+        parser.add_argument('--jitter', type=float, default=0.1, help="Uniform +/- seconds added to --latency.")
+        parser.add_argument('--tokens-per-second', type=float, default=60.0, help="Completion token rate (0 for no delay).")
+        parser.add_argument('--narrative-tokens', type=int, default=120, help="Tokens in each narrative completion.")
+        parser.add_argument('--chunk-tokens', type=int, default=1, help="Tokens per streamed SSE chunk.")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Share of calls answered with a 429 (0-1).")
+        parser.add_argument('--seed', type=int, help="Seed for jitter and errors.")
+        parser.add_argument('--verbose', action='store_true', help="Log every request.")
+
+    def handle(self, *args, **options):
+        fake = FakeOpenAI(
+            latency=options['latency'],
+            jitter=options['jitter'],
+            tokens_per_second=options['tokens_per_second'],
+            narrative_tokens=options['narrative_tokens'],
+            chunk_tokens=options['chunk_tokens'],
+            error_rate=options['error_rate'],
+            seed=options['seed'],
+        )
+        server = make_server(fake, options['host'], options['port'], verbose=options['verbose'])
+        self.stdout.write(self.style.SUCCESS(
+            f"OpenAI stand-in on http://{options['host']}:{options['port']}/v1 "
+            f"(latency {fake.latency}s +/- {fake.jitter}s, {fake.tokens_per_second} tok/s). Ctrl-C to stop."
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served {fake.calls}.")
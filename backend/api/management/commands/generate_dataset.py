@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.dataset_service import build_dataset
+from api.services.db_service import DB_PATH, close_db_connections
+from api.services.schema_service import apply_migrations
+from api.services.stats_service import refresh_market_stats
+from api.services.trend_service import refresh_market_trends
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds a synthetic listings database (houser.db, or HOUSER_DB_PATH) from the seed dumps "
+        "with N generated properties, then applies the SQL migrations and refreshes market stats and price trends."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help="Number of properties to generate (e.g. 10000, 1000000, 5000000).")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed; the same seed and row count give the same dataset.")
+        parser.add_argument('--batch-size', type=int, default=50000, help="Rows per insert transaction.")
+        parser.add_argument('--force', action='store_true', help="Replace an existing database file.")
+
+    def handle(self, *args, **options):
+        if DB_PATH.exists() and not options['force']:
+            raise CommandError(f"{DB_PATH} already exists; pass --force to replace it (or point HOUSER_DB_PATH elsewhere).")
+        if options['rows'] < 1:
+            raise CommandError("--rows must be positive.")
+
+        started = time.perf_counter()
+        close_db_connections()
+        build_dataset(DB_PATH, options['rows'], seed=options['seed'], batch_size=options['batch_size'], log=self.stdout.write)
+        loaded = time.perf_counter()
+
+        # Search columns, FTS and indexes are built once over the loaded table
+        apply_migrations(log=self.stdout.write)
+        migrated = time.perf_counter()
+        refresh_market_stats(full=True, log=self.stdout.write)
+        refreshed = time.perf_counter()
+        refresh_market_trends(log=self.stdout.write)
+        done = time.perf_counter()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Dataset ready at {DB_PATH}: load {loaded - started:.1f}s, migrations {migrated - loaded:.1f}s, "
+            f"market stats {refreshed - migrated:.1f}s, trends {done - refreshed:.1f}s."
+        ))
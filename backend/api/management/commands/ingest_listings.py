@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.ingest_service import ingest_feeds, MAX_DEACTIVATE_RATIO
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads listing feeds (CSV, JSON array or JSON Lines, optionally .gz) into the listings database, "
+        "upserting by source_url, then refreshes market stats."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="Feed files, e.g. bayut-2025-11-12.jsonl.gz")
+        parser.add_argument('--format', choices=['csv', 'json', 'jsonl'], help="Feed format (default: from the file extension).")
+        parser.add_argument('--source', help="Source for records without one (bayut, propertyfinder, propsearch).")
+        parser.add_argument('--full', action='store_true', help="Complete inventory load: defer index builds to the end and deactivate missing listings.")
+        parser.add_argument('--mark-missing', action='store_true', help="Deactivate active listings of the feed's sources that are not in the feed.")
+        parser.add_argument('--max-deactivate-ratio', type=float, default=MAX_DEACTIVATE_RATIO,
+                            help="Skip deactivation for a source that would lose more than this share of its active listings.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Records per executemany batch.")
+        parser.add_argument('--commit-every', type=int, default=50000, help="Records per transaction.")
+        parser.add_argument('--no-stats', action='store_true', help="Skip the market stats and price trend refresh.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['commit_every'] < 1:
+            raise CommandError("--batch-size and --commit-every must be positive.")
+        try:
+            summary = ingest_feeds(
+                options['paths'],
+                fmt=options['format'],
+                default_source=options['source'],
+                full=options['full'],
+                mark_missing=options['mark_missing'],
+                batch_size=options['batch_size'],
+                commit_every=options['commit_every'],
+                max_deactivate_ratio=options['max_deactivate_ratio'],
+                refresh_stats=not options['no_stats'],
+                log=self.stdout.write,
+            )
+        except (OSError, ValueError, RuntimeError) as e:
+            raise CommandError(str(e))
+
+        unresolved = ', '.join(f"{count:,} {kind}" for kind, count in summary['unresolved'].items() if count)
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested {summary['read']:,} record(s) in {summary['seconds']}s: {summary['inserted']:,} new, "
+            f"{summary['updated']:,} changed, {summary['unchanged']:,} unchanged, {summary['deactivated']:,} deactivated, "
+            f"{summary['skipped']:,} skipped (no source_url)."
+        ))
+        if unresolved:
+            self.stdout.write(f"Unresolved names (stored without an id): {unresolved}.")
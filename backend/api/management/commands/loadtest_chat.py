@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.loadtest_service import DEFAULT_MESSAGES, run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives concurrent /api/chat SSE streams against a running server and reports time to first event, "
+        "time to first narrative token, full-stream latency and errors per concurrency level. "
+        "Pair with `manage.py fake_openai` to test without the real OpenAI API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Base URL of the Houser backend.")
+        parser.add_argument('--concurrency', default='1,4,16,64', help="Comma-separated concurrency levels.")
+        parser.add_argument('--requests', type=int, default=100, help="Chat requests per level.")
+        parser.add_argument('--messages', help="File with one chat message per line (default: a built-in mix).")
+        parser.add_argument('--unique', action='store_true', help="Make every message distinct, so no cache can answer it.")
+        parser.add_argument('--timeout', type=float, default=60.0, help="Per-request socket timeout in seconds.")
+        parser.add_argument('--output', help="Write the report as JSON to this file.")
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',') if level.strip()]
+        except ValueError:
+            raise CommandError("--concurrency must be comma-separated integers, e.g. 1,4,16,64.")
+        if not levels or min(levels) < 1 or options['requests'] < 1:
+            raise CommandError("Concurrency levels and --requests must be positive.")
+
+        messages = DEFAULT_MESSAGES
+        if options['messages']:
+            with open(options['messages']) as f:
+                messages = [line.strip() for line in f if line.strip()]
+            if not messages:
+                raise CommandError(f"No messages in {options['messages']}.")
+
+        report = run_load_test(
+            options['url'], levels, options['requests'], messages=messages,
+            unique=options['unique'], timeout=options['timeout'], log=self.stdout.write,
+        )
+        if report['saturatedAt']:
+            self.stdout.write(f"Throughput stopped scaling at concurrency {report['saturatedAt']}.")
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote report to {options['output']}."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.services.schema_service import apply_migrations, get_applied_migrations, list_migrations
+from api.services.db_service import DB_PATH, get_write_connection
+
+
+class Command(BaseCommand):
+    help = "Applies pending SQL migrations (api/sql/) to the listings database (houser.db)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--list', action='store_true', help="Show migration status without applying anything.")
+
+    def handle(self, *args, **options):
+        if options['list']:
+            conn = get_write_connection()
+            try:
+                applied = get_applied_migrations(conn)
+            finally:
+                conn.close()
+            for path in list_migrations():
+                mark = 'X' if path.stem in applied else ' '
+                self.stdout.write(f"[{mark}] {path.stem}")
+            return
+
+        applied_now = apply_migrations(log=self.stdout.write)
+        if applied_now:
+            self.stdout.write(self.style.SUCCESS(f"Applied {len(applied_now)} migration(s) to {DB_PATH}."))
+        else:
+            self.stdout.write("No pending migrations.")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.services.stats_service import refresh_market_stats
+
+
+class Command(BaseCommand):
+    help = "Refreshes the materialized market_stats table (incrementally, from the segments marked dirty)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recompute every segment instead of only the dirty ones.")
+
+    def handle(self, *args, **options):
+        summary = refresh_market_stats(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {summary['segments']} segment(s); market stats version {summary['version']}."
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.services.trend_service import refresh_market_trends
+
+
+class Command(BaseCommand):
+    help = "Refreshes the weekly/monthly price trend table (incrementally, from the buckets marked dirty)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rebuild every bucket instead of only the dirty ones.")
+
+    def handle(self, *args, **options):
+        summary = refresh_market_trends(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {summary['buckets']} bucket(s); trends version {summary['version']}."
+        ))
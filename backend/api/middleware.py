@@ -0,0 +1,47 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import sync_and_async_middleware
+
+from .services.serialization_service import compress
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/plain', 'text/html')
+
+def _compress_response(request, response):
+    """Brotli/gzip for buffered JSON and text bodies. Streams (the chat SSE) are left alone:
+    a compressor would hold events back until its buffer fills."""
+    if response.streaming or response.has_header('Content-Encoding'):
+        return response
+    if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+
+    started = time.perf_counter()
+    body, encoding = compress(response.content, request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding is None:
+        return response
+    response.content = body
+    response['Content-Encoding'] = encoding
+    response['Content-Length'] = str(len(body))
+    # Weak validators only: the bytes changed but the representation did not
+    if response.has_header('ETag') and not response['ETag'].startswith('W/'):
+        response['ETag'] = 'W/' + response['ETag']
+
+    duration = f"compress;dur={(time.perf_counter() - started) * 1000:.1f}"
+    if response.has_header('Server-Timing'):
+        response['Server-Timing'] = f"{response['Server-Timing']}, {duration}"
+    return response
+
+@sync_and_async_middleware
+def compression_middleware(get_response):
+    # Native in both modes, so the async chat view is not pushed onto a thread
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            response = await get_response(request)
+            return _compress_response(request, response)
+        markcoroutinefunction(middleware)
+    else:
+        def middleware(request):
+            return _compress_response(request, get_response(request))
+    return middleware
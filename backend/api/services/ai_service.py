@@ -1,10 +1,15 @@
 import os
 import json
 import logging
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+
+from .coalesce_service import INTENT_FLIGHT, ASYNC_INTENT_FLIGHT
 
 logger = logging.getLogger(__name__)
 
+# Any OpenAI-compatible endpoint, e.g. the local stand-in from `manage.py fake_openai` for load tests
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL') or None
+
 def get_client():
     global OPENAI_CLIENT, OPENAI_AVAILABLE
     if OPENAI_CLIENT:
@@ -16,7 +21,7 @@ def get_client():
         return None
         
     try:
-        OPENAI_CLIENT = OpenAI(api_key=api_key)
+        OPENAI_CLIENT = OpenAI(api_key=api_key, base_url=OPENAI_BASE_URL)
         OPENAI_AVAILABLE = True
         return OPENAI_CLIENT
     except Exception as e:
@@ -24,8 +29,26 @@ def get_client():
         OPENAI_AVAILABLE = False
         return None
 
+def get_async_client():
+    """AsyncOpenAI client for the ASGI chat path; shares the key and availability flag with get_client()."""
+    global ASYNC_OPENAI_CLIENT
+    if ASYNC_OPENAI_CLIENT:
+        return ASYNC_OPENAI_CLIENT
+
+    api_key = os.environ.get('OPENAI_API_KEY')
+    if not api_key or not OPENAI_AVAILABLE:
+        return None
+
+    try:
+        ASYNC_OPENAI_CLIENT = AsyncOpenAI(api_key=api_key, base_url=OPENAI_BASE_URL)
+        return ASYNC_OPENAI_CLIENT
+    except Exception as e:
+        logger.error(f"Async OpenAI initialization failed: {str(e)}")
+        return None
+
 # Initial check
 OPENAI_CLIENT = None
+ASYNC_OPENAI_CLIENT = None
 OPENAI_AVAILABLE = True
 get_client()
 
@@ -54,7 +77,9 @@ Your goal is to translate user requests into a high-performance "Search Plan".
        "beds": int, "minPrice": float, "maxPrice": float,
        "propertyType": "buy|rent",
        "category": "Apartment|Villa|Townhouse|Office|Penthouse",
-       "isResidential": true
+       "isResidential": true,
+       "keywords": ["Optional listing features, e.g. sea view, near metro"],
+       "sort": "price|relevance"
     },
     "fallback": {
        "area": "Alternative/nearby area",
@@ -67,42 +92,50 @@ Your goal is to translate user requests into a high-performance "Search Plan".
 """
 
 
+def _intent_messages(user_message, session_context):
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT}
+    ]
+    
+    history = session_context.get('history', []) if session_context else []
+    user_name = session_context.get('user_name')
+    
+    if not user_name:
+        for msg in reversed(history):
+            text = msg['content'].lower()
+            if "my name is " in text:
+                user_name = msg['content'].split("is ")[-1].strip(' .!')
+                break
+    
+    if user_name:
+        messages.append({"role": "system", "content": f"The user's name is {user_name}."})
+
+    # Add context about what we currently see (filters, page)
+    current_filters = session_context.get('filters', {})
+    state_info = f"Current Session State: Filters={json.dumps(current_filters)}, Page={session_context.get('page', 1)}."
+    messages.append({"role": "system", "content": state_info})
+
+    trimmed_history = history[-6:]
+    for msg in trimmed_history:
+        messages.append({"role": msg['role'], "content": msg['content']})
+        
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
 def get_ai_intent(user_message, session_context=None):
     client = get_client()
     if not client:
         return {"type": "error", "response": "AI service currently unavailable (API key missing)."}
 
     try:
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT}
-        ]
-        
-        history = session_context.get('history', []) if session_context else []
-        user_name = session_context.get('user_name')
-        
-        if not user_name:
-            for msg in reversed(history):
-                text = msg['content'].lower()
-                if "my name is " in text:
-                    user_name = msg['content'].split("is ")[-1].strip(' .!')
-                    break
-        
-        if user_name:
-            messages.append({"role": "system", "content": f"The user's name is {user_name}."})
-
-        # Add context about what we currently see (filters, page)
-        current_filters = session_context.get('filters', {})
-        state_info = f"Current Session State: Filters={json.dumps(current_filters)}, Page={session_context.get('page', 1)}."
-        messages.append({"role": "system", "content": state_info})
-
-        trimmed_history = history[-6:]
-        for msg in trimmed_history:
-            messages.append({"role": msg['role'], "content": msg['content']})
-            
-        messages.append({"role": "user", "content": user_message})
-        
-        response = client.chat.completions.create(
-            model=os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'),
+        messages = _intent_messages(user_message, session_context)
+        model = os.environ.get('OPENAI_MODEL', 'gpt-4o-mini')
+        # temperature=0 makes identical prompts interchangeable, so concurrent duplicates share one call
+        flight_key = json.dumps([model, messages], sort_keys=True)
+        response = INTENT_FLIGHT.do(
+            flight_key,
+            client.chat.completions.create,
+            model=model,
             messages=messages,
             response_format={"type": "json_object"},
             temperature=0,
@@ -114,6 +147,31 @@ def get_ai_intent(user_message, session_context=None):
         logger.error(f"AI intent extraction failed: {str(e)}")
         return {"type": "error", "response": f"AI Error: {str(e)}"}
 
+async def aget_ai_intent(user_message, session_context=None):
+    """Async twin of get_ai_intent for the ASGI chat path."""
+    client = get_async_client()
+    if not client:
+        return {"type": "error", "response": "AI service currently unavailable (API key missing)."}
+
+    try:
+        messages = _intent_messages(user_message, session_context)
+        model = os.environ.get('OPENAI_MODEL', 'gpt-4o-mini')
+        flight_key = json.dumps([model, messages], sort_keys=True)
+        response = await ASYNC_INTENT_FLIGHT.do(
+            flight_key,
+            client.chat.completions.create,
+            model=model,
+            messages=messages,
+            response_format={"type": "json_object"},
+            temperature=0,
+            max_tokens=400
+        )
+
+        return json.loads(response.choices[0].message.content)
+    except Exception as e:
+        logger.error(f"AI intent extraction failed: {str(e)}")
+        return {"type": "error", "response": f"AI Error: {str(e)}"}
+
 def get_simple_response(user_message, context="greeting"):
     """Used for quick, non-streaming AI responses."""
     client = get_client()
@@ -134,6 +192,30 @@ def get_simple_response(user_message, context="greeting"):
     except Exception:
         return "How can I assist you with your property needs today?"
 
+def _narrative_prompt(user_query, results, is_fallback, is_supplemented, user_name):
+    results_count = len(results)
+    result_snippets = []
+    for r in results[:5]:
+        match_type = "EXACT MATCH" if r.get('isExactMatch') else "STRATEGIC RECOMMENDATION"
+        result_snippets.append(f"[{match_type}] {r['title']} (AED {int(r['price']):,}, {r['beds']} Beds, {r['location']})")
+    
+    results_info = "; ".join(result_snippets)
+    
+    return f"""You are Houser AI, an Elite UAE Real Estate Advisor.
+    Analytically narrate these {results_count} results for {user_name}.
+    
+    DATA CONTEXT:
+    - Query: {user_query}
+    - Findings: {results_info}
+    - Match Status: Fallback={is_fallback}, Supplemented={is_supplemented}
+    
+    ADVISORY RULES:
+    1. Professional and data-centric. Address user as {user_name}.
+    2. ANOMALY CHECK: If pricing/type in data seems off (e.g. 15,000 'sale'), note it professionally as a data anomaly.
+    3. Never lie about locations.
+    4. 2-3 sentences max.
+    """
+
 def stream_professional_response(user_query, results, filters, is_fallback=False, is_supplemented=False, session_context=None):
     client = get_client()
     results_count = len(results)
@@ -143,31 +225,12 @@ def stream_professional_response(user_query, results, filters, is_fallback=False
         yield f"{user_name}, I found {results_count} properties for you."
         return
 
+    # Only a failure before the first token falls back to canned text; a later one is
+    # raised so the caller can end the stream with an error
+    sent = False
     try:
         area = filters.get('area', 'Dubai')
-        city = filters.get('city', 'Dubai')
-        
-        result_snippets = []
-        for r in results[:5]:
-            match_type = "EXACT MATCH" if r.get('isExactMatch') else "STRATEGIC RECOMMENDATION"
-            result_snippets.append(f"[{match_type}] {r['title']} (AED {int(r['price']):,}, {r['beds']} Beds, {r['location']})")
-        
-        results_info = "; ".join(result_snippets)
-        
-        system_prompt = f"""You are Houser AI, an Elite UAE Real Estate Advisor.
-        Analytically narrate these {results_count} results for {user_name}.
-        
-        DATA CONTEXT:
-        - Query: {user_query}
-        - Findings: {results_info}
-        - Match Status: Fallback={is_fallback}, Supplemented={is_supplemented}
-        
-        ADVISORY RULES:
-        1. Professional and data-centric. Address user as {user_name}.
-        2. ANOMALY CHECK: If pricing/type in data seems off (e.g. 15,000 'sale'), note it professionally as a data anomaly.
-        3. Never lie about locations.
-        4. 2-3 sentences max.
-        """
+        system_prompt = _narrative_prompt(user_query, results, is_fallback, is_supplemented, user_name)
         
         response = client.chat.completions.create(
             model=os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'),
@@ -181,32 +244,94 @@ def stream_professional_response(user_query, results, filters, is_fallback=False
         )
         for chunk in response:
             if chunk.choices[0].delta.content:
+                sent = True
                 yield chunk.choices[0].delta.content
     except Exception as e:
+        if sent:
+            raise
+        logger.warning(f"Narrative failed before its first token: {e}")
         yield f"{user_name}, I have curated {results_count} premium options in {area}."
 
-def generate_stats_narrative(user_query, stats_data, session_context=None):
+async def astream_professional_response(user_query, results, filters, is_fallback=False, is_supplemented=False, session_context=None):
+    """Async generator twin of stream_professional_response."""
+    client = get_async_client()
+    results_count = len(results)
+    user_name = session_context.get('user_name', 'Client') if session_context else 'Client'
+
+    if not client:
+        yield f"{user_name}, I found {results_count} properties for you."
+        return
+
+    area = filters.get('area', 'Dubai')
+    sent = False
+    try:
+        system_prompt = _narrative_prompt(user_query, results, is_fallback, is_supplemented, user_name)
+
+        response = await client.chat.completions.create(
+            model=os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'),
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": "Narrate the findings professionally."}
+            ],
+            temperature=0.7,
+            max_tokens=300,
+            stream=True
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                sent = True
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        if sent:
+            raise
+        logger.warning(f"Narrative failed before its first token: {e}")
+        yield f"{user_name}, I have curated {results_count} premium options in {area}."
+
+def _trend_summary(trend):
+    """One line per market, e.g. 'buy avg AED 1,200,000 (2025-01-01) -> AED 1,310,000 (2025-10-01), +9.2%'."""
+    lines = []
+    for market, change in (trend or {}).get('change', {}).items():
+        if not change or change.get('avg') is None:
+            continue
+        points = {p['bucket']: p for p in trend['series'][market]}
+        first, last = points[change['from']], points[change['to']]
+        lines.append(
+            f"{market} avg AED {int(first['avg']):,} ({change['from']}) -> AED {int(last['avg']):,} ({change['to']}), "
+            f"{change['avg']:+.1f}%"
+        )
+    return "; ".join(lines)
+
+def _stats_prompt(user_query, stats_data, user_name):
+    area = stats_data.get('area', 'Dubai')
+    avg = stats_data['prices']['avg']
+    counts = stats_data['counts']['total']
+    trend = _trend_summary(stats_data.get('trend'))
+    trend_line = f"\n    TREND ({stats_data['trend']['period']}ly asking prices of new listings): {trend}." if trend else ""
+    
+    return f"""You are a senior Market Analyst at Houser AI.
+    Narrate statistics for {user_name} regarding {user_query}.
+    
+    DATA: Area={area}, AvgPrice={int(avg):,}, Listings={counts}.{trend_line}
+    
+    RULES:
+    1. Professional and analytical.
+    2. Explain the investment significance{', and how prices have moved' if trend else ''}.
+    3. 2-3 sentences max.
+    """
+
+def stream_stats_narrative(user_query, stats_data, session_context=None):
     client = get_client()
     user_name = session_context.get('user_name', 'Client') if session_context else 'Client'
     
     if not client or not stats_data:
-        return f"{user_name}, I am analyzing the latest market data for you."
+        yield f"{user_name}, I am analyzing the latest market data for you."
+        return
 
+    sent = False
     try:
         area = stats_data.get('area', 'Dubai')
         avg = stats_data['prices']['avg']
-        counts = stats_data['counts']['total']
-        
-        system_prompt = f"""You are a senior Market Analyst at Houser AI.
-        Narrate statistics for {user_name} regarding {user_query}.
-        
-        DATA: Area={area}, AvgPrice={int(avg):,}, Listings={counts}.
-        
-        RULES:
-        1. Professional and analytical.
-        2. Explain the investment significance.
-        3. 2-3 sentences max.
-        """
+        system_prompt = _stats_prompt(user_query, stats_data, user_name)
         
         response = client.chat.completions.create(
             model=os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'),
@@ -215,11 +340,56 @@ def generate_stats_narrative(user_query, stats_data, session_context=None):
                 {"role": "user", "content": "Narrate the stats."}
             ],
             temperature=0.7,
-            max_tokens=300
+            max_tokens=300,
+            stream=True
         )
-        return response.choices[0].message.content.strip()
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                sent = True
+                yield chunk.choices[0].delta.content
     except Exception as e:
-        return f"The market in {area} shows an average entry of AED {int(avg):,}."
+        if sent:
+            raise
+        logger.warning(f"Narrative failed before its first token: {e}")
+        yield f"The market in {area} shows an average entry of AED {int(avg):,}."
+
+async def astream_stats_narrative(user_query, stats_data, session_context=None):
+    """Async generator twin of stream_stats_narrative."""
+    client = get_async_client()
+    user_name = session_context.get('user_name', 'Client') if session_context else 'Client'
+
+    if not client or not stats_data:
+        yield f"{user_name}, I am analyzing the latest market data for you."
+        return
+
+    sent = False
+    try:
+        area = stats_data.get('area', 'Dubai')
+        avg = stats_data['prices']['avg']
+        system_prompt = _stats_prompt(user_query, stats_data, user_name)
+
+        response = await client.chat.completions.create(
+            model=os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'),
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": "Narrate the stats."}
+            ],
+            temperature=0.7,
+            max_tokens=300,
+            stream=True
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                sent = True
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        if sent:
+            raise
+        logger.warning(f"Narrative failed before its first token: {e}")
+        yield f"The market in {area} shows an average entry of AED {int(avg):,}."
+
+def generate_stats_narrative(user_query, stats_data, session_context=None):
+    return "".join(stream_stats_narrative(user_query, stats_data, session_context)).strip()
 
 def generate_professional_response(user_query, results, filters, is_fallback=False, is_supplemented=False, session_context=None):
     gen = stream_professional_response(user_query, results, filters, is_fallback, is_supplemented, session_context)
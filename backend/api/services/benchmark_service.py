@@ -0,0 +1,205 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+import platform
+from datetime import datetime, timezone
+
+from . import columnar_service, db_service, stats_service
+from .db_service import execute_query, fts_available
+
+# Scenarios call the uncached/uncoalesced internals (_query_properties, _compute_property_stats),
+# so every repetition measures the database work rather than a cache hit.
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+def time_call(fn, repeat=5, warmup=1):
+    """Runs fn warmup + repeat times; returns timings in ms (min/median/p95/mean/max) and the last result."""
+    result = None
+    for _ in range(warmup):
+        result = fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "min": round(samples[0], 3),
+        "median": round(percentile(samples, 0.5), 3),
+        "p95": round(percentile(samples, 0.95), 3),
+        "mean": round(sum(samples) / len(samples), 3),
+        "max": round(samples[-1], 3),
+        "runs": repeat,
+    }, result
+
+def dataset_profile():
+    """Names the scenarios run against: the busiest city, its busiest area and a sparse area in it."""
+    city = execute_query("""
+        SELECT c.id, c.name, COUNT(*) AS listings FROM properties p JOIN cities c ON c.id = p.city_id
+        WHERE p.status = 'active' AND p.price > 0 AND c.country_id IS NOT NULL
+        GROUP BY c.id ORDER BY listings DESC LIMIT 1
+    """, fetch_all=False)
+    if not city:
+        raise ValueError("No active listings; generate a dataset first (manage.py generate_dataset).")
+    areas = execute_query("""
+        SELECT a.name, COUNT(*) AS listings FROM properties p JOIN areas a ON a.id = p.area_id
+        WHERE p.status = 'active' AND p.price > 0 AND p.city_id = ? AND a.name NOT LIKE '%,%' AND a.name NOT LIKE 'No %'
+        GROUP BY a.id HAVING listings >= 5 ORDER BY listings DESC
+    """, (city['id'],))
+    if not areas:
+        raise ValueError(f"No areas with listings in {city['name']}.")
+    total = execute_query("SELECT COUNT(*) AS n FROM properties", fetch_all=False)['n']
+    return {"rows": total, "city": city['name'], "area": areas[0]['name'], "sparseArea": areas[-1]['name']}
+
+def search_scenarios(profile):
+    """(name, plan, options) for each filter shape and fallback tier query_properties handles."""
+    city, area, sparse = profile['city'], profile['area'], profile['sparseArea']
+    scenarios = [
+        ("search.no_filters", {"primary": {}}, {}),
+        ("search.city", {"primary": {"city": city}}, {}),
+        ("search.city_beds", {"primary": {"city": city, "beds": 2}}, {}),
+        ("search.city_beds_price_rent", {"primary": {"city": city, "beds": 2, "maxPrice": 150000, "propertyType": "rent"}}, {}),
+        ("search.city_category", {"primary": {"city": city, "category": "Villa"}}, {}),
+        ("search.commercial", {"primary": {"city": city, "category": "Office Space", "isResidential": False}}, {}),
+        ("search.beds_only", {"primary": {"beds": 3}}, {}),
+        ("search.price_range_buy", {"primary": {"minPrice": 1000000, "maxPrice": 2000000}}, {}),
+        ("search.area", {"primary": {"city": city, "area": area}}, {}),
+        ("search.area_beds_price", {"primary": {"city": city, "area": area, "beds": 1, "maxPrice": 120000, "propertyType": "rent"}}, {}),
+        # Thin primary tier: the page is filled from the AI fallback area, then the city
+        ("search.tier_fallback", {"primary": {"city": city, "area": sparse, "beds": 5, "category": "Penthouse"}, "fallback": {"area": area, "reason": f"Similar homes in {area}"}}, {}),
+        ("search.tier_city", {"primary": {"city": city, "area": sparse, "beds": 5, "category": "Penthouse"}}, {}),
+        ("search.keywords", {"primary": {"city": city, "keywords": ["sea view"]}}, {}),
+        ("search.keywords_relevance", {"primary": {"city": city, "keywords": ["sea view", "balcony"], "sort": "relevance"}}, {}),
+        ("search.page_5", {"primary": {"city": city, "beds": 2}}, {"pages": 5}),
+    ]
+    if fts_available():
+        # The pre-FTS LIKE paths, for comparison
+        scenarios += [
+            ("search.area_like", {"primary": {"city": city, "area": area}}, {"use_fts": False}),
+            ("search.keywords_like", {"primary": {"city": city, "keywords": ["sea view"]}}, {"use_fts": False}),
+        ]
+    return scenarios
+
+def _run_search(plan, page_size=10, use_fts=None, pages=1, columnar=False):
+    cursor, data = None, None
+    for _ in range(pages):
+        data = db_service._query_properties(plan, page_size, [], cursor, use_fts, columnar=columnar)
+        cursor = data['nextCursor']
+        if not cursor:
+            break
+    return data
+
+def stats_scenarios(profile):
+    """(name, filters, materialized) for get_property_stats, from market_stats and live."""
+    scopes = [
+        ("all", {}),
+        ("city", {"city": profile['city']}),
+        ("area", {"city": profile['city'], "area": profile['area']}),
+    ]
+    scenarios = []
+    for label, filters in scopes:
+        scenarios.append((f"stats.{label}.live", filters, False))
+        scenarios.append((f"stats.{label}.materialized", filters, True))
+    return scenarios
+
+def _synthetic_results(count, seed=7):
+    rng = random.Random(seed)
+    return [{"id": i, "price": round(rng.uniform(50000, 5000000), -3)} for i in range(count)]
+
+def run_benchmarks(repeat=5, warmup=1, only=None, log=print):
+    """
+    Times query_properties per filter shape and fallback tier, get_property_stats
+    (materialized and live) and calculate_results_stats. With NumPy installed the search
+    scenarios the columnar engine can answer are also timed on it (columnar.*). Returns a JSON-ready dict:
+    {"meta": {...}, "benchmarks": {name: {"min", "median", "p95", "mean", "max", "runs", ...}}}.
+    `only` is a substring filter on benchmark names.
+    """
+    profile = dataset_profile()
+    version = stats_service.stats_version()
+    benchmarks = {}
+
+    def record(name, fn, describe=None):
+        if only and only not in name:
+            return
+        timings, result = time_call(fn, repeat=repeat, warmup=warmup)
+        if describe:
+            timings.update(describe(result))
+        benchmarks[name] = timings
+        log(f"{name:<36} median {timings['median']:>9.2f} ms   p95 {timings['p95']:>9.2f} ms")
+
+    def describe_search(data):
+        return {"results": len(data['results']), "tierRows": data['timing']['tierRows']}
+
+    for name, plan, options in search_scenarios(profile):
+        record(
+            name,
+            lambda p=plan, o=options: _run_search(p, use_fts=o.get('use_fts'), pages=o.get('pages', 1)),
+            describe_search,
+        )
+
+    # The same scenarios on the columnar engine, where it answers them (keyword searches stay on SQL)
+    columnar_scenarios = [
+        (f"{name}.columnar", plan, options) for name, plan, options in search_scenarios(profile)
+        if options.get('use_fts') is not False and not plan['primary'].get('keywords')
+    ]
+    columnar = None
+    if columnar_service.available() and any(not only or only in name for name, _, _ in columnar_scenarios):
+        started = time.perf_counter()
+        snapshot = columnar_service.get_engine().build()
+        columnar = {"rows": len(snapshot), "buildMs": round((time.perf_counter() - started) * 1000, 1)}
+        log(f"columnar snapshot: {columnar['rows']:,} active listings built in {columnar['buildMs']:.0f} ms")
+        for name, plan, options in columnar_scenarios:
+            record(
+                name,
+                lambda p=plan, o=options: _run_search(p, pages=o.get('pages', 1), columnar=True),
+                describe_search,
+            )
+
+    for name, filters, materialized in stats_scenarios(profile):
+        if materialized and not version:
+            continue
+        record(
+            name,
+            lambda f=filters, m=materialized, k=f"benchmark_{name}": db_service._compute_property_stats(f, version if m else None, k),
+            lambda data: {"listings": data['counts']['total'] if data else 0},
+        )
+
+    for size in (10, 1000, 100000):
+        record(f"results_stats.{size}", lambda r=_synthetic_results(size): db_service.calculate_results_stats(r))
+
+    return {
+        "meta": {
+            "startedAt": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "dbPath": str(db_service.DB_PATH),
+            "dbBytes": os.path.getsize(db_service.DB_PATH),
+            "rows": profile['rows'],
+            "profile": profile,
+            "fts": fts_available(),
+            "marketStatsVersion": version,
+            "columnar": columnar,
+            "repeat": repeat,
+            "warmup": warmup,
+            "python": sys.version.split()[0],
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "benchmarks": benchmarks,
+    }
+
+def compare(baseline, current):
+    """[(name, baseline median, current median, ratio)] for benchmarks present in both runs."""
+    rows = []
+    for name, timings in current['benchmarks'].items():
+        before = baseline.get('benchmarks', {}).get(name)
+        if before:
+            ratio = timings['median'] / before['median'] if before['median'] else None
+            rows.append((name, before['median'], timings['median'], ratio))
+    return rows
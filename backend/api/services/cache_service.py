@@ -1,28 +1,319 @@
+import os
+import json
 import time
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
 
-class SimpleCache:
-    def __init__(self, default_ttl=3600):
-        self._data = {}
+logger = logging.getLogger(__name__)
+
+class BoundedCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and entry/byte limits.
+
+    Same get/set/clear API as the old SimpleCache. Expired entries are dropped on read
+    and by a background sweeper thread; when a limit is hit the least recently used
+    entries are evicted. Sizes are estimated from the JSON encoding of the value.
+    """
+
+    def __init__(self, default_ttl=3600, max_entries=5000, max_bytes=64 * 1024 * 1024, sweep_interval=60):
+        self._data = OrderedDict()
         self._default_ttl = default_ttl
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._sweeper_pid = None
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    @staticmethod
+    def _estimate_size(key, value):
+        try:
+            return len(key) + len(json.dumps(value, default=str))
+        except (TypeError, ValueError):
+            return len(key) + 1024
+
+    def _remove(self, key):
+        entry = self._data.pop(key)
+        self._bytes -= entry['size']
 
     def get(self, key):
-        if key in self._data:
-            entry = self._data[key]
-            if time.time() < entry['expiry']:
-                return entry['value']
-            else:
-                del self._data[key]
-        return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            if time.time() >= entry['expiry']:
+                self._remove(key)
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return None
+            self._data.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry['value']
 
     def set(self, key, value, ttl=None):
         ttl = ttl or self._default_ttl
-        self._data[key] = {
-            'value': value,
-            'expiry': time.time() + ttl
-        }
+        size = self._estimate_size(key, value)
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = {
+                'value': value,
+                'expiry': time.time() + ttl,
+                'size': size
+            }
+            self._bytes += size
+            while len(self._data) > self._max_entries or self._bytes > self._max_bytes:
+                self._remove(next(iter(self._data)))
+                self._counters['evictions'] += 1
+        self._ensure_sweeper()
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
 
     def clear(self):
-        self._data.clear()
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def sweep(self):
+        """Drops every expired entry; returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, entry in self._data.items() if now >= entry['expiry']]
+            for key in expired:
+                self._remove(key)
+            self._counters['expirations'] += len(expired)
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return dict(
+                self._counters,
+                entries=len(self._data),
+                bytes=self._bytes,
+                max_entries=self._max_entries,
+                max_bytes=self._max_bytes,
+                hit_ratio=(self._counters['hits'] / lookups) if lookups else 0.0,
+            )
+
+    def _ensure_sweeper(self):
+        # Checked per process: a sweeper started before a gunicorn fork does not survive it
+        if self._sweeper_pid == os.getpid() or not self._sweep_interval:
+            return
+        with self._lock:
+            if self._sweeper_pid == os.getpid():
+                return
+            self._sweeper_pid = os.getpid()
+        threading.Thread(target=self._sweep_loop, name="houser-cache-sweeper", daemon=True).start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self._sweep_interval)
+            self.sweep()
+
+class SharedCache:
+    """
+    Cache tier shared by every worker process on the host, stored in a small SQLite file.
+
+    Values are stored as JSON (never pickle, the file is shared). clear() bumps a
+    generation counter so per-process L1 caches in front of it can notice the flush.
+    """
+
+    def __init__(self, path, default_ttl=3600, max_entries=50000, prune_every=200):
+        self._path = str(path)
+        self._default_ttl = default_ttl
+        self._max_entries = max_entries
+        self._prune_every = prune_every
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sets = 0
+        self._counters = {"hits": 0, "misses": 0, "errors": 0}
+        conn = self._connect()
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expiry REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expiry ON cache(expiry)")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO cache_meta (key, value) VALUES ('generation', 0)")
+        conn.commit()
+
+    def _connect(self):
+        # One connection per thread (and per process: threading.local is not inherited on fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=1, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get_with_expiry(self, key):
+        """(value, expiry) or (None, None)."""
+        try:
+            row = self._connect().execute("SELECT value, expiry FROM cache WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            self._count('errors')
+            return None, None
+        if row is None or row[1] <= time.time():
+            self._count('misses')
+            return None, None
+        self._count('hits')
+        return json.loads(row[0]), row[1]
+
+    def get(self, key):
+        return self.get_with_expiry(key)[0]
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl or self._default_ttl
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expiry) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, default=str), time.time() + ttl),
+                )
+            with self._lock:
+                self._sets += 1
+                prune = self._sets % self._prune_every == 0
+            if prune:
+                self.prune()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Shared cache write failed: {e}")
+            self._count('errors')
+
+    def delete(self, key):
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache delete failed: {e}")
+
+    def prune(self):
+        """Drops expired rows, then the soonest-expiring ones beyond max_entries."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE expiry <= ?", (time.time(),))
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expiry DESC LIMIT -1 OFFSET ?)",
+                (self._max_entries,),
+            )
+
+    def generation(self):
+        try:
+            row = self._connect().execute("SELECT value FROM cache_meta WHERE key = 'generation'").fetchone()
+            return row[0] if row else 0
+        except sqlite3.Error:
+            return None
+
+    def clear(self):
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM cache")
+                conn.execute("UPDATE cache_meta SET value = value + 1 WHERE key = 'generation'")
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache clear failed: {e}")
+            self._count('errors')
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, path=self._path)
+
+
+class TieredCache:
+    """
+    In-process L1 (BoundedCache) in front of the host-wide SharedCache L2.
+
+    L1 is checked against the shared generation at most every `generation_check`
+    seconds, so a clear() in any worker empties every worker's L1 within that window.
+    """
+
+    def __init__(self, l1, l2, generation_check=1.0):
+        self.l1 = l1
+        self.l2 = l2
+        self._generation_check = generation_check
+        self._generation = l2.generation()
+        self._checked_at = time.time()
+
+    def _sync_generation(self):
+        now = time.time()
+        if now - self._checked_at < self._generation_check:
+            return
+        self._checked_at = now
+        generation = self.l2.generation()
+        if generation is not None and generation != self._generation:
+            self._generation = generation
+            self.l1.clear()
+
+    def get(self, key):
+        self._sync_generation()
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+        value, expiry = self.l2.get_with_expiry(key)
+        if value is not None:
+            self.l1.set(key, value, ttl=max(expiry - time.time(), 1))
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.l1.set(key, value, ttl)
+        self.l2.set(key, value, ttl)
+
+    def delete(self, key):
+        self.l1.delete(key)
+        self.l2.delete(key)
+
+    def clear(self):
+        self.l2.clear()
+        self.l1.clear()
+        generation = self.l2.generation()
+        if generation is not None:
+            self._generation = generation
+
+    def stats(self):
+        return dict(self.l1.stats(), shared=self.l2.stats())
+
+def _build_cache():
+    l1 = BoundedCache(
+        max_entries=int(os.environ.get('HOUSER_CACHE_MAX_ENTRIES', 5000)),
+        max_bytes=int(os.environ.get('HOUSER_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    )
+    # Host-wide L2 shared by all gunicorn workers, opt-in: HOUSER_SHARED_CACHE_PATH names a file
+    # in a directory only the app user can write (never a world-writable one like /tmp)
+    shared_path = os.environ.get('HOUSER_SHARED_CACHE_PATH', '')
+    if shared_path.lower() in ('', 'off', 'none'):
+        return l1
+    try:
+        _check_shared_path(shared_path)
+        return TieredCache(l1, SharedCache(shared_path))
+    except (OSError, sqlite3.Error) as e:
+        logger.error(f"Shared cache unavailable at {shared_path}: {e}")
+        return l1
+
+def _check_shared_path(path):
+    """Creates the cache file owner-only; refuses one another user owns or can write."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+    try:
+        st = os.fstat(fd)
+    finally:
+        os.close(fd)
+    if hasattr(os, 'getuid') and st.st_uid != os.getuid():
+        raise PermissionError(f"owned by uid {st.st_uid}, not this process")
+    if st.st_mode & 0o022:
+        raise PermissionError("writable by other users")
 
 # Global cache instance
-CACHE = SimpleCache()
+CACHE = _build_cache()
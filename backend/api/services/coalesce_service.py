@@ -0,0 +1,92 @@
+import asyncio
+import threading
+
+class _Call:
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent callers with the same key share one in-flight call.
+
+    The first caller (the leader) runs the function; everyone arriving before it
+    finishes waits and receives the same result, or the same exception. Shared
+    results must be treated as read-only. Coalescing is per process; across workers
+    the shared cache tier does the deduplication once the first result lands.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {"calls": 0, "coalesced": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            self._counters['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._counters['coalesced'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, in_flight=len(self._calls))
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines on the ASGI path. The shared call runs as its own task,
+    so a caller whose client disconnects (and is cancelled) does not cancel it for the others.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._counters = {"calls": 0, "coalesced": 0}
+
+    async def do(self, key, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        self._counters['calls'] += 1
+        task = self._calls.get(flight_key)
+        if task is not None:
+            self._counters['coalesced'] += 1
+        else:
+            task = self._calls[flight_key] = loop.create_task(fn(*args, **kwargs))
+            task.add_done_callback(lambda _: self._calls.pop(flight_key, None))
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return dict(self._counters, in_flight=len(self._calls))
+
+# One group per kind of work, so keys never collide across them
+SEARCH_FLIGHT = SingleFlight('search')
+STATS_FLIGHT = SingleFlight('stats')
+INTENT_FLIGHT = SingleFlight('intent')
+ASYNC_INTENT_FLIGHT = AsyncSingleFlight('intent')
@@ -0,0 +1,297 @@
+import os
+import time
+import sqlite3
+import threading
+import logging
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from . import db_service, resolver_service
+from .metrics_service import PHASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Optional in-memory engine behind query_properties (HOUSER_COLUMNAR_SEARCH=on, needs NumPy).
+# Active listings are held as NumPy columns sorted by (price, id), the search order, so a
+# tier's page is the first `page_size` rows of a vectorized mask and a keyset cursor is a
+# binary search. Only ids come out of the engine; the display columns of the page are read
+# by primary key. Keyword searches and databases without the FTS index stay on SQL.
+COLUMNAR_SEARCH = os.environ.get('HOUSER_COLUMNAR_SEARCH', 'off').lower() in ('1', 'on', 'true')
+# How often (seconds) a query checks whether the database changed since the snapshot
+CHECK_INTERVAL = float(os.environ.get('HOUSER_COLUMNAR_CHECK_INTERVAL', 1.0))
+# Rows per mask evaluation; a page is usually found in the first chunk
+CHUNK_ROWS = 65536
+# City/category/area masks and segment averages kept per snapshot
+MAX_MEMO_ENTRIES = 256
+
+MARKET_CODES = {'buy': 0, 'rent': 1, 'both': 2}
+NO_BEDS = -(2 ** 31)
+# Rows fetched per batch while a snapshot loads
+BUILD_BATCH_ROWS = 50000
+
+SNAPSHOT_WHERE = "status = 'active' AND price > 0"
+MARKET_CASE = "CASE market " + " ".join(f"WHEN '{m}' THEN {code}" for m, code in MARKET_CODES.items()) + " ELSE -1 END"
+# Snapshot columns in the order build() selects them
+SNAPSHOT_COLUMNS = (
+    ('id', np.int64), ('price', np.float64), ('beds', np.int32), ('city', np.int32), ('area', np.int32),
+    ('category', np.int32), ('market', np.int8), ('residential', bool),
+) if np is not None else ()
+
+def available():
+    return np is not None
+
+class Snapshot:
+    """Immutable column arrays for one database state, plus per-snapshot memos (area masks, averages)."""
+
+    def __init__(self, columns, categories, data_version):
+        order = np.lexsort((columns['id'], columns['price']))
+        self.ids = columns['id'][order]
+        self.price = columns['price'][order]
+        self.beds = columns['beds'][order]
+        self.city = columns['city'][order]
+        self.area = columns['area'][order]
+        self.category = columns['category'][order]
+        self.market = columns['market'][order]
+        self.residential = columns['residential'][order]
+        self.categories = categories
+        self.data_version = data_version
+        self.built_at = time.time()
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _memoized(self, key, compute):
+        with self._memo_lock:
+            if key in self._memo:
+                return self._memo[key]
+        value = compute()
+        with self._memo_lock:
+            if len(self._memo) >= MAX_MEMO_ENTRIES:
+                self._memo.pop(next(iter(self._memo)))
+            self._memo[key] = value
+        return value
+
+    def city_mask(self, city, exact=False):
+        return self._memoized(('city', city, exact), lambda: np.isin(self.city, resolver_service.get_resolver().city_ids(city, exact=exact)))
+
+    def category_mask(self, category):
+        return self._memoized(('category', category), lambda: np.isin(self.category, self.categories.get(category, [])))
+
+    def area_mask(self, area):
+        """area_id in the resolved ids, or a free-text location match (db_service._area_clause)."""
+        def compute():
+            mask = np.isin(self.area, resolver_service.get_resolver().area_ids(area))
+            phrase = db_service._fts_phrase(area)
+            matched = db_service.execute_query(
+                "SELECT rowid AS id FROM properties_fts WHERE properties_fts MATCH ?", (f"location : {phrase} *",)
+            )
+            if matched:
+                mask |= np.isin(self.ids, np.fromiter((r['id'] for r in matched), dtype=np.int64, count=len(matched)))
+            return mask
+        return self._memoized(('area', area), compute)
+
+    def start_after(self, position):
+        """Index of the first row after the keyset position (price, id)."""
+        if not position:
+            return 0
+        price, last_id = float(position[0]), int(position[1])
+        lo = int(np.searchsorted(self.price, price, 'left'))
+        hi = int(np.searchsorted(self.price, price, 'right'))
+        return lo + int(np.searchsorted(self.ids[lo:hi], last_id, 'right'))
+
+    def tier_page(self, filters, exclude_areas, position, limit, seen_ids):
+        """(price, id) of the first `limit` rows after `position` matching one tier (build_query's WHERE)."""
+        conditions = []
+        if filters.get('category'):
+            conditions.append(lambda s, category_mask=self.category_mask(str(filters['category']).lower()): category_mask[s])
+        beds = db_service.normalize_beds(filters.get('beds'))
+        if beds is not None:
+            conditions.append(lambda s: self.beds[s] == beds)
+        if filters.get('maxPrice'):
+            max_price = float(filters['maxPrice'])
+            conditions.append(lambda s: self.price[s] <= max_price)
+        if filters.get('minPrice'):
+            min_price = float(filters['minPrice'])
+            conditions.append(lambda s: self.price[s] >= min_price)
+        if filters.get('city'):
+            conditions.append(lambda s, city_mask=self.city_mask(filters['city']): city_mask[s])
+        if filters.get('area'):
+            conditions.append(lambda s, area_mask=self.area_mask(filters['area']): area_mask[s])
+        for area in exclude_areas:
+            conditions.append(lambda s, area_mask=self.area_mask(area): ~area_mask[s])
+        p_type = (filters.get('propertyType') or filters.get('type', 'buy')).lower()
+        market = MARKET_CODES['rent'] if p_type == 'rent' else MARKET_CODES['buy']
+        conditions.append(lambda s: (self.market[s] == market) | (self.market[s] == MARKET_CODES['both']))
+        if filters.get('isResidential', True):
+            conditions.append(lambda s: self.residential[s])
+        if seen_ids:
+            seen = np.asarray([int(i) for i in seen_ids if str(i).lstrip('-').isdigit()], dtype=np.int64)
+            conditions.append(lambda s: ~np.isin(self.ids[s], seen))
+
+        found = []
+        start = self.start_after(position)
+        while start < len(self.ids) and len(found) < limit:
+            s = slice(start, min(start + CHUNK_ROWS, len(self.ids)))
+            # A copy: the first condition may be a view of a memoized area mask
+            chunk = np.array(conditions[0](s), dtype=bool)
+            for condition in conditions[1:]:
+                chunk &= condition(s)
+            hits = np.flatnonzero(chunk)[:limit - len(found)] + start
+            found.extend(zip(self.price[hits].tolist(), self.ids[hits].tolist()))
+            start = s.stop
+        return found
+
+    def segment_avg(self, city, area):
+        """Average active price for a (city, area) scope, resolved like get_property_stats."""
+        def compute():
+            mask = np.ones(len(self.ids), dtype=bool)
+            if city:
+                mask &= self.city_mask(city, exact=True)
+            if area:
+                mask &= self.area_mask(area)
+            prices = self.price[mask]
+            return float(prices.mean()) if len(prices) else 0
+        return self._memoized(('avg', city, area), compute)
+
+class ColumnarEngine:
+    """
+    Holds the current Snapshot and replaces it when the database changes: a query notices
+    the change (PRAGMA data_version, checked at most every CHECK_INTERVAL seconds) and a
+    background thread builds the next snapshot while queries keep using the current one.
+    The build reads through its own connection, so the version probe never waits for it.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._conn = None
+        self._inode = None
+        # _lock guards the version-probe connection, _build_lock serializes builds and
+        # _state_lock the _building flag
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._building = False
+        self._checked = 0.0
+
+    def _connect(self):
+        return sqlite3.connect(f"{db_service.DB_PATH.as_uri()}?mode=ro", uri=True, check_same_thread=False)
+
+    def _connection(self):
+        # A dedicated connection: data_version only reports commits made by other connections
+        inode = os.stat(db_service.DB_PATH).st_ino
+        if self._conn is None or inode != self._inode:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = self._connect()
+            self._inode = inode
+        return self._conn
+
+    def _data_version(self):
+        with self._lock:
+            conn = self._connection()
+            return (self._inode, conn.execute("PRAGMA data_version").fetchone()[0])
+
+    def build(self):
+        """Loads a new snapshot and swaps it in; returns it."""
+        with self._build_lock:
+            started = time.perf_counter()
+            # Probed before the load: a commit landing in between only causes one extra rebuild
+            version = self._data_version()
+            conn = self._connect()
+            try:
+                # One read transaction, so the count and the rows see the same database state
+                conn.execute("BEGIN")
+                total = conn.execute(f"SELECT COUNT(*) FROM properties WHERE {SNAPSHOT_WHERE}").fetchone()[0]
+                columns = {name: np.empty(total, dtype=dtype) for name, dtype in SNAPSHOT_COLUMNS}
+                cursor = conn.execute(f"""
+                    SELECT id, price, IFNULL(bedrooms_int, {NO_BEDS}), IFNULL(city_id, 0), IFNULL(area_id, 0),
+                           IFNULL(category_id, 0), {MARKET_CASE}, IFNULL(is_residential = 1, 0)
+                    FROM properties
+                    WHERE {SNAPSHOT_WHERE}
+                """)
+                # Streamed in batches into the preallocated columns: no full row list in memory
+                filled = 0
+                while filled < total:
+                    batch = cursor.fetchmany(min(BUILD_BATCH_ROWS, total - filled))
+                    if not batch:
+                        break
+                    end = filled + len(batch)
+                    for (name, _), values in zip(SNAPSHOT_COLUMNS, zip(*batch)):
+                        columns[name][filled:end] = values
+                    filled = end
+                categories = {}
+                for category_id, name in conn.execute("SELECT id, name FROM categories"):
+                    categories.setdefault(str(name).lower(), []).append(category_id)
+            finally:
+                conn.close()
+
+            snapshot = Snapshot({name: values[:filled] for name, values in columns.items()}, categories, version)
+            self._snapshot = snapshot
+        PHASE_SECONDS.observe(time.perf_counter() - started, 'db', 'columnar_build')
+        logger.info(f"Columnar snapshot built: {len(snapshot):,} active listings in {time.perf_counter() - started:.2f}s")
+        return snapshot
+
+    def _start_build(self):
+        with self._state_lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=self._build_in_background, name='houser-columnar', daemon=True).start()
+
+    def _build_in_background(self):
+        try:
+            self.build()
+        except Exception as e:
+            logger.error(f"Columnar snapshot build failed: {e}")
+        finally:
+            with self._state_lock:
+                self._building = False
+
+    def snapshot(self):
+        """The current snapshot, or None until the first one is built. Starts a rebuild when stale."""
+        now = time.monotonic()
+        # While a rebuild runs there is nothing to probe for: the current snapshot is served
+        if not self._building and now - self._checked >= CHECK_INTERVAL:
+            self._checked = now
+            try:
+                stale = self._snapshot is None or self._data_version() != self._snapshot.data_version
+            except (OSError, sqlite3.Error):
+                stale = False
+            if stale:
+                self._start_build()
+        return self._snapshot
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ColumnarEngine()
+    return _engine
+
+def search_snapshot(tiers, use_fts, columnar=None):
+    """
+    The snapshot to answer these tiers from, or None for the SQL path: when the engine is
+    off (columnar=None follows HOUSER_COLUMNAR_SEARCH), NumPy is missing, the snapshot is
+    not built yet, or a tier needs full-text matching the engine does not do.
+    """
+    if columnar is None:
+        columnar = COLUMNAR_SEARCH
+    if not columnar or np is None or not use_fts:
+        return None
+    for tier in tiers:
+        filters = tier['filters']
+        if filters.get('keywords'):
+            return None
+        for area in [filters.get('area')] + list(tier['exclude']):
+            if area and not db_service._fts_phrase(area):
+                return None
+    return get_engine().snapshot()
@@ -0,0 +1,200 @@
+import re
+import math
+import bisect
+import random
+import itertools
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Seed dumps shipped at the repository root (PostgreSQL INSERTs into the public schema)
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent.parent
+SCHEMA_FILE = REPO_ROOT / 'sqlite_schema.sql'
+SEED_TABLES = ('countries', 'cities', 'areas', 'categories', 'ai_prompts')
+
+# Listing mix, roughly what the portals show for the UAE
+CATEGORY_WEIGHTS = {
+    'Apartment': 0.60, 'Villa': 0.14, 'Townhouse': 0.08, 'Penthouse': 0.02, 'Duplex': 0.02,
+    'Hotel & Hotel Apartment': 0.02, 'Office Space': 0.05, 'Shop': 0.02, 'Warehouse': 0.02, 'Land': 0.03,
+}
+# (bedrooms, weight) per category; commercial categories have no bedrooms
+BEDROOM_WEIGHTS = {
+    'Apartment': [(0, 0.15), (1, 0.35), (2, 0.30), (3, 0.15), (4, 0.05)],
+    'Villa': [(3, 0.25), (4, 0.35), (5, 0.25), (6, 0.10), (7, 0.05)],
+    'Townhouse': [(2, 0.20), (3, 0.45), (4, 0.30), (5, 0.05)],
+    'Penthouse': [(3, 0.35), (4, 0.40), (5, 0.20), (6, 0.05)],
+    'Duplex': [(2, 0.30), (3, 0.45), (4, 0.25)],
+    'Hotel & Hotel Apartment': [(0, 0.40), (1, 0.45), (2, 0.15)],
+}
+# Price level relative to an apartment of the same size
+CATEGORY_PRICE_FACTOR = {'Villa': 1.4, 'Townhouse': 1.15, 'Penthouse': 2.2, 'Land': 3.0, 'Warehouse': 1.6}
+RENT_SHARE = 0.45
+BASE_PRICE = {'rent': 60000, 'buy': 950000}
+INACTIVE_SHARE = 0.08
+MISSING_PRICE_SHARE = 0.01
+# Share of listings posted under the wrong market (the 'both' cross matches in search)
+MISLABELED_SHARE = 0.01
+FEATURES = (
+    'sea view', 'marina view', 'burj view', 'private pool', 'maid room', 'balcony', 'upgraded',
+    'furnished', 'near metro', 'high floor', 'vacant', 'chiller free', 'garden', 'gym', 'covered parking',
+)
+SOURCES = ('bayut', 'propertyfinder', 'propsearch')
+# Emirate shares for seed areas whose name does not lead back to a city
+EMIRATE_WEIGHTS = {
+    'Dubai': 0.55, 'Abu Dhabi': 0.2, 'Sharjah': 0.1, 'Ajman': 0.06, 'Ras al Khaimah': 0.05,
+    'Um Al Quwain': 0.02, 'Fujairah': 0.02,
+}
+HISTORY_DAYS = 730
+
+def load_seeds(conn, log=print):
+    """Creates the base schema and loads the seed dumps into an empty database."""
+    conn.executescript(SCHEMA_FILE.read_text(encoding='utf-8'))
+    for table in SEED_TABLES:
+        path = REPO_ROOT / f'houser-live-users{table}_202511121213.sql'
+        if not path.exists():
+            log(f"Seed dump for {table} not found, skipping.")
+            continue
+        script = path.read_text(encoding='utf-8').replace('INSERT INTO public.', 'INSERT INTO ')
+        # The prompt texts escape quotes with a backslash
+        conn.executescript(script.replace("\\'", "''"))
+    conn.commit()
+
+def _weighted(rng, pairs):
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights=weights)[0]
+
+def _area_weights(rng, areas):
+    """Zipf-like popularity: a few areas (Marina, JVC, Downtown) carry most of the inventory.
+    Rank follows the seed order, which lists the popular areas first, with some shuffling."""
+    ranked = sorted(areas, key=lambda a: a['id'] + rng.random() * 50)
+    return [1.0 / (rank + 1) ** 1.1 for rank in range(len(ranked))], ranked
+
+def _place_key(name):
+    return ' '.join(re.sub(r'\([^)]*\)', ' ', name).lower().split())
+
+def _assign_cities(rng, conn, areas):
+    """
+    Sets city_id on seed areas that have none (nearly all of them) by following the parent
+    named after the last comma up to an emirate: 'Marina Gate 1, Marina Gate' ->
+    'Marina Gate, Dubai Marina' -> 'Dubai Marina, Dubai'. Areas that never reach one get
+    an emirate drawn by EMIRATE_WEIGHTS.
+    """
+    emirates = {
+        _place_key(r[1]): r[0]
+        for r in conn.execute("SELECT id, name FROM cities WHERE country_id IS NOT NULL AND name NOT LIKE 'No %'")
+    }
+    parents = {}
+    for (name,) in itertools.chain(conn.execute("SELECT name FROM cities"), conn.execute("SELECT name FROM areas")):
+        head, _, tail = name.rpartition(',')
+        if head:
+            parents.setdefault(_place_key(head), _place_key(tail))
+    fallback = [(emirates[_place_key(name)], weight) for name, weight in EMIRATE_WEIGHTS.items() if _place_key(name) in emirates]
+
+    for area in areas:
+        if area['city_id']:
+            continue
+        seen = set()
+        head, _, tail = area['name'].rpartition(',')
+        key = _place_key(tail) if head else None
+        while key and key not in emirates and key not in seen:
+            seen.add(key)
+            key = parents.get(key)
+        area['city_id'] = emirates[key] if key in emirates else _weighted(rng, fallback)
+
+def generate_rows(conn, count, seed=42):
+    """
+    Yields property tuples (see INSERT_SQL) with a realistic distribution over the real
+    cities and areas: skewed area popularity, per-area price levels, bedroom mixes per
+    category, inactive/unpriced listings and a few cross-market ones.
+    """
+    rng = random.Random(seed)
+    cities = {r[0]: r[1] for r in conn.execute("SELECT id, name FROM cities")}
+    areas = [{"id": r[0], "name": r[1], "city_id": r[2]} for r in conn.execute("SELECT id, name, city_id FROM areas")]
+    categories = {r[1]: r[0] for r in conn.execute("SELECT id, name FROM categories")}
+    if not areas or not categories:
+        raise ValueError("Seed areas/categories are missing; load the seed dumps first.")
+    _assign_cities(rng, conn, areas)
+
+    weights, areas = _area_weights(rng, areas)
+    cumulative = list(itertools.accumulate(weights))
+    for area in areas:
+        # Each area has its own price level (Palm Jumeirah vs International City)
+        area['premium'] = math.exp(rng.gauss(0, 0.35))
+    category_pairs = [(name, weight) for name, weight in CATEGORY_WEIGHTS.items() if name in categories]
+    start = datetime(2025, 11, 1)
+
+    for i in range(count):
+        area = areas[bisect.bisect_left(cumulative, rng.random() * cumulative[-1])]
+        city = cities.get(area['city_id'], '')
+        category = _weighted(rng, category_pairs)
+        beds = _weighted(rng, BEDROOM_WEIGHTS[category]) if category in BEDROOM_WEIGHTS else None
+        market = 'rent' if rng.random() < RENT_SHARE else 'buy'
+
+        price = BASE_PRICE[market] * (1 + 0.45 * (beds or 1)) * CATEGORY_PRICE_FACTOR.get(category, 1.0)
+        price *= area['premium'] * math.exp(rng.gauss(0, 0.25))
+        price = round(price, -3 if market == 'buy' else -2)
+        if rng.random() < MISSING_PRICE_SHARE:
+            price = 0
+        listed_as = market if rng.random() >= MISLABELED_SHARE else ('buy' if market == 'rent' else 'rent')
+
+        features = rng.sample(FEATURES, rng.randint(0, 3))
+        size = 'Studio' if beds == 0 else (f"{beds} BR" if beds else '')
+        title = f"{size} {category} in {area['name']}".strip()
+        description = f"{title} for {'rent' if market == 'rent' else 'sale'}." + (f" Features: {', '.join(features)}." if features else '')
+        source = SOURCES[i % len(SOURCES)]
+        created = start - timedelta(days=rng.random() * HISTORY_DAYS)
+
+        yield (
+            title, description, f"{area['name']}, {city}" if city else area['name'], price,
+            'Studio' if beds == 0 else (str(beds) if beds else None), str(max(1, (beds or 1))),
+            source, f"https://images.example.com/{i % 5000}.jpg", listed_as,
+            'inactive' if rng.random() < INACTIVE_SHARE else 'active', rng.choice(('ready', 'off-plan')),
+            1, area['city_id'], area['id'], categories[category],
+            created.strftime('%Y-%m-%d %H:%M:%S'), f"https://www.{source}.example/listing/{seed}-{i}",
+        )
+
+INSERT_SQL = """
+    INSERT INTO properties (
+        title, description, location, price, bedrooms, bathrooms, source, thumbnail, property_type,
+        status, built_status, country_id, city_id, area_id, category_id, created_at, source_url
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def build_dataset(path, count, seed=42, batch_size=50000, log=print):
+    """
+    Writes a fresh listings database at `path` (replacing any existing file) with the
+    seed tables and `count` synthetic properties. Search columns, indexes and market
+    stats are not built here: run the migrations and refresh_market_stats afterwards,
+    so they are built once over the full table rather than per inserted row.
+    """
+    path = Path(path)
+    for suffix in ('', '-wal', '-shm'):
+        candidate = Path(str(path) + suffix)
+        if candidate.exists():
+            candidate.unlink()
+
+    conn = sqlite3.connect(str(path))
+    try:
+        # Bulk load: nothing to protect until the file is complete
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        load_seeds(conn, log=log)
+
+        batch = []
+        written = 0
+        for row in generate_rows(conn, count, seed=seed):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.executemany(INSERT_SQL, batch)
+                conn.commit()
+                written += len(batch)
+                batch = []
+                log(f"  {written:,} / {count:,} properties")
+        if batch:
+            conn.executemany(INSERT_SQL, batch)
+            conn.commit()
+            written += len(batch)
+    finally:
+        conn.close()
+    log(f"Wrote {written:,} properties to {path}.")
+    return written
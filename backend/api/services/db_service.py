@@ -1,60 +1,559 @@
 import sqlite3
 import os
+import json
+import base64
+import hashlib
+import re
+import time
+import threading
+import logging
+import weakref
 from pathlib import Path
 
-# Database path - Resolved relative to this file
-DB_PATH = Path(__file__).resolve().parent.parent.parent.parent / 'houser.db'
+from . import columnar_service, pricing_service, resolver_service, stats_service
+from .coalesce_service import SEARCH_FLIGHT, STATS_FLIGHT
+from .metrics_service import PHASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Database path - Resolved relative to this file (override with HOUSER_DB_PATH)
+DB_PATH = Path(os.environ.get('HOUSER_DB_PATH') or Path(__file__).resolve().parent.parent.parent.parent / 'houser.db')
+
+# Connection tuning. Reader connections are opened read-only and kept per thread,
+# so request threads and executor workers reuse a warm page cache between queries.
+DB_MMAP_SIZE = int(os.environ.get('HOUSER_DB_MMAP_SIZE', 256 * 1024 * 1024))
+DB_CACHE_SIZE_KB = int(os.environ.get('HOUSER_DB_CACHE_SIZE_KB', 64 * 1024))
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get('HOUSER_DB_STATEMENT_CACHE_SIZE', 256))
+
+class _PooledConnection(sqlite3.Connection):
+    """Weak-referenceable connection, so connections of finished threads are not kept alive."""
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pool = weakref.WeakSet()
+_pool_generation = 0
+_wal_enabled = False
+_known_tables = {}
+
+def _apply_pragmas(conn):
+    conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+def _enable_wal():
+    """WAL is persistent in the file, so it only has to be switched on once per process."""
+    global _wal_enabled
+    if _wal_enabled:
+        return
+    try:
+        conn = sqlite3.connect(str(DB_PATH), timeout=5)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+        finally:
+            conn.close()
+    except sqlite3.OperationalError:
+        # Read-only deployments (e.g. mounted volumes) keep their existing journal mode
+        pass
+    _wal_enabled = True
 
 def get_db_connection():
+    """Returns this thread's pooled read-only connection, opening it on first use."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.generation == _pool_generation:
+        return conn
+
     if not os.path.exists(DB_PATH):
         raise FileNotFoundError(f"Database not found at {DB_PATH}")
-    
-    conn = sqlite3.connect(str(DB_PATH))
+
+    with _pool_lock:
+        _enable_wal()
+        generation = _pool_generation
+
+    conn = sqlite3.connect(
+        f"{DB_PATH.as_uri()}?mode=ro",
+        uri=True,
+        check_same_thread=False,
+        cached_statements=DB_STATEMENT_CACHE_SIZE,
+        factory=_PooledConnection,
+    )
     conn.row_factory = sqlite3.Row
+    _apply_pragmas(conn)
+    conn.execute("PRAGMA query_only = ON")
+
+    with _pool_lock:
+        _pool.add(conn)
+    _local.conn = conn
+    _local.generation = generation
     return conn
 
+def get_write_connection():
+    """Opens a dedicated read-write connection. The caller owns it and must close it."""
+    if not os.path.exists(DB_PATH):
+        raise FileNotFoundError(f"Database not found at {DB_PATH}")
+
+    with _pool_lock:
+        _enable_wal()
+
+    conn = sqlite3.connect(str(DB_PATH), timeout=30, cached_statements=DB_STATEMENT_CACHE_SIZE)
+    conn.row_factory = sqlite3.Row
+    _apply_pragmas(conn)
+    return conn
+
+def close_db_connections():
+    """Closes every pooled connection; each thread reopens lazily on its next query."""
+    global _pool_generation, _wal_enabled
+    with _pool_lock:
+        for conn in list(_pool):
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _pool.clear()
+        _pool_generation += 1
+        _wal_enabled = False
+        # The schema may have changed (e.g. after migrate_houser_db)
+        _known_tables.clear()
+
 def execute_query(query, params=(), fetch_all=True):
-    conn = get_db_connection()
+    cur = get_db_connection().cursor()
     try:
-        cur = conn.cursor()
         cur.execute(query, params)
         if fetch_all:
             return [dict(row) for row in cur.fetchall()]
-        return dict(cur.fetchone()) if cur.rowcount > 0 else None
+        row = cur.fetchone()
+        return dict(row) if row else None
     finally:
-        conn.close()
+        cur.close()
+
+def encode_cursor(state):
+    """Packs a keyset position into an opaque, URL-safe token."""
+    raw = json.dumps(state, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """Returns the cursor state, or None for a missing or malformed token."""
+    if not token or not isinstance(token, str):
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        state = json.loads(raw.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return state if isinstance(state, dict) else None
+
+def _price(value):
+    try:
+        return float(value) if value else None
+    except (TypeError, ValueError):
+        return None
 
-def query_properties(plan=None, page=1, page_size=10, seen_ids=None):
+def canonical_plan(plan):
+    """
+    The parts of a search plan that affect query_properties' results, in one normal form:
+    two plans with equal canonical forms return the same rows (e.g. 'Dubai' vs 'dubai',
+    beds 2 vs '2', a missing propertyType vs 'buy').
+    """
+    plan = plan or {}
+    primary = plan.get('primary') or {}
+    fallback = plan.get('fallback') or {}
+
+    def text(value):
+        return str(value).strip().lower() or None if value else None
+
+    keywords = primary.get('keywords') or []
+    keywords = sorted({str(k).strip().lower() for k in ([keywords] if isinstance(keywords, str) else keywords) if str(k).strip()})
+    canonical = {
+        "category": text(primary.get('category')),
+        "beds": normalize_beds(primary.get('beds')),
+        "minPrice": _price(primary.get('minPrice')),
+        "maxPrice": _price(primary.get('maxPrice')),
+        "city": text(primary.get('city')),
+        "area": text(primary.get('area')),
+        "keywords": keywords,
+        "relevance": bool(keywords) and primary.get('sort') == 'relevance',
+        "market": 'rent' if (primary.get('propertyType') or primary.get('type') or 'buy').lower() == 'rent' else 'buy',
+        "residential": bool(primary.get('isResidential', True)),
+    }
+    # The fallback tier only exists when the primary tier has an area
+    if canonical['area'] and fallback.get('area'):
+        canonical['fallback'] = {"area": text(fallback['area']), "reason": fallback.get('reason')}
+    return canonical
+
+def plan_fingerprint(plan):
+    """Short stable hash of a search plan; cursors are only valid for the plan that produced them."""
+    key = json.dumps(canonical_plan(plan), sort_keys=True, default=str)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
+def table_exists(name):
+    """Whether a table exists in houser.db; memoized until the pool is reset (e.g. by migrate_houser_db)."""
+    if name not in _known_tables:
+        row = execute_query("SELECT 1 AS ok FROM sqlite_master WHERE name = ?", (name,), fetch_all=False)
+        _known_tables[name] = bool(row)
+    return _known_tables[name]
+
+def search_columns_available():
+    """True once migration 0001 has added the normalized search columns (bedrooms_int, market, ...)."""
+    if 'properties.bedrooms_int' not in _known_tables:
+        columns = {row['name'] for row in execute_query("PRAGMA table_info(properties)")}
+        _known_tables['properties.bedrooms_int'] = 'bedrooms_int' in columns
+    return _known_tables['properties.bedrooms_int']
+
+# The same values as migration 0001's columns, computed from the raw ones, for databases
+# migrate_houser_db has not been run on (searches then work, without the partial indexes)
+RESIDENTIAL_CATEGORIES = ('Apartment', 'Villa', 'Townhouse', 'Penthouse', 'Duplex', 'Compound', 'Bungalow', 'Hotel & Hotel Apartment')
+_LEGACY_SEARCH_COLUMNS = {
+    'bedrooms_int': (
+        "CASE WHEN TRIM(p.bedrooms) GLOB '[0-9]*' THEN CAST(TRIM(p.bedrooms) AS INTEGER)"
+        " WHEN LOWER(TRIM(p.bedrooms)) = 'studio' THEN 0 END"
+    ),
+    'is_residential': (
+        "IFNULL(p.category_id IN (SELECT id FROM categories WHERE name IN ("
+        + ', '.join(f"'{name}'" for name in RESIDENTIAL_CATEGORIES) + ")), 0)"
+    ),
+    'market': (
+        "CASE WHEN (p.property_type = 'rent' AND p.price > 2000000) OR (p.property_type = 'buy' AND p.price < 200000) THEN 'both'"
+        " WHEN p.property_type IN ('rent', 'buy') THEN p.property_type END"
+    ),
+    'location_lc': "LOWER(p.location)",
+}
+
+def search_column(name):
+    """SQL for one of migration 0001's columns on `p`: the column, or its legacy expression."""
+    return f"p.{name}" if search_columns_available() else f"({_LEGACY_SEARCH_COLUMNS[name]})"
+
+def fts_available():
+    """True once migration 0002 has created the properties_fts index."""
+    return table_exists('properties_fts')
+
+def _fts_phrase(text):
+    """Quotes free text as a single FTS5 phrase, dropping operators and punctuation."""
+    tokens = re.findall(r'\w+', str(text).lower())
+    return '"' + ' '.join(tokens) + '"' if tokens else None
+
+def _keywords_match(keywords):
+    """FTS5 query requiring every keyword phrase, e.g. ['sea view', 'near metro']."""
+    if isinstance(keywords, str):
+        keywords = [keywords]
+    phrases = [_fts_phrase(k) for k in keywords or []]
+    phrases = [ph for ph in phrases if ph]
+    return ' '.join(phrases) or None
+
+def _in_clause(column, values):
+    """' AND column IN (?, ?, ...)'; an empty list matches nothing, like a name that resolves to no ids."""
+    placeholders = ', '.join(['?'] * len(values))
+    return f" AND {column} IN ({placeholders})", list(values)
+
+def _area_clause(area, exclude=False, use_fts=None):
+    """Area names resolve to area ids in memory; listings without a usable area_id still
+    match on their free-text location (FTS prefix match, or LIKE before migration 0002)."""
+    use_fts = fts_available() if use_fts is None else use_fts
+    area_ids = resolver_service.get_resolver().area_ids(area)
+    phrase = _fts_phrase(area) if use_fts else None
+
+    parts, params = [], []
+    if area_ids:
+        placeholders = ', '.join(['?'] * len(area_ids))
+        # IFNULL keeps rows with no area from turning the NOT into NULL
+        parts.append(f"IFNULL(p.area_id IN ({placeholders}), 0)" if exclude else f"p.area_id IN ({placeholders})")
+        params.extend(area_ids)
+    if phrase:
+        parts.append("p.id IN (SELECT rowid FROM properties_fts WHERE properties_fts MATCH ?)")
+        params.append(f"location : {phrase} *")
+    else:
+        parts.append(f"IFNULL({search_column('location_lc')}, '') LIKE ?")
+        params.append(f"%{area.lower()}%")
+
+    match = "(" + " OR ".join(parts) + ")"
+    return (f" AND NOT {match}" if exclude else f" AND {match}"), params
+
+def normalize_beds(value):
+    """Maps a plan's beds value (2, '2', 'Studio') to the integer stored in bedrooms_int."""
+    if value is None:
+        return None
+    if isinstance(value, str) and value.strip().lower() == 'studio':
+        return 0
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+# Result projection. The default 'card' schema is what the result cards render: the full
+# description is replaced by a short snippet, cut in SQL so the text never reaches Python.
+SNIPPET_CHARS = 160
+CARD_FIELDS = (
+    'id', 'title', 'snippet', 'location', 'price', 'beds', 'baths', 'area', 'city', 'type',
+    'thumbnail', 'source', 'sourceUrl', 'priceInsight', 'isExactMatch', 'fallbackReason',
+)
+RESULT_FIELDS = CARD_FIELDS + ('description', 'category', 'status', 'builtStatus', 'pricePercentile')
+FIELD_PRESETS = {'card': CARD_FIELDS, 'full': RESULT_FIELDS}
+DETAIL_FIELDS = (
+    'id', 'title', 'description', 'location', 'price', 'beds', 'baths', 'area', 'city', 'type', 'category',
+    'status', 'builtStatus', 'thumbnail', 'source', 'sourceUrl', 'amenities', 'nearby', 'createdAt', 'updatedAt',
+)
+MAX_DETAIL_IDS = 50
+
+SEGMENT_COLUMNS = ('p.city_id', 'p.area_id', 'p.category_id', 'p.bedrooms_int', 'p.market')
+# Columns each field needs; aliases keep the row keys stable whichever joins are present
+_FIELD_COLUMNS = {
+    'title': ('p.title',),
+    'description': ('p.description',),
+    'snippet': (f"substr(p.description, 1, {SNIPPET_CHARS + 1}) AS snippet",),
+    'location': ('p.location', 'a.name AS area_name', 'c.name AS city_name'),
+    'beds': ('p.bedrooms',),
+    'baths': ('p.bathrooms',),
+    'area': ('a.name AS area_name', 'c.name AS city_name'),
+    'city': ('c.name AS city_name',),
+    'type': ('p.property_type',),
+    'category': ('cat.name AS category_name',),
+    'status': ('p.status',),
+    'builtStatus': ('p.built_status',),
+    'thumbnail': ('p.thumbnail',),
+    'source': ('p.source',),
+    'sourceUrl': ('p.source_url',),
+    'amenities': ('p.amenities',),
+    'nearby': ('p.nearby',),
+    'createdAt': ('p.created_at',),
+    'updatedAt': ('p.updated_at',),
+    # The listing's market segment, for pricing_service
+    'priceInsight': SEGMENT_COLUMNS,
+    'pricePercentile': SEGMENT_COLUMNS,
+}
+_JOINS = (
+    ('c.', "LEFT JOIN cities c ON p.city_id = c.id"),
+    ('a.', "LEFT JOIN areas a ON p.area_id = a.id"),
+    ('cat.', "LEFT JOIN categories cat ON p.category_id = cat.id"),
+)
+
+def resolve_fields(fields=None):
+    """Field names for a result projection: None/'card' (default), 'full', or a list or
+    comma-separated string of RESULT_FIELDS names. Unknown names are ignored; id is always kept."""
+    if not fields:
+        return CARD_FIELDS
+    if isinstance(fields, str):
+        if fields in FIELD_PRESETS:
+            return FIELD_PRESETS[fields]
+        fields = fields.split(',')
+    wanted = {str(f).strip() for f in fields}
+    return tuple(f for f in RESULT_FIELDS if f == 'id' or f in wanted)
+
+def project(results, fields):
+    """Narrows result dicts to `fields` (a resolve_fields() value)."""
+    return [{k: r[k] for k in fields if k in r} for r in results]
+
+def _field_sql(fields):
+    """(select columns, joins) for the fields; price is always selected (sorting, insights)."""
+    columns = ['p.price']
+    for field in fields:
+        for column in _FIELD_COLUMNS.get(field, ()):
+            if column not in columns:
+                columns.append(column)
+    joins = [join for prefix, join in _JOINS if any(column.startswith(prefix) for column in columns)]
+    if not search_columns_available():
+        columns = [f"{search_column(c[2:])} AS {c[2:]}" if c[2:] in _LEGACY_SEARCH_COLUMNS else c for c in columns]
+    return ', '.join(columns), '\n'.join(joins)
+
+def _snippet(text):
+    if not text or len(text) <= SNIPPET_CHARS:
+        return text or ""
+    return text[:SNIPPET_CHARS].rsplit(' ', 1)[0].rstrip(' ,.;:') + '…'
+
+def _json_list(value):
+    if value and value.lstrip().startswith('['):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+def _format_result(row, fields, insight=None, exact=True, fallback_reason=None, percentile=None):
+    """One result dict in the API's field naming, limited to `fields`."""
+    keys = row.keys()
+    get = lambda key: row[key] if key in keys else None
+    price = float(get('price')) if get('price') else 0
+    values = {
+        "id": lambda: row['id'],
+        "title": lambda: get('title') or 'Untitled',
+        "description": lambda: get('description') or "No description.",
+        "snippet": lambda: _snippet(get('snippet')),
+        "location": lambda: get('location') or get('area_name') or get('city_name') or 'Unknown',
+        "price": lambda: price,
+        "beds": lambda: "Studio" if str(get('bedrooms')) == '0' else (get('bedrooms') if get('bedrooms') and str(get('bedrooms')).lower() != 'none' else 'N/A'),
+        "baths": lambda: get('bathrooms') or 'N/A',
+        "area": lambda: get('area_name') or get('city_name') or 'N/A',
+        "city": lambda: get('city_name') or 'N/A',
+        "type": lambda: get('property_type') or 'buy',
+        "category": lambda: get('category_name'),
+        "status": lambda: get('status'),
+        "builtStatus": lambda: get('built_status'),
+        "thumbnail": lambda: get('thumbnail'),
+        "source": lambda: get('source'),
+        "sourceUrl": lambda: get('source_url'),
+        "amenities": lambda: _json_list(get('amenities')),
+        "nearby": lambda: _json_list(get('nearby')),
+        "createdAt": lambda: get('created_at'),
+        "updatedAt": lambda: get('updated_at'),
+        "priceInsight": lambda: insight,
+        "pricePercentile": lambda: percentile,
+        "isExactMatch": lambda: exact,
+        "fallbackReason": lambda: fallback_reason,
+    }
+    return {field: values[field]() for field in fields if field in values}
+
+def get_properties(ids):
+    """Full detail records for listing ids (any status), in the order asked; unknown ids are skipped."""
+    ids = [int(i) for i in ids][:MAX_DETAIL_IDS]
+    if not ids:
+        return []
+    columns, joins = _field_sql(DETAIL_FIELDS)
+    placeholders = ', '.join(['?'] * len(ids))
+    rows = execute_query(f"SELECT p.id, {columns} FROM properties p {joins} WHERE p.id IN ({placeholders})", ids)
+    by_id = {row['id']: _format_result(row, DETAIL_FIELDS) for row in rows}
+    return [by_id[i] for i in dict.fromkeys(ids) if i in by_id]
+
+def query_properties(plan=None, page=1, page_size=10, seen_ids=None, cursor=None, use_fts=None, fields=None, columnar=None):
     """
     Executes a high-performance search based on the AI's Search Plan.
+
+    All tiers (primary, AI fallback area, generic city) are fetched in one UNION ALL
+    statement. Paging is keyset based: every tier seeks from its own last (sort key, id),
+    so page N costs the same as page 1. Pass the returned `nextCursor` back as `cursor`;
+    `page` is informational only.
+
+    When the FTS index exists (or `use_fts=True`), area terms and the plan's `keywords`
+    are matched through properties_fts; `sort: 'relevance'` then orders by BM25 instead of price.
+
+    Results use the compact 'card' schema unless `fields` asks for more (see resolve_fields);
+    only the columns and joins the requested fields need are read.
+
+    With HOUSER_COLUMNAR_SEARCH on (or `columnar=True`) and NumPy installed, the tiers are
+    answered from the in-memory columnar snapshot instead (see columnar_service); keyword
+    searches always use SQL. `columnar=False` forces SQL.
+    """
+    fields = resolve_fields(fields)
+    # Identical concurrent searches (a trending query) share one execution; `page` does not affect results
+    key = json.dumps([plan or {}, page_size, seen_ids or [], cursor, use_fts, fields, columnar], sort_keys=True, default=str)
+    return SEARCH_FLIGHT.do(key, _query_properties, plan, page_size, seen_ids, cursor, use_fts, fields, columnar=columnar)
+
+def query_properties_batch(plans, page_size=10, fields=None, use_fts=None):
     """
+    First pages for several search plans, run back to back in one read transaction on this
+    thread's pooled connection, so every plan sees the same snapshot. Area clauses (and the
+    per-area averages behind price insights before the first market_stats refresh) are
+    looked up once per batch. Returns a list
+    aligned with `plans`; a plan that fails gets {"error": message} instead of results.
+    """
+    fields = resolve_fields(fields)
+    if use_fts is None:
+        use_fts = fts_available()
+    shared = {}
+    outcomes = []
+    conn = get_db_connection()
+    started = time.perf_counter()
+    own_transaction = not conn.in_transaction
+    if own_transaction:
+        conn.execute("BEGIN")
+    try:
+        for plan in plans:
+            try:
+                outcomes.append(_query_properties(plan, page_size, None, None, use_fts, fields, shared=shared))
+            except Exception as e:
+                logger.warning(f"Batch search item failed: {e}")
+                outcomes.append({"error": str(e)})
+    finally:
+        if own_transaction:
+            conn.execute("COMMIT")
+    PHASE_SECONDS.observe(time.perf_counter() - started, 'db', 'search_batch')
+    return outcomes
+
+def _columnar_rows(snapshot, tiers, positions, page_size, seen_ids, columns, joins):
+    """rows_by_tier from the columnar snapshot: ids per tier, then one primary-key read for the display columns."""
+    def hydrate(pages):
+        ids = sorted({property_id for page in pages for _, property_id in page})
+        if not ids:
+            return {}
+        placeholders = ', '.join(['?'] * len(ids))
+        return {r['id']: r for r in execute_query(
+            f"SELECT p.id, {columns} FROM properties p {joins} WHERE p.id IN ({placeholders}) AND p.status = 'active'", ids
+        )}
+
+    pages = [
+        snapshot.tier_page(tier['filters'], tier['exclude'], positions.get(tier['key']), page_size, seen_ids)
+        for tier in tiers
+    ]
+    by_id = hydrate(pages)
+    rows_by_tier = []
+    for tier, page in zip(tiers, pages):
+        rows = [dict(by_id[property_id], sort_key=price) for price, property_id in page if property_id in by_id]
+        # A listing deleted or deactivated since the snapshot was built is dropped; the page is
+        # topped up from the snapshot so a short page still means the tier is exhausted
+        wanted = page_size
+        while len(page) == wanted and len(rows) < page_size:
+            wanted = page_size - len(rows)
+            page = snapshot.tier_page(tier['filters'], tier['exclude'], page[-1], wanted, seen_ids)
+            more = hydrate([page])
+            rows.extend(dict(more[property_id], sort_key=price) for price, property_id in page if property_id in more)
+        rows_by_tier.append(rows)
+    return rows_by_tier
+
+def _query_properties(plan, page_size, seen_ids, cursor, use_fts, fields=CARD_FIELDS, shared=None, columnar=None):
+    if use_fts is None:
+        use_fts = fts_available()
     plan = plan or {}
     primary = plan.get('primary', {})
     fallback_info = plan.get('fallback', {})
     seen_ids = seen_ids or []
-    
-    def build_query(filters):
-        query = """
+
+    fingerprint = plan_fingerprint(plan)
+    state = decode_cursor(cursor) or {}
+    if state.get('f') != fingerprint:
+        state = {}
+    positions = state.get('t', {})
+    exhausted = set(state.get('x', []))
+    columns, joins = _field_sql(fields)
+
+    def area_clause(area, exclude=False):
+        # Batches resolve each area term once (shared is per batch, see query_properties_batch)
+        if shared is None:
+            return _area_clause(area, exclude=exclude, use_fts=use_fts)
+        key = ('area', area, exclude, use_fts)
+        if key not in shared:
+            shared[key] = _area_clause(area, exclude=exclude, use_fts=use_fts)
+        clause, clause_params = shared[key]
+        return clause, list(clause_params)
+
+    def build_query(filters, tier_rank=0):
+        params = []
+        keywords_match = _keywords_match(filters.get('keywords')) if use_fts else None
+        relevance = keywords_match and filters.get('sort') == 'relevance'
+        sort_expr = "fts.score" if relevance else "p.price"
+
+        query = f"""
             SELECT 
-                p.id, p.title, p.description, p.location, p.price,
-                p.bedrooms, p.bathrooms, p.property_type, p.status,
-                p.built_status, p.source, p.source_url, p.thumbnail,
-                c.name as city_name, a.name as area_name, cat.name as category_name
+                {int(tier_rank)} AS tier_rank, {sort_expr} AS sort_key, p.id, {columns}
             FROM properties p
-            LEFT JOIN cities c ON p.city_id = c.id
-            LEFT JOIN areas a ON p.area_id = a.id
-            LEFT JOIN categories cat ON p.category_id = cat.id
-            WHERE p.status = 'active' AND p.price > 0
+            {joins}
         """
-        params = []
+        if relevance:
+            # bm25() is lower-is-better; title hits weigh most, then location, then description
+            query += """
+            JOIN (
+                SELECT rowid AS fts_id, bm25(properties_fts, 2.0, 1.0, 1.5) AS score
+                FROM properties_fts WHERE properties_fts MATCH ?
+            ) fts ON fts.fts_id = p.id
+            """
+            params.append(keywords_match)
+        query += " WHERE p.status = 'active' AND p.price > 0"
         
+        # City and category names resolve to ids up front (cities via the in-memory resolver,
+        # which also absorbs typos), so the properties side stays on its integer-id indexes.
         if filters.get('category'):
-            query += " AND LOWER(cat.name) = ?"
+            query += " AND p.category_id IN (SELECT id FROM categories WHERE LOWER(name) = ?)"
             params.append(filters['category'].lower())
         
-        if filters.get('beds') is not None:
-            query += " AND p.bedrooms = ?"
-            params.append(str(filters['beds']))
+        beds = normalize_beds(filters.get('beds'))
+        if beds is not None:
+            query += f" AND {search_column('bedrooms_int')} = ?"
+            params.append(beds)
         
         if filters.get('maxPrice'):
             query += " AND p.price <= ?"
@@ -65,150 +564,168 @@ def query_properties(plan=None, page=1, page_size=10, seen_ids=None):
             params.append(float(filters['minPrice']))
         
         if filters.get('city'):
-            query += " AND (LOWER(c.name) = ? OR LOWER(c.name) LIKE ?)"
-            city_val = filters['city'].lower()
-            params.append(city_val)
-            params.append(f"%{city_val}")
+            clause, clause_params = _in_clause("p.city_id", resolver_service.get_resolver().city_ids(filters['city']))
+            query += clause
+            params.extend(clause_params)
         
         if filters.get('area'):
-            query += " AND (LOWER(a.name) LIKE ? OR LOWER(p.location) LIKE ?)"
-            area_val = f"%{filters['area'].lower()}%"
-            params.append(area_val)
-            params.append(area_val)
+            clause, clause_params = area_clause(filters['area'])
+            query += clause
+            params.extend(clause_params)
+
+        if keywords_match and not relevance:
+            query += " AND p.id IN (SELECT rowid FROM properties_fts WHERE properties_fts MATCH ?)"
+            params.append(keywords_match)
+        elif filters.get('keywords') and not use_fts:
+            keywords = filters['keywords']
+            for keyword in ([keywords] if isinstance(keywords, str) else keywords):
+                query += f" AND (LOWER(p.title) LIKE ? OR LOWER(p.description) LIKE ? OR {search_column('location_lc')} LIKE ?)"
+                params.extend([f"%{str(keyword).lower()}%"] * 3)
 
+        # market is 'both' for the cross matches (cheap 'buy' rows read as rentals, and vice versa)
         p_type = (filters.get('propertyType') or filters.get('type', 'buy')).lower()
         if p_type == 'rent':
-            query += " AND (p.property_type = 'rent' OR (p.property_type = 'buy' AND p.price < 200000))"
+            query += f" AND {search_column('market')} IN ('rent', 'both')"
         else:
-            query += " AND (p.property_type = 'buy' OR (p.property_type = 'rent' AND p.price > 2000000))"
+            query += f" AND {search_column('market')} IN ('buy', 'both')"
 
         if filters.get('isResidential', True):
-            query += " AND cat.name IN ('Apartment', 'Villa', 'Townhouse', 'Penthouse', 'Duplex', 'Compound', 'Bungalow', 'Hotel & Hotel Apartment')"
+            query += f" AND {search_column('is_residential')} = 1"
             
         if seen_ids:
+            # Legacy clients still send seen ids; cursor-based clients send none
             placeholders = ', '.join(['?'] * len(seen_ids))
             query += f" AND p.id NOT IN ({placeholders})"
             params.extend(seen_ids)
             
-        return query, params
-
-    # 1. PRIMARY SEARCH
-    query, params = build_query(primary)
-    query += " ORDER BY p.price ASC LIMIT ?"
-    params.append(page_size)
-    
-    rows = execute_query(query, params)
-    results_list = [{"row": r, "exact": True} for r in rows]
-    
-    # 2. STRATEGIC AI FALLBACK (If primary results are low)
-    if len(results_list) < 5 and fallback_info.get('area'):
-        fallback_filters = primary.copy()
-        fallback_filters['area'] = fallback_info['area']
-        
-        f_query, f_params = build_query(fallback_filters)
-        
-        # Exclude what we already found
-        found_ids = [r['row']['id'] for r in results_list] + seen_ids
-        if found_ids:
-            placeholders = ', '.join(['?'] * len(found_ids))
-            f_query += f" AND p.id NOT IN ({placeholders})"
-            f_params.extend(found_ids)
-            
-        f_query += " ORDER BY p.price ASC LIMIT ?"
-        f_params.append(page_size - len(results_list))
-        
-        f_rows = execute_query(f_query, f_params)
-        for r in f_rows:
-            results_list.append({"row": r, "exact": False, "fallbackReason": fallback_info.get('reason')})
+        return query, params, sort_expr
 
-    # 3. GENERIC CITY FALLBACK (If still low)
-    if len(results_list) < 3 and primary.get('city'):
+    # Tiers are made disjoint by predicate (not by id lists), so each one can be
+    # paged independently without re-sending what earlier tiers returned.
+    tiers = [{"key": "primary", "filters": primary, "exclude": [], "exact": True, "reason": None, "min_found": None}]
+    if fallback_info.get('area') and primary.get('area'):
+        # Without a primary area the fallback area is a subset of the primary tier
+        tiers.append({
+            "key": "fallback",
+            "filters": dict(primary, area=fallback_info['area']),
+            "exclude": [primary['area']],
+            "exact": False,
+            "reason": fallback_info.get('reason'),
+            "min_found": 5,
+        })
+    if primary.get('city') and primary.get('area'):
         generic_filters = primary.copy()
         generic_filters.pop('area', None) # Remove area for generic city search
-        
-        g_query, g_params = build_query(generic_filters)
-        found_ids = [r['row']['id'] for r in results_list] + seen_ids
-        if found_ids:
-            placeholders = ', '.join(['?'] * len(found_ids))
-            g_query += f" AND p.id NOT IN ({placeholders})"
-            g_params.extend(found_ids)
-            
-        g_query += " ORDER BY p.price ASC LIMIT ?"
-        g_params.append(page_size - len(results_list))
-        
-        g_rows = execute_query(g_query, g_params)
-        for r in g_rows:
-            results_list.append({"row": r, "exact": False, "fallbackReason": f"More options in {primary['city']}"})
+        tiers.append({
+            "key": "city",
+            "filters": generic_filters,
+            "exclude": [primary['area']] + ([fallback_info['area']] if fallback_info.get('area') else []),
+            "exact": False,
+            "reason": f"More options in {primary['city']}",
+            "min_found": 3,
+        })
 
-    # Process results with insights
-    stats = get_property_stats({'city': primary.get('city'), 'area': primary.get('area')})
-    avg_price = stats['prices']['avg'] if stats else 0
+    # Single round trip: every live tier is a seek-limited sub-select, stitched together
+    # with UNION ALL and ranked by tier. The thin-page thresholds are applied afterwards.
+    live_tiers = [t for t in tiers if t['key'] not in exhausted]
+    selects, params = [], []
+    for rank, tier in enumerate(live_tiers):
+        query, tier_params, sort_expr = build_query(tier['filters'], rank)
+        for area in tier['exclude']:
+            clause, clause_params = area_clause(area, exclude=True)
+            query += clause
+            tier_params.extend(clause_params)
+        if tier['key'] in positions:
+            query += f" AND ({sort_expr}, p.id) > (?, ?)"
+            tier_params.extend(positions[tier['key']])
+        query += f" ORDER BY {sort_expr} ASC, p.id ASC LIMIT ?"
+        tier_params.append(page_size)
+        selects.append(f"SELECT * FROM ({query})")
+        params.extend(tier_params)
 
-    final_results = []
-    for item in results_list:
-        row = item['row']
-        price = float(row['price']) if row['price'] else 0
-        insight = None
-        if avg_price > 0 and price > 0 and item['exact']:
-            diff = ((price - avg_price) / avg_price) * 100
-            if diff < -15: insight = f"Great Deal: {abs(int(diff))}% below avg"
-            elif diff > 15: insight = f"Premium: {int(diff)}% above avg"
+    rows_by_tier = [[] for _ in live_tiers]
+    started = time.perf_counter()
+    snapshot = columnar_service.search_snapshot(live_tiers, use_fts, columnar) if live_tiers else None
+    if snapshot is not None:
+        rows_by_tier = _columnar_rows(snapshot, live_tiers, positions, page_size, seen_ids, columns, joins)
+    elif selects:
+        union_query = " UNION ALL ".join(selects) + " ORDER BY tier_rank, sort_key, id"
+        for r in execute_query(union_query, params):
+            rows_by_tier[r.pop('tier_rank')].append(r)
+    query_seconds = time.perf_counter() - started
 
-        final_results.append({
-            "id": row['id'],
-            "title": row['title'] or 'Untitled',
-            "description": row['description'] or "No description.",
-            "location": row['location'] or row['area_name'] or row['city_name'] or 'Unknown',
-            "price": price,
-            "beds": "Studio" if str(row['bedrooms']) == '0' else (row['bedrooms'] if row['bedrooms'] and str(row['bedrooms']).lower() != 'none' else 'N/A'),
-            "baths": row['bathrooms'] or 'N/A',
-            "area": row['area_name'] or row['city_name'] or 'N/A',
-            "city": row['city_name'] or 'N/A',
-            "type": row['property_type'] or 'buy',
-            "thumbnail": row['thumbnail'],
-            "source": row['source'],
-            "sourceUrl": row['source_url'],
-            "priceInsight": insight,
-            "isExactMatch": item['exact'],
-            "fallbackReason": item.get('fallbackReason')
-        })
-    
-    return {"results": final_results, "isFallback": any(not r['isExactMatch'] for r in final_results)}
+    results_list = []
+    for tier, rows in zip(live_tiers, rows_by_tier):
+        # Fallback tiers only kick in when the page is still thin (same thresholds as before)
+        if tier['min_found'] is not None and len(results_list) >= tier['min_found']:
+            continue
+        taken = rows[:page_size - len(results_list)]
+        for r in taken:
+            results_list.append({"row": r, "exact": tier['exact'], "fallbackReason": tier['reason']})
+        if taken:
+            positions[tier['key']] = [taken[-1]['sort_key'], taken[-1]['id']]
+        if len(taken) == len(rows) and len(rows) < page_size:
+            exhausted.add(tier['key'])
+
+    has_more = any(t['key'] not in exhausted for t in tiers)
+    next_cursor = encode_cursor({"f": fingerprint, "t": positions, "x": sorted(exhausted)}) if has_more else None
 
-    # Stats
-    stats_filters = {'city': filters.get('city'), 'area': filters.get('area')}
-    stats = get_property_stats(stats_filters)
-    avg_price = stats['prices']['avg'] if stats else 0
+    # Price insights: each listing's percentile among comparable listings, ranked in
+    # memory by pricing_service. Before the first market_stats refresh they fall back
+    # to comparing prices with the city/area average.
+    started = time.perf_counter()
+    price_ranks = [None] * len(results_list)
+    avg_price = 0
+    if 'priceInsight' in fields or 'pricePercentile' in fields:
+        segments = pricing_service.get_segments()
+        if segments:
+            price_ranks = pricing_service.price_positions([item['row'] for item in results_list], segments)
+        elif snapshot is not None:
+            # Segment averages come from the same column arrays as the page
+            avg_price = snapshot.segment_avg(primary.get('city'), primary.get('area'))
+        else:
+            stats_scope = {'city': primary.get('city'), 'area': primary.get('area')}
+            stats_key = ('stats', stats_scope['city'], stats_scope['area'])
+            if shared is not None and stats_key in shared:
+                stats = shared[stats_key]
+            else:
+                stats = get_property_stats(stats_scope)
+                if shared is not None:
+                    shared[stats_key] = stats
+            avg_price = stats['prices']['avg'] if stats else 0
+    insights_seconds = time.perf_counter() - started
+    PHASE_SECONDS.observe(query_seconds, 'db', 'search_columnar' if snapshot is not None else 'search_query')
+    PHASE_SECONDS.observe(insights_seconds, 'db', 'search_insights')
 
     final_results = []
-    for item in results_list:
+    for item, rank in zip(results_list, price_ranks):
         row = item['row']
         price = float(row['price']) if row['price'] else 0
-        insight = None
-        if avg_price > 0 and price > 0 and item['exact']:
+        insight, percentile = None, None
+        if rank:
+            percentile = round(rank[0])
+            if item['exact']:
+                insight = pricing_service.insight_label(*rank)
+        elif avg_price > 0 and price > 0 and item['exact']:
             diff = ((price - avg_price) / avg_price) * 100
             if diff < -15: insight = f"Great Deal: {abs(int(diff))}% below avg"
             elif diff > 15: insight = f"Premium: {int(diff)}% above avg"
 
-        final_results.append({
-            "id": row['id'],
-            "title": row['title'] or 'Untitled',
-            "description": row['description'] or "No description.",
-            "location": row['location'] or row['area_name'] or row['city_name'] or 'Unknown',
-            "price": price,
-            "beds": "Studio" if str(row['bedrooms']) == '0' else (row['bedrooms'] if row['bedrooms'] and str(row['bedrooms']).lower() != 'none' else 'N/A'),
-            "baths": row['bathrooms'] or 'N/A',
-            "area": row['area_name'] or row['city_name'] or 'N/A',
-            "city": row['city_name'] or 'N/A',
-            "type": row['property_type'] or 'buy',
-            "thumbnail": row['thumbnail'],
-            "source": row['source'],
-            "sourceUrl": row['source_url'],
-            "priceInsight": insight,
-            "isExactMatch": item['exact']
-        })
+        final_results.append(_format_result(row, fields, insight, item['exact'], item.get('fallbackReason'), percentile))
     
-    return {"results": final_results, "isFallback": is_fallback, "isSupplemented": len(final_results) > len(rows)}
+    return {
+        "results": final_results,
+        "isFallback": any(not item['exact'] for item in results_list),
+        "nextCursor": next_cursor,
+        "hasMore": has_more,
+        # All tiers share one statement, so the query time covers them together; rows are per tier
+        "timing": {
+            "query": round(query_seconds * 1000, 2),
+            "insights": round(insights_seconds * 1000, 2),
+            "tierRows": {tier['key']: len(rows) for tier, rows in zip(live_tiers, rows_by_tier)},
+            "engine": "columnar" if snapshot is not None else "sql",
+        }
+    }
 
 from .cache_service import CACHE
 
@@ -235,16 +752,77 @@ def calculate_results_stats(results, area_name="This Selection"):
         }
     }
 
+def _text_only_area_matches(area, area_ids):
+    """Whether the free-text location match of _area_clause adds active listings outside area_ids."""
+    clause, params = _area_clause(area)
+    placeholders = ', '.join(['?'] * len(area_ids))
+    rows = execute_query(
+        f"SELECT 1 FROM properties p WHERE p.price > 0 AND p.status = 'active'{clause} "
+        f"AND IFNULL(p.area_id NOT IN ({placeholders}), 1) LIMIT 1",
+        params + list(area_ids),
+    )
+    return bool(rows)
+
+def _materialized_stats(filters):
+    """Returns (handled, stats) from the market_stats rollups. handled is False when the
+    filters need the live query: the rollups group by area_id, so an area whose free-text
+    location also matches listings outside its ids is aggregated live, like search matches it."""
+    city_ids = resolver_service.get_resolver().city_ids(filters['city'], exact=True) if filters.get('city') else None
+    area_ids = resolver_service.get_resolver().area_ids(filters['area']) if filters.get('area') else None
+    if area_ids == [] or (area_ids and _text_only_area_matches(filters['area'], area_ids)):
+        return False, None
+
+    summary = stats_service.lookup_market_stats(city_ids, area_ids)
+    if not summary or not summary['listings']:
+        return True, None
+
+    result = {
+        "area": filters.get('area') or filters.get('city') or "All UAE",
+        "is_market_based": True,
+        "counts": {
+            "total": summary['listings'],
+            "active": summary['listings']
+        },
+        "prices": {
+            "min": float(summary['min_price']),
+            "max": float(summary['max_price']),
+            "avg": summary['sum_price'] / summary['listings'],
+            "total_value": float(summary['sum_price']),
+            "p25": summary['p25'],
+            "median": summary['median'],
+            "p75": summary['p75'],
+            "p90": summary['p90']
+        }
+    }
+    if not filters.get('city') and not filters.get('area'):
+        result["city_breakdown"] = stats_service.city_breakdown(limit=5)
+    return True, result
+
 def get_property_stats(filters=None):
     filters = filters or {}
-    
-    # Try cache first
-    cache_key = f"stats_{filters.get('city')}_{filters.get('area')}"
+
+    # Materialized stats are keyed by their refresh version, so cached entries never go stale
+    version = stats_service.stats_version()
+    cache_key = f"stats_{filters.get('city')}_{filters.get('area')}" + (f"_v{version}" if version else "")
     cached_stats = CACHE.get(cache_key)
     if cached_stats:
         return cached_stats
 
-    # Optimization: Use a faster join instead of subqueries in WHERE
+    # Concurrent misses for the same key compute once
+    return STATS_FLIGHT.do(cache_key, _compute_property_stats, filters, version, cache_key)
+
+def _compute_property_stats(filters, version, cache_key):
+    if version:
+        started = time.perf_counter()
+        handled, result = _materialized_stats(filters)
+        PHASE_SECONDS.observe(time.perf_counter() - started, 'db', 'stats_materialized')
+        if handled:
+            if result:
+                CACHE.set(cache_key, result, ttl=24 * 3600)
+            return result
+
+    # Live aggregate (before the first refresh_market_stats, or for free-text-only areas).
+    # No joins: area and city both resolve to ids
     query = """
         SELECT 
             COUNT(*) as total,
@@ -253,24 +831,24 @@ def get_property_stats(filters=None):
             AVG(p.price) as avg_price,
             SUM(p.price) as total_valuation
         FROM properties p
-        LEFT JOIN areas a ON p.area_id = a.id
-        LEFT JOIN cities c ON p.city_id = c.id
         WHERE p.price > 0 AND p.status = 'active'
     """
     
     params = []
     
     if filters.get('area'):
-        query += " AND (p.location LIKE ? OR a.name LIKE ?)"
-        area_val = f"%{filters['area']}%"
-        params.append(area_val)
-        params.append(area_val)
+        clause, clause_params = _area_clause(filters['area'])
+        query += clause
+        params.extend(clause_params)
     
     if filters.get('city'):
-        query += " AND LOWER(c.name) = ?"
-        params.append(filters['city'].lower())
+        clause, clause_params = _in_clause("p.city_id", resolver_service.get_resolver().city_ids(filters['city'], exact=True))
+        query += clause
+        params.extend(clause_params)
     
+    started = time.perf_counter()
     rows = execute_query(query, params)
+    PHASE_SECONDS.observe(time.perf_counter() - started, 'db', 'stats_live')
     row = rows[0] if rows else {}
     
     if not row or not row.get('total'):
@@ -0,0 +1,199 @@
+import re
+import json
+import time
+import uuid
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .query_parser_service import parse_query, extract_filters
+
+# Local stand-in for the OpenAI chat completions API, for load tests that should not
+# spend quota or depend on the network. Point the app at it with
+#   OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+# JSON-mode requests (the search architect) get a valid intent/searchPlan built by the
+# local query parser; everything else gets filler narrative, streamed when asked.
+
+GREETING_WORDS = {'hi', 'hello', 'hey', 'thanks', 'thank', 'who', 'name'}
+NARRATIVE = (
+    "Based on the current listings, this search returns a balanced mix of options. The strongest "
+    "matches sit close to the median asking price for the area, while the premium units add views "
+    "and upgraded finishes. Rental demand here remains steady, and well priced homes tend to move "
+    "quickly, so shortlisting two or three options and arranging viewings early is advisable. "
+)
+
+class FakeOpenAI:
+    """
+    Response shaping for the stand-in. Every call waits `latency` seconds (+/- `jitter`)
+    before its first byte, then produces completion tokens at `tokens_per_second`;
+    streamed replies send `chunk_tokens` tokens per SSE chunk. `error_rate` of the
+    calls fail with a 429, which the OpenAI client retries like a real rate limit.
+    """
+
+    def __init__(self, latency=0.4, jitter=0.1, tokens_per_second=60.0, narrative_tokens=120, chunk_tokens=1, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.narrative_tokens = narrative_tokens
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = {"intent": 0, "stream": 0, "text": 0, "errors": 0}
+
+    def _random(self):
+        with self._lock:
+            return self._rng.random()
+
+    def first_byte_delay(self):
+        return max(0.0, self.latency + (self._random() * 2 - 1) * self.jitter)
+
+    def token_delay(self, tokens=1):
+        return tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def should_fail(self):
+        return self.error_rate > 0 and self._random() < self.error_rate
+
+    def count(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+
+    def intent(self, message):
+        """A searchPlan for the message in the shape the real architect prompt asks for."""
+        words = set(re.findall(r'[a-z]+', str(message or '').lower()))
+        try:
+            intent = parse_query(message)
+        except Exception:
+            intent = None
+        primary = intent['searchPlan']['primary'] if intent else {}
+        if not (primary.get('city') or primary.get('area')):
+            if words & GREETING_WORDS:
+                return {"thought": "Stand-in: greeting.", "type": "info", "response": "Hello! I can help you search UAE properties.", "wantsTable": False}
+            # No place named: search Dubai with whatever filters the message has
+            intent = {"type": "search", "searchPlan": {"primary": dict(extract_filters(message), city='Dubai')}, "wantsTable": False}
+        intent.pop('confidence', None)
+        intent['thought'] = "Stand-in plan from the local parser."
+        intent['response'] = "Here is the market overview." if intent['type'] == 'stats' else "Searching now."
+        return intent
+
+    def narrative(self):
+        """Filler completion tokens ('word' plus leading space, like the real tokenizer)."""
+        words = NARRATIVE.split()
+        return [(' ' if i else '') + words[i % len(words)] for i in range(self.narrative_tokens)]
+
+
+def _completion(model, content, prompt_tokens, completion_tokens):
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+def _chunk(completion_id, model, delta, finish_reason=None):
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+def make_handler(fake, verbose=False):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            if verbose:
+                super().log_message(format, *args)
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _write_chunk(self, data):
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path.rstrip('/').endswith('/models'):
+                self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model", "owned_by": "houser"}]})
+            else:
+                self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+        def do_POST(self):
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self._send_json(404, {"error": {"message": f"Unknown endpoint {self.path}", "type": "invalid_request_error"}})
+                return
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                request = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                self._send_json(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+                return
+
+            time.sleep(fake.first_byte_delay())
+            if fake.should_fail():
+                fake.count('errors')
+                self._send_json(429, {"error": {"message": "Rate limit reached (stand-in)", "type": "rate_limit_error", "code": "rate_limit_exceeded"}})
+                return
+
+            model = request.get('model', 'fake-model')
+            messages = request.get('messages') or []
+            prompt_tokens = sum(len(str(m.get('content', ''))) for m in messages) // 4
+            user_message = next((m.get('content', '') for m in reversed(messages) if m.get('role') == 'user'), '')
+
+            if (request.get('response_format') or {}).get('type') == 'json_object':
+                fake.count('intent')
+                content = json.dumps(fake.intent(user_message))
+                completion_tokens = len(content) // 4
+                time.sleep(fake.token_delay(completion_tokens))
+                self._send_json(200, _completion(model, content, prompt_tokens, completion_tokens))
+            elif request.get('stream'):
+                fake.count('stream')
+                self._stream(model, fake.narrative())
+            else:
+                fake.count('text')
+                tokens = fake.narrative()[:min(fake.narrative_tokens, 30)]
+                time.sleep(fake.token_delay(len(tokens)))
+                self._send_json(200, _completion(model, ''.join(tokens), prompt_tokens, len(tokens)))
+
+        def _stream(self, model, tokens):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+            events = [_chunk(completion_id, model, {"role": "assistant", "content": ""})]
+            for i in range(0, len(tokens), fake.chunk_tokens):
+                events.append(_chunk(completion_id, model, {"content": ''.join(tokens[i:i + fake.chunk_tokens])}))
+            events.append(_chunk(completion_id, model, {}, finish_reason="stop"))
+            try:
+                for i, event in enumerate(events):
+                    if 0 < i < len(events) - 1:
+                        time.sleep(fake.token_delay(fake.chunk_tokens))
+                    self._write_chunk(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # The app closed the stream early (client went away)
+                self.close_connection = True
+
+    return Handler
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open many connections at once
+    request_queue_size = 256
+
+def make_server(fake, host='127.0.0.1', port=8765, verbose=False):
+    """A threaded HTTP server for `fake`; call serve_forever() on it."""
+    return _Server((host, port), make_handler(fake, verbose=verbose))
@@ -0,0 +1,383 @@
+import io
+import re
+import csv
+import gzip
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from . import db_service, stats_service, trend_service
+from .resolver_service import normalize_place
+
+# Properties columns a feed record can set; source_url is the match key
+COLUMNS = (
+    'title', 'description', 'location', 'price', 'bedrooms', 'bathrooms', 'amenities', 'nearby',
+    'source', 'thumbnail', 'property_type', 'status', 'built_status',
+    'country_id', 'city_id', 'area_id', 'category_id',
+)
+RENT_TYPES = {'rent', 'rental', 'lease', 'for rent', 'to rent'}
+BUY_TYPES = {'buy', 'sale', 'sell', 'for sale', 'resale', 'off-plan', 'offplan'}
+# Index kept through full loads: the upsert looks rows up by it
+MATCH_INDEX = 'idx_properties_source_url'
+# Refuse to deactivate more than this share of a source's active listings in one run
+MAX_DEACTIVATE_RATIO = 0.3
+
+# --- Feed readers ---------------------------------------------------------------
+
+def _open_text(path):
+    path = Path(path)
+    if path.suffix == '.gz':
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8-sig')
+    return open(path, encoding='utf-8-sig', newline='')
+
+def feed_format(path):
+    """'csv', 'jsonl' or 'json' from the file name (a trailing .gz is ignored)."""
+    name = Path(path).name.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return 'json'
+
+def _iter_json_array(f, chunk_size=1 << 16):
+    """Streams the objects of a top-level JSON array (or a single object) without loading the file."""
+    decoder = json.JSONDecoder()
+    buffer, pos, started = '', 0, False
+    while True:
+        chunk = f.read(chunk_size)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        while True:
+            while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ','):
+                pos += 1
+            if not started and pos < len(buffer):
+                if buffer[pos] == '[':
+                    pos += 1
+                started = True
+                continue
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if not chunk:
+                    if buffer[pos:].strip():
+                        raise ValueError("Feed ends with a truncated JSON record.")
+                    return
+                break
+            yield obj
+            pos = end
+        if not chunk:
+            return
+
+def read_feed(path, fmt=None):
+    """Yields feed records (dicts) from a CSV, JSON array or JSON Lines file, optionally gzipped."""
+    fmt = fmt or feed_format(path)
+    with _open_text(path) as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        elif fmt == 'jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _iter_json_array(f)
+
+def chunked(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# --- Record normalization --------------------------------------------------------
+
+class Lookups:
+    """Name -> id maps for cities, areas and categories, keyed by normalize_place()."""
+
+    def __init__(self, conn):
+        self.cities, self.city_countries = {}, {}
+        for row in conn.execute("SELECT id, name, country_id FROM cities ORDER BY id"):
+            self.cities.setdefault(normalize_place(row['name']), row['id'])
+            self.city_countries[row['id']] = row['country_id']
+        self.areas = {}
+        for row in conn.execute("SELECT id, name, city_id FROM areas ORDER BY id"):
+            self.areas.setdefault(normalize_place(row['name']), []).append((row['id'], row['city_id']))
+        self.categories = {}
+        for row in conn.execute("SELECT id, name FROM categories ORDER BY id"):
+            self.categories.setdefault(normalize_place(row['name']), row['id'])
+        self.unresolved = {"city": 0, "area": 0, "category": 0}
+
+    def city(self, name):
+        return self.cities.get(normalize_place(name)) if name else None
+
+    def area(self, name, city_id=None):
+        matches = self.areas.get(normalize_place(name), []) if name else []
+        for area_id, area_city in matches:
+            if city_id is None or area_city == city_id:
+                return area_id, area_city
+        return (matches[0] if matches else (None, None))
+
+    def category(self, name):
+        return self.categories.get(normalize_place(name)) if name else None
+
+def _text(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    value = str(value).strip()
+    return value or None
+
+def _int(value):
+    try:
+        return int(float(value)) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+def parse_price(value):
+    """1200000, '1,200,000', 'AED 85,000/yr' -> float; anything unparseable -> 0."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r'\d[\d,]*(?:\.\d+)?', str(value or ''))
+    return float(match.group(0).replace(',', '')) if match else 0.0
+
+def _bedrooms(value):
+    text = _text(value)
+    if text is None:
+        return None
+    if text.lower() in ('studio', '0'):
+        return 'Studio'
+    number = _int(text)
+    return str(number) if number is not None else text
+
+def _property_type(value):
+    text = (_text(value) or '').lower()
+    if text in RENT_TYPES:
+        return 'rent'
+    if text in BUY_TYPES:
+        return 'buy'
+    return text or None
+
+def normalize_record(record, lookups, default_source=None):
+    """(source_url, {column: value}) for one feed record, or None when it has no source_url.
+    Place and category names resolve to ids; explicit *_id fields win."""
+    source_url = _text(record.get('source_url') or record.get('url'))
+    if not source_url:
+        return None
+
+    city_id = _int(record.get('city_id')) or lookups.city(record.get('city'))
+    area_id = _int(record.get('area_id'))
+    if not area_id and record.get('area'):
+        area_id, area_city = lookups.area(record.get('area'), city_id)
+        city_id = city_id or area_city
+    category_id = _int(record.get('category_id')) or lookups.category(record.get('category'))
+    for kind, name, resolved in (('city', record.get('city'), city_id), ('area', record.get('area'), area_id), ('category', record.get('category'), category_id)):
+        if name and not resolved:
+            lookups.unresolved[kind] += 1
+
+    values = {
+        'title': _text(record.get('title')),
+        'description': _text(record.get('description')),
+        'location': _text(record.get('location')) or ', '.join(x for x in (_text(record.get('area')), _text(record.get('city'))) if x) or None,
+        'price': parse_price(record.get('price')),
+        'bedrooms': _bedrooms(record.get('bedrooms', record.get('beds'))),
+        'bathrooms': _text(record.get('bathrooms', record.get('baths'))),
+        'amenities': _text(record.get('amenities')),
+        'nearby': _text(record.get('nearby')),
+        'source': _text(record.get('source')) or default_source,
+        'thumbnail': _text(record.get('thumbnail')),
+        'property_type': _property_type(record.get('property_type', record.get('type'))),
+        'status': (_text(record.get('status')) or 'active').lower(),
+        'built_status': _text(record.get('built_status')),
+        'country_id': _int(record.get('country_id')) or lookups.city_countries.get(city_id),
+        'city_id': city_id,
+        'area_id': area_id,
+        'category_id': category_id,
+    }
+    return source_url, values
+
+# --- Deferred indexes ------------------------------------------------------------
+
+def restore_deferred_indexes(conn, log=print):
+    """Recreates indexes parked by defer_indexes() (also recovers from an interrupted full load)."""
+    rows = conn.execute("SELECT name, sql FROM ingest_deferred_indexes ORDER BY name").fetchall()
+    for row in rows:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (row['name'],)).fetchone():
+            log(f"Rebuilding index {row['name']}...")
+            conn.execute(row['sql'])
+        conn.execute("DELETE FROM ingest_deferred_indexes WHERE name = ?", (row['name'],))
+        conn.commit()
+    return [row['name'] for row in rows]
+
+def defer_indexes(conn, log=print):
+    """Drops the secondary properties indexes for a full load, remembering how to rebuild them."""
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'properties' AND sql IS NOT NULL AND name != ?",
+        (MATCH_INDEX,),
+    ).fetchall()
+    conn.execute("BEGIN IMMEDIATE")
+    for row in rows:
+        conn.execute("INSERT OR REPLACE INTO ingest_deferred_indexes (name, sql) VALUES (?, ?)", (row['name'], row['sql']))
+        conn.execute(f'DROP INDEX IF EXISTS "{row["name"]}"')
+    conn.commit()
+    log(f"Deferred {len(rows)} index(es) until the load completes.")
+    return [row['name'] for row in rows]
+
+# --- Ingestion -------------------------------------------------------------------
+
+def _upsert_chunk(conn, chunk, now, summary):
+    """Inserts new listings and rewrites changed ones; unchanged rows are not touched,
+    so their FTS entries and market-stats segments stay clean."""
+    by_url = {}
+    for source_url, values in chunk:
+        by_url[source_url] = values  # last one wins within a chunk
+
+    conn.execute("DELETE FROM temp.ingest_batch")
+    conn.executemany("INSERT INTO temp.ingest_batch (source_url) VALUES (?)", [(url,) for url in by_url])
+    conn.execute("INSERT OR IGNORE INTO temp.ingest_seen (source_url) SELECT source_url FROM temp.ingest_batch")
+
+    existing = {}
+    for row in conn.execute(
+        f"SELECT p.id, p.source_url, {', '.join('p.' + c for c in COLUMNS)} FROM properties p "
+        "JOIN temp.ingest_batch b ON b.source_url = p.source_url"
+    ):
+        existing.setdefault(row['source_url'], []).append(row)
+
+    inserts, updates = [], []
+    for source_url, values in by_url.items():
+        new = tuple(values[c] for c in COLUMNS)
+        rows = existing.get(source_url)
+        if not rows:
+            inserts.append(new + (source_url, now, now))
+            continue
+        for row in rows:
+            if tuple(row[c] for c in COLUMNS) != new:
+                updates.append(new + (now, row['id']))
+            else:
+                summary['unchanged'] += 1
+
+    if inserts:
+        conn.executemany(
+            f"INSERT INTO properties ({', '.join(COLUMNS)}, source_url, created_at, updated_at) "
+            f"VALUES ({', '.join(['?'] * (len(COLUMNS) + 3))})",
+            inserts,
+        )
+    if updates:
+        conn.executemany(
+            f"UPDATE properties SET {', '.join(c + ' = ?' for c in COLUMNS)}, updated_at = ? WHERE id = ?",
+            updates,
+        )
+    summary['inserted'] += len(inserts)
+    summary['updated'] += len(updates)
+
+def deactivate_missing(conn, sources, now, max_ratio=MAX_DEACTIVATE_RATIO, log=print):
+    """Marks active listings of `sources` that were not in this feed as inactive.
+    A source losing more than `max_ratio` of its listings is left alone (likely a truncated feed)."""
+    deactivated = 0
+    for source in sorted(sources):
+        active = conn.execute("SELECT COUNT(*) FROM properties WHERE source = ? AND status = 'active'", (source,)).fetchone()[0]
+        missing = conn.execute(
+            "SELECT COUNT(*) FROM properties WHERE source = ? AND status = 'active' "
+            "AND source_url NOT IN (SELECT source_url FROM temp.ingest_seen)",
+            (source,),
+        ).fetchone()[0]
+        if not missing:
+            continue
+        if max_ratio is not None and active and missing / active > max_ratio:
+            log(f"Not deactivating {missing:,} of {active:,} {source} listings (over {max_ratio:.0%}); pass a higher --max-deactivate-ratio if the feed is complete.")
+            continue
+        conn.execute(
+            "UPDATE properties SET status = 'inactive', updated_at = ? WHERE source = ? AND status = 'active' "
+            "AND source_url NOT IN (SELECT source_url FROM temp.ingest_seen)",
+            (now, source),
+        )
+        log(f"Deactivated {missing:,} {source} listing(s) missing from the feed.")
+        deactivated += missing
+    return deactivated
+
+def ingest_feeds(paths, fmt=None, default_source=None, full=False, mark_missing=False, batch_size=5000,
+                 commit_every=50000, max_deactivate_ratio=MAX_DEACTIVATE_RATIO, refresh_stats=True, log=print):
+    """
+    Streams listing feeds into properties, upserting by source_url.
+
+    Records are written in batches of `batch_size` with executemany, inside transactions of
+    about `commit_every` rows. In WAL mode readers keep reading the last committed state
+    throughout. With `full`, the secondary indexes are dropped for the load and rebuilt
+    once at the end (the source_url index stays), and missing listings are deactivated.
+    Market stats are refreshed afterwards: incrementally, or fully after a full load;
+    price trends only recompute the weeks/months the load touched.
+    Returns a summary dict.
+    """
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    summary = {"read": 0, "skipped": 0, "inserted": 0, "updated": 0, "unchanged": 0, "deactivated": 0}
+    sources = set()
+
+    conn = db_service.get_write_connection()
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (MATCH_INDEX,)).fetchone():
+            raise RuntimeError("The ingest migration (0004) is missing; run `python manage.py migrate_houser_db` first.")
+        # NORMAL is durable enough in WAL mode and avoids an fsync per commit
+        conn.execute("PRAGMA synchronous = NORMAL")
+        restore_deferred_indexes(conn, log=log)
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS ingest_batch (source_url TEXT PRIMARY KEY)")
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS ingest_seen (source_url TEXT PRIMARY KEY)")
+        conn.commit()
+        lookups = Lookups(conn)
+
+        deferred = defer_indexes(conn, log=log) if full else []
+        try:
+            pending = 0
+            conn.execute("BEGIN IMMEDIATE")
+            for path in paths:
+                log(f"Reading {path}...")
+                for records in chunked(read_feed(path, fmt), batch_size):
+                    chunk = []
+                    for record in records:
+                        summary['read'] += 1
+                        normalized = normalize_record(record, lookups, default_source) if isinstance(record, dict) else None
+                        if normalized is None:
+                            summary['skipped'] += 1
+                            continue
+                        chunk.append(normalized)
+                        if normalized[1]['source']:
+                            sources.add(normalized[1]['source'])
+                    _upsert_chunk(conn, chunk, now, summary)
+                    pending += len(records)
+                    if pending >= commit_every:
+                        conn.commit()
+                        pending = 0
+                        log(f"  {summary['read']:,} read: {summary['inserted']:,} new, {summary['updated']:,} changed, {summary['unchanged']:,} unchanged")
+                        conn.execute("BEGIN IMMEDIATE")
+
+            if full or mark_missing:
+                summary['deactivated'] = deactivate_missing(conn, sources, now, max_ratio=max_deactivate_ratio, log=log)
+            conn.commit()
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            if deferred:
+                # Rebuilt even when the load failed, so readers are not left without indexes
+                restore_deferred_indexes(conn, log=log)
+                conn.execute("ANALYZE")
+                conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        summary['unresolved'] = dict(lookups.unresolved)
+    finally:
+        conn.close()
+
+    if refresh_stats and db_service.table_exists('market_stats'):
+        summary['marketStats'] = stats_service.refresh_market_stats(full=full, log=log)
+    if refresh_stats and db_service.table_exists('market_trends'):
+        summary['marketTrends'] = trend_service.refresh_market_trends(log=log)
+    summary['seconds'] = round(time.perf_counter() - started, 2)
+    return summary
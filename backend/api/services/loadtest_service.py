@@ -0,0 +1,160 @@
+import json
+import time
+import itertools
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from http.client import HTTPConnection, HTTPSConnection
+from concurrent.futures import ThreadPoolExecutor
+
+from .benchmark_service import percentile
+
+# A mix of turns: some the local parser answers, some that need the LLM architect
+DEFAULT_MESSAGES = (
+    "2 bed apartment in Dubai Marina under 150k rent",
+    "average rent in JVC",
+    "villas for sale in Dubai Hills Estate",
+    "studio in Business Bay for rent",
+    "something affordable near the metro for a young family",
+    "compare Palm Jumeirah and Downtown for investment",
+    "hello, who are you?",
+    "3 bedroom townhouse in Arabian Ranches under 4m",
+)
+
+def stream_chat(base_url, message, context=None, timeout=60.0):
+    """
+    Sends one /api/chat request and reads the SSE stream to the end. Returns a sample
+    with times in ms from the request start: firstEvent (first `data:` frame),
+    firstToken (first text_chunk), total (stream closed), plus the server's own
+    phase timings when it sends a 'timing' event.
+    """
+    url = urlsplit(base_url)
+    connection_class = HTTPSConnection if url.scheme == 'https' else HTTPConnection
+    conn = connection_class(url.hostname, url.port, timeout=timeout)
+    sample = {"message": message, "status": None, "firstEvent": None, "firstToken": None, "total": None, "events": 0, "error": None}
+    body = json.dumps({"message": message, "context": context or {}})
+    started = time.perf_counter()
+    try:
+        conn.request('POST', url.path.rstrip('/') + '/api/chat', body=body, headers={
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream',
+        })
+        response = conn.getresponse()
+        sample['status'] = response.status
+        if response.status != 200:
+            response.read()
+            sample['error'] = f"HTTP {response.status}"
+            return sample
+        for line in response:
+            if not line.startswith(b'data: '):
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            event = json.loads(line[6:])
+            sample['events'] += 1
+            if sample['firstEvent'] is None:
+                sample['firstEvent'] = elapsed
+            if event.get('type') == 'text_chunk' and sample['firstToken'] is None:
+                sample['firstToken'] = elapsed
+            elif event.get('type') == 'error':
+                sample['error'] = str(event.get('response') or 'error event')[:200]
+            elif event.get('type') == 'timing':
+                sample['server'] = event.get('phases')
+        sample['total'] = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        sample['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        conn.close()
+    return sample
+
+def _distribution(values):
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+    return {
+        "p50": round(percentile(values, 0.5), 1),
+        "p95": round(percentile(values, 0.95), 1),
+        "p99": round(percentile(values, 0.99), 1),
+        "max": round(values[-1], 1),
+    }
+
+def summarize(samples, concurrency, wall_seconds):
+    """Latency distributions and error counts for one concurrency level."""
+    errors = [s for s in samples if s['error']]
+    kinds = {}
+    for sample in errors:
+        kinds[sample['error']] = kinds.get(sample['error'], 0) + 1
+    ok = [s for s in samples if not s['error']]
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": len(errors),
+        "errorRate": round(len(errors) / len(samples), 4) if samples else 0.0,
+        # Completed streams per second; failed requests are often fast and would inflate it
+        "throughput": round(len(ok) / wall_seconds, 2) if wall_seconds else 0.0,
+        "firstEvent": _distribution(s['firstEvent'] for s in ok),
+        "firstToken": _distribution(s['firstToken'] for s in ok),
+        "total": _distribution(s['total'] for s in ok),
+        "topErrors": sorted(kinds.items(), key=lambda kv: -kv[1])[:5],
+    }
+
+def run_level(base_url, concurrency, requests, messages, unique=False, timeout=60.0):
+    """Runs `requests` chat streams with `concurrency` in flight at a time; returns (samples, wall seconds)."""
+    counter = itertools.count()
+    lock = threading.Lock()
+    samples = []
+
+    def worker():
+        while True:
+            with lock:
+                n = next(counter)
+            if n >= requests:
+                return
+            message = messages[n % len(messages)]
+            if unique:
+                message = f"{message} (request {n} {time.time_ns()})"
+            sample = stream_chat(base_url, message, timeout=timeout)
+            with lock:
+                samples.append(sample)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='houser-load') as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    return samples, time.perf_counter() - started
+
+def run_load_test(base_url, levels, requests_per_level, messages=DEFAULT_MESSAGES, unique=False, timeout=60.0, log=print):
+    """
+    Steps through the concurrency `levels` and returns a JSON-ready report. Throughput
+    that stops growing while latency keeps rising marks the saturation point of the
+    server's worker/executor model; `saturatedAt` is the first level that added
+    less than 10% throughput over the previous one.
+    """
+    report = {
+        "meta": {
+            "startedAt": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "url": base_url,
+            "levels": list(levels),
+            "requestsPerLevel": requests_per_level,
+            "messages": list(messages),
+            "unique": unique,
+        },
+        "levels": [],
+        "saturatedAt": None,
+    }
+    log(f"{'conc':>5} {'req':>5} {'err':>4} {'rps':>7} | {'first event p50/p95':>20} | {'first token p50/p95':>20} | {'total p50/p95':>20}")
+    for concurrency in levels:
+        samples, wall = run_level(base_url, concurrency, requests_per_level, messages, unique=unique, timeout=timeout)
+        level = summarize(samples, concurrency, wall)
+        report['levels'].append(level)
+
+        def pair(dist):
+            return f"{dist['p50']:>9.0f}/{dist['p95']:<9.0f}" if dist else f"{'-':>20}"
+        log(f"{concurrency:>5} {level['requests']:>5} {level['errors']:>4} {level['throughput']:>7.2f} | "
+            f"{pair(level['firstEvent'])} ms | {pair(level['firstToken'])} ms | {pair(level['total'])} ms")
+        for error, count in level['topErrors']:
+            log(f"        {count} x {error}")
+
+        previous = report['levels'][-2] if len(report['levels']) > 1 else None
+        if report['saturatedAt'] is None and previous and previous['throughput'] and level['throughput'] < previous['throughput'] * 1.1:
+            report['saturatedAt'] = concurrency
+    return report
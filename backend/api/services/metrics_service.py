@@ -0,0 +1,159 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Latency buckets in seconds: SQLite phases land in the low ones, LLM phases in the high ones
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _labels(names, values):
+    return ','.join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+
+class Histogram:
+    """Minimal thread-safe Prometheus-style histogram with a fixed label set."""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                base = _labels(self.label_names, labels)
+                for bound, count in zip(self.buckets, series['buckets']):
+                    lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {series["count"]}')
+                lines.append(f"{self.name}_sum{{{base}}} {series['sum']:.6f}")
+                lines.append(f"{self.name}_count{{{base}}} {series['count']}")
+        return lines
+
+class Counter:
+    """Monotonic counter with a fixed label set."""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{{{_labels(self.label_names, labels)}}} {value}")
+        return lines
+
+PHASE_SECONDS = Histogram('houser_phase_seconds', 'Latency of each request phase in seconds.', ('endpoint', 'phase'))
+INTENT_SOURCE = Counter('houser_intent_source_total', 'Chat turns by where the plan came from.', ('source',))
+SPECULATION = Counter('houser_speculative_prefetch_total', 'Speculative chat prefetches by outcome.', ('result',))
+
+@contextmanager
+def timed(endpoint, phase):
+    """Observes the duration of the block into PHASE_SECONDS."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_SECONDS.observe(time.perf_counter() - start, endpoint, phase)
+
+
+class RequestTimer:
+    """
+    Per-request phase timings. Phases accumulate (a phase entered twice adds up);
+    marks record the first time something happened, relative to the request start.
+    finish() feeds everything into PHASE_SECONDS and returns the timings in ms.
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.marks = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.start
+
+    def finish(self):
+        total = time.perf_counter() - self.start
+        for name, seconds in list(self.phases.items()) + list(self.marks.items()):
+            PHASE_SECONDS.observe(seconds, self.endpoint, name)
+        PHASE_SECONDS.observe(total, self.endpoint, 'total')
+        timings = {name: round(seconds * 1000, 2) for name, seconds in list(self.phases.items()) + list(self.marks.items())}
+        timings['total'] = round(total * 1000, 2)
+        return timings
+
+    def server_timing(self, timings=None):
+        """Server-Timing header value, e.g. 'db;dur=12.4, serialize;dur=0.8, total;dur=14.1'."""
+        timings = timings if timings is not None else self.finish()
+        return ', '.join(f"{name};dur={ms}" for name, ms in timings.items())
+
+
+def _gauge(lines, name, help_text, samples):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    lines += [f"{name}{{{labels}}} {value}" if labels else f"{name} {value}" for labels, value in samples]
+
+def render_prometheus():
+    """Everything /api/metrics exposes, in the Prometheus text format."""
+    from .cache_service import CACHE
+    from .plan_cache_service import PLAN_CACHE
+    from .coalesce_service import SEARCH_FLIGHT, STATS_FLIGHT, INTENT_FLIGHT, ASYNC_INTENT_FLIGHT
+
+    lines = PHASE_SECONDS.render() + INTENT_SOURCE.render() + SPECULATION.render()
+
+    cache = CACHE.stats()
+    tiers = [('l1', cache)] + ([('shared', cache['shared'])] if 'shared' in cache else [])
+    lines += ["# HELP houser_cache_lookups_total Cache lookups by tier and result.", "# TYPE houser_cache_lookups_total counter"]
+    for tier, stats in tiers:
+        for result in ('hits', 'misses'):
+            lines.append(f'houser_cache_lookups_total{{tier="{tier}",result="{result}"}} {stats.get(result, 0)}')
+    ratios = []
+    for tier, stats in tiers:
+        lookups = stats.get('hits', 0) + stats.get('misses', 0)
+        ratios.append((f'tier="{tier}"', round(stats.get('hits', 0) / lookups, 4) if lookups else 0.0))
+    _gauge(lines, 'houser_cache_hit_ratio', 'Cache hit ratio since start, by tier.', ratios)
+    _gauge(lines, 'houser_cache_entries', 'Entries in the in-process cache.', [(None, cache.get('entries', 0))])
+    _gauge(lines, 'houser_cache_bytes', 'Estimated size of the in-process cache.', [(None, cache.get('bytes', 0))])
+
+    plans = PLAN_CACHE.stats()
+    lines += ["# HELP houser_plan_cache_lookups_total Plan cache lookups by result.", "# TYPE houser_plan_cache_lookups_total counter"]
+    for result in ('hits', 'near_hits', 'misses'):
+        lines.append(f'houser_plan_cache_lookups_total{{result="{result}"}} {plans[result]}')
+
+    lines += ["# HELP houser_coalesced_calls_total Calls per single-flight group, and how many shared another call.", "# TYPE houser_coalesced_calls_total counter"]
+    for label, flight in (('search', SEARCH_FLIGHT), ('stats', STATS_FLIGHT), ('intent', INTENT_FLIGHT), ('intent_async', ASYNC_INTENT_FLIGHT)):
+        stats = flight.stats()
+        lines.append(f'houser_coalesced_calls_total{{flight="{label}",result="leader"}} {stats["calls"] - stats["coalesced"]}')
+        lines.append(f'houser_coalesced_calls_total{{flight="{label}",result="coalesced"}} {stats["coalesced"]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,192 @@
+import re
+import asyncio
+import json
+import hashlib
+import random
+import threading
+from collections import OrderedDict
+
+from .cache_service import CACHE
+from .query_parser_service import extract_filters
+from .vocabulary_service import FILLER_WORDS, REFERENTIAL_WORDS, NEGATION_WORDS, CATEGORY_WORDS, RENT_WORDS, BUY_WORDS
+
+# Plan slots a near-duplicate must share exactly before its similarity is even scored
+# (the price bounds too: 'under 120k' and 'over 120k' share their numbers)
+DECISIVE_FILTERS = ('city', 'area', 'category', 'propertyType', 'beds', 'isResidential', 'minPrice', 'maxPrice')
+
+MINHASH_PERMUTATIONS = 32
+LSH_BANDS = 8
+SIMILARITY_THRESHOLD = 0.85
+PLAN_TTL = 6 * 3600
+CACHEABLE_TYPES = ('search', 'stats')
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(MINHASH_PERMUTATIONS)]
+
+def content_tokens(normalized_message):
+    """Meaningful tokens of an already normalized message ('120k', 'marina', '2', 'bed', ...)."""
+    return [t for t in re.findall(r'\w+', normalized_message.lower()) if t not in FILLER_WORDS]
+
+def _hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def minhash(shingles):
+    hashes = [_hash(s) for s in shingles] or [0]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+def _shingles(tokens):
+    return set(tokens) | {f"{x} {y}" for x, y in zip(tokens, tokens[1:])}
+
+def _numbers(tokens):
+    return frozenset(t for t in tokens if any(ch.isdigit() for ch in t))
+
+def decisive_slots(normalized_message, tokens):
+    """What must match exactly between near-duplicates: the rent/buy, category, place and
+    price-bound filters the local parser reads off the message, and the rent/buy, category
+    and negation words in the order they appear."""
+    filters = extract_filters(normalized_message)
+    words = RENT_WORDS | BUY_WORDS | set(CATEGORY_WORDS) | NEGATION_WORDS
+    return (
+        tuple((key, str(filters.get(key))) for key in DECISIVE_FILTERS),
+        tuple(t for t in tokens if t in words),
+    )
+
+def context_fingerprint(normalized_message, session_context):
+    """What besides the message can change the plan: current filters, the user's name, and,
+    for messages that refer back ('show me more', 'cheaper ones'), the recent history."""
+    session_context = session_context or {}
+    parts = [session_context.get('filters', {}), session_context.get('user_name')]
+    history = session_context.get('history', [])
+    tokens = set(re.findall(r'\w+', normalized_message.lower()))
+    if history and tokens & REFERENTIAL_WORDS:
+        parts.append([(m.get('role'), m.get('content')) for m in history[-6:]])
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+class PlanCache:
+    """
+    Cache of get_ai_intent outputs (searchPlan/type JSON) for near-duplicate messages.
+
+    Exact matches (same content tokens in the same order) go through the shared CACHE, so
+    all workers benefit. Near-duplicates are found through a per-process MinHash LSH index
+    and must then have identical decisive slots (decisive_slots) and numbers, and a
+    content-token Jaccard >= SIMILARITY_THRESHOLD.
+    """
+
+    def __init__(self, max_entries=5000):
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._counters = {"hits": 0, "near_hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def _exact_key(tokens, context_fp):
+        # Word order is kept: 'villa not apartment' and 'apartment not villa' differ
+        return f"plan_{context_fp}_{' '.join(tokens)}"
+
+    def _bands(self, signature, context_fp):
+        rows = MINHASH_PERMUTATIONS // LSH_BANDS
+        return [(context_fp, i, signature[i * rows:(i + 1) * rows]) for i in range(LSH_BANDS)]
+
+    def lookup(self, normalized_message, context_fp):
+        tokens = content_tokens(normalized_message)
+        if not tokens:
+            return None
+        exact_key = self._exact_key(tokens, context_fp)
+        plan = CACHE.get(exact_key)
+        if plan is not None:
+            with self._lock:
+                self._counters['hits'] += 1
+            return plan
+
+        token_set, numbers = set(tokens), _numbers(tokens)
+        decisive = decisive_slots(normalized_message, tokens)
+        signature = minhash(_shingles(tokens))
+        best, best_score = None, 0.0
+        with self._lock:
+            candidates = set()
+            for band in self._bands(signature, context_fp):
+                candidates |= self._buckets.get(band, set())
+            for key in candidates:
+                entry = self._entries.get(key)
+                if entry is None or entry['numbers'] != numbers or entry['decisive'] != decisive:
+                    continue
+                score = len(token_set & entry['tokens']) / len(token_set | entry['tokens'])
+                if score >= SIMILARITY_THRESHOLD and score > best_score:
+                    best, best_score = key, score
+            if best is None:
+                self._counters['misses'] += 1
+                return None
+        # The entry may have outlived its TTL in the shared cache
+        plan = CACHE.get(best)
+        with self._lock:
+            if plan is None:
+                self._counters['misses'] += 1
+                self._drop(best)
+            else:
+                self._counters['near_hits'] += 1
+                if best in self._entries:
+                    self._entries.move_to_end(best)
+        return plan
+
+    def store(self, normalized_message, context_fp, ai_output):
+        tokens = content_tokens(normalized_message)
+        if not tokens or ai_output.get('type') not in CACHEABLE_TYPES:
+            return
+        exact_key = self._exact_key(tokens, context_fp)
+        CACHE.set(exact_key, ai_output, ttl=PLAN_TTL)
+        signature = minhash(_shingles(tokens))
+        decisive = decisive_slots(normalized_message, tokens)
+        with self._lock:
+            self._counters['stores'] += 1
+            if exact_key in self._entries:
+                self._entries.move_to_end(exact_key)
+                return
+            bands = self._bands(signature, context_fp)
+            self._entries[exact_key] = {"tokens": set(tokens), "numbers": _numbers(tokens), "decisive": decisive, "bands": bands}
+            for band in bands:
+                self._buckets.setdefault(band, set()).add(exact_key)
+            while len(self._entries) > self._max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        """Removes an entry and its LSH bucket memberships; the caller holds the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band in entry['bands']:
+            bucket = self._buckets.get(band)
+            if bucket:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries))
+
+PLAN_CACHE = PlanCache()
+
+def get_cached_intent(user_message, session_context, normalized_message, intent_fn):
+    """get_ai_intent with the plan cache in front. Returns the AI output, marked `planCached` on a hit."""
+    context_fp = context_fingerprint(normalized_message, session_context)
+    plan = PLAN_CACHE.lookup(normalized_message, context_fp)
+    if plan is not None:
+        return dict(plan, planCached=True)
+    ai_output = intent_fn(user_message, session_context)
+    PLAN_CACHE.store(normalized_message, context_fp, ai_output)
+    return ai_output
+
+async def aget_cached_intent(user_message, session_context, normalized_message, intent_fn, executor=None):
+    """Async get_cached_intent: `intent_fn` is a coroutine function; cache I/O (the shared
+    tier is a SQLite file) runs on `executor` so it never blocks the event loop."""
+    loop = asyncio.get_running_loop()
+    context_fp = context_fingerprint(normalized_message, session_context)
+    plan = await loop.run_in_executor(executor, PLAN_CACHE.lookup, normalized_message, context_fp)
+    if plan is not None:
+        return dict(plan, planCached=True)
+    ai_output = await intent_fn(user_message, session_context)
+    await loop.run_in_executor(executor, PLAN_CACHE.store, normalized_message, context_fp, ai_output)
+    return ai_output
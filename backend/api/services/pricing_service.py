@@ -0,0 +1,158 @@
+import json
+import math
+import time
+import threading
+from bisect import bisect_left
+
+from . import db_service, stats_service
+from .metrics_service import PHASE_SECONDS
+from .stats_service import ALL_ID, merge_histograms
+
+# Price positioning for search results: where a listing's price sits among comparable
+# active listings, as a percentile. Segments are the market_stats leaves (city, area,
+# category, beds, rent/buy); each is kept in memory as a cumulative histogram, so a
+# page of listings is ranked without touching the database. Thin segments back off to
+# broader ones (see BACKOFF).
+
+# A segment needs this many listings before its percentiles are used
+MIN_SEGMENT_LISTINGS = 8
+# Percentile ranks at or below / at or above these get a Great Deal / Premium label
+DEAL_PERCENTILE = 15
+PREMIUM_PERCENTILE = 85
+# How often (seconds) the market_stats version is checked for a newer refresh
+VERSION_CHECK_SECONDS = 5.0
+
+DIMENSIONS = ('city_id', 'area_id', 'category_id', 'bedrooms_int', 'market')
+# Most to least specific; a dimension left out is pooled (ALL_ID / '*')
+BACKOFF = (
+    ('city_id', 'area_id', 'category_id', 'bedrooms_int', 'market'),
+    ('city_id', 'area_id', 'category_id', 'market'),
+    ('city_id', 'category_id', 'bedrooms_int', 'market'),
+    ('city_id', 'category_id', 'market'),
+    ('city_id', 'market'),
+)
+# What the listing is compared with, per BACKOFF level (used in the labels)
+SCOPES = (
+    'similar listings in this area',
+    'listings of this type in this area',
+    'similar listings in this city',
+    'listings of this type in this city',
+    'listings in this city',
+)
+
+def _key(values, dims):
+    return tuple(values[dim] if dim in dims else ('*' if dim == 'market' else ALL_ID) for dim in DIMENSIONS)
+
+class Segment:
+    """Cumulative price histogram of one segment (stats_service buckets)."""
+
+    __slots__ = ('buckets', 'counts', 'below', 'listings', 'min_price', 'max_price')
+
+    def __init__(self, histogram, min_price, max_price):
+        self.buckets = sorted(histogram)
+        self.counts = [histogram[b] for b in self.buckets]
+        self.below = []
+        total = 0
+        for count in self.counts:
+            self.below.append(total)
+            total += count
+        self.listings = total
+        self.min_price = min_price
+        self.max_price = max_price
+
+    def percentile(self, price):
+        """Share of the segment priced below `price` (0-100), interpolated inside its bucket."""
+        if price <= self.min_price:
+            return 0.0
+        if price >= self.max_price:
+            return 100.0
+        bucket = stats_service._bucket(price)
+        i = bisect_left(self.buckets, bucket)
+        if i == len(self.buckets):
+            return 100.0
+        if self.buckets[i] != bucket:
+            return self.below[i] / self.listings * 100
+        lo, hi = stats_service._bucket_bounds(bucket)
+        lo, hi = max(lo, self.min_price), min(hi, self.max_price)
+        if hi <= lo:
+            within = 0.5
+        elif lo > 0:
+            within = math.log(price / lo) / math.log(hi / lo)
+        else:
+            within = (price - lo) / (hi - lo)
+        return (self.below[i] + min(max(within, 0.0), 1.0) * self.counts[i]) / self.listings * 100
+
+def _build_segments():
+    rows = db_service.execute_query(
+        "SELECT city_id, area_id, category_id, bedrooms_int, market, min_price, max_price, histogram FROM market_stats WHERE level = 'leaf'"
+    )
+    merged = {}
+    for r in rows:
+        histogram = {int(k): v for k, v in json.loads(r['histogram']).items()}
+        values = {dim: r[dim] for dim in DIMENSIONS}
+        for dims in BACKOFF:
+            entry = merged.setdefault(_key(values, dims), [[], r['min_price'], r['max_price']])
+            entry[0].append(histogram)
+            entry[1] = min(entry[1], r['min_price'])
+            entry[2] = max(entry[2], r['max_price'])
+    return {
+        key: Segment(histograms[0] if len(histograms) == 1 else merge_histograms(histograms), lo, hi)
+        for key, (histograms, lo, hi) in merged.items()
+    }
+
+_state = {"version": None, "segments": None, "checked": 0.0}
+_lock = threading.Lock()
+
+def get_segments():
+    """Segments for the current market_stats version; None before the first refresh_market_stats."""
+    now = time.monotonic()
+    if now - _state['checked'] < VERSION_CHECK_SECONDS:
+        return _state['segments']
+    with _lock:
+        if now - _state['checked'] < VERSION_CHECK_SECONDS:
+            return _state['segments']
+        version = stats_service.stats_version()
+        if version != _state['version']:
+            started = time.perf_counter()
+            _state['segments'] = _build_segments() if version else None
+            _state['version'] = version
+            PHASE_SECONDS.observe(time.perf_counter() - started, 'db', 'price_segments')
+        _state['checked'] = now
+    return _state['segments']
+
+def price_positions(rows, segments=None):
+    """
+    [(percentile, scope) or None] for result rows carrying price and the segment columns
+    (city_id, area_id, category_id, bedrooms_int, market), in one pass over the page.
+    None when no segment around a listing has MIN_SEGMENT_LISTINGS listings.
+    """
+    segments = segments or get_segments()
+    if not segments:
+        return [None] * len(rows)
+    positions = []
+    for row in rows:
+        price = float(row['price']) if row['price'] else 0
+        values = {
+            "city_id": row['city_id'] or 0,
+            "area_id": row['area_id'] or 0,
+            "category_id": row['category_id'] or 0,
+            "bedrooms_int": -1 if row['bedrooms_int'] is None else row['bedrooms_int'],
+            "market": row['market'] or '',
+        }
+        position = None
+        if price > 0:
+            for dims, scope in zip(BACKOFF, SCOPES):
+                segment = segments.get(_key(values, dims))
+                if segment and segment.listings >= MIN_SEGMENT_LISTINGS:
+                    position = (segment.percentile(price), scope)
+                    break
+        positions.append(position)
+    return positions
+
+def insight_label(percentile, scope):
+    """'Great Deal: ...' / 'Premium: ...' for the tails, else None."""
+    if percentile <= DEAL_PERCENTILE:
+        return f"Great Deal: priced below {min(99, 100 - math.ceil(percentile))}% of {scope}"
+    if percentile >= PREMIUM_PERCENTILE:
+        return f"Premium: priced above {min(99, math.floor(percentile))}% of {scope}"
+    return None
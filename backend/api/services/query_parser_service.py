@@ -0,0 +1,193 @@
+import os
+import re
+import json
+
+from . import resolver_service
+from .vocabulary_service import FILLER_WORDS, REFERENTIAL_WORDS, CATEGORY_WORDS, RENT_WORDS, BUY_WORDS
+
+NUMBER_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7}
+
+STATS_WORDS = {'average', 'avg', 'stats', 'statistics', 'median', 'market', 'trend', 'trends', 'insights', 'overview', 'prices', 'rates'}
+TABLE_WORDS = {'table', 'tabular', 'spreadsheet'}
+# Words the parser can safely ignore in a search ('2 bed apartment in JVC', 'units for rent per year')
+CONNECTOR_WORDS = {
+    'in', 'at', 'on', 'around', 'located', 'area', 'areas', 'property', 'properties', 'home', 'homes', 'unit', 'units',
+    'listing', 'listings', 'place', 'places', 'per', 'year', 'month', 'or', 'price', 'rate', 'cost', 'much', 'how',
+}
+# Requests that need judgement (advice, comparisons) always go to the LLM
+JUDGEMENT_WORDS = {
+    'why', 'should', 'best', 'better', 'compare', 'comparison', 'vs', 'versus', 'recommend', 'suggest', 'advice',
+    'worth', 'difference', 'cheap', 'cheapest', 'affordable', 'luxury', 'luxurious', 'near', 'nearby', 'close',
+}
+
+# Parses at or above this confidence answer the chat turn without calling the LLM
+LOCAL_PARSER_THRESHOLD = float(os.environ.get('HOUSER_LOCAL_PARSER_THRESHOLD', 0.7))
+
+_AMOUNT = r'(?:aed\s*)?(\d+(?:[.,]\d+)*)\s*(k|m|mn|mil|million|thousand)?\b(?:\s*aed)?'
+_BEDS_RE = re.compile(r'\b(\d+|' + '|'.join(NUMBER_WORDS) + r')\s*-?\s*(?:bed|beds|bedroom|bedrooms|br|bhk|bd)\b')
+_STUDIO_RE = re.compile(r'\bstudios?\b')
+_RANGE_RE = re.compile(r'\bbetween\s+' + _AMOUNT + r'\s+(?:and|to|-)\s+' + _AMOUNT)
+_MAX_RE = re.compile(r'\b(?:under|below|less than|max(?:imum)?|up ?to|within|budget(?: of| is)?|not more than|cheaper than)\s+' + _AMOUNT)
+_MIN_RE = re.compile(r'\b(?:over|above|more than|min(?:imum)?|at least|starting(?: from)?|from)\s+' + _AMOUNT)
+
+def parse_amount(number, suffix=None):
+    """'120', 'k' -> 120000.0; '1.5', 'm' -> 1500000.0; '120,000' -> 120000.0."""
+    number = number.replace(',', '')
+    if number.count('.') > 1:
+        number = number.replace('.', '')
+    value = float(number)
+    if suffix in ('k', 'thousand'):
+        value *= 1000
+    elif suffix in ('m', 'mn', 'mil', 'million'):
+        value *= 1000000
+    return value
+
+def _prices(text):
+    prices = {}
+    match = _RANGE_RE.search(text)
+    if match:
+        low, high = parse_amount(*match.group(1, 2)), parse_amount(*match.group(3, 4))
+        # '100 to 150k' means 100k to 150k
+        if not match.group(2) and match.group(4) and low < high / 1000:
+            low = parse_amount(match.group(1), match.group(4))
+        prices['minPrice'], prices['maxPrice'] = min(low, high), max(low, high)
+        return prices
+    match = _MAX_RE.search(text)
+    if match:
+        prices['maxPrice'] = parse_amount(*match.group(1, 2))
+    match = _MIN_RE.search(text)
+    if match:
+        prices['minPrice'] = parse_amount(*match.group(1, 2))
+    # Bare small numbers ('under 5') are not prices
+    return {k: v for k, v in prices.items() if v >= 1000}
+
+def _places(text, resolver):
+    """(city, area) display values for the first place named in the text."""
+    city, area = None, None
+    for place in resolver.find_places(text):
+        if place['text'] in CATEGORY_WORDS or place['text'] in RENT_WORDS | BUY_WORDS:
+            continue
+        entry = place['entries'][0]
+        if place['kind'] == 'city':
+            name, _, parent = entry['name'].partition(',')
+            if parent.strip() and not area:
+                # Sub-city rows ('Dubai Marina, Dubai') read as an area of the parent city
+                area, city = re.sub(r'\s*\([^)]*\)', '', name).strip(), city or parent.strip()
+            elif not city:
+                city = entry['name']
+        elif not area:
+            area = place['text'].title() if len(place['text']) > 4 else place['text'].upper()
+    return city, area
+
+def extract_filters(message, context_filters=None):
+    """
+    Filters (city, area, beds, category, price range, rent/buy) that can be read off the
+    raw message without the LLM, in the searchPlan 'primary' shape. A message that names
+    no place refines the current context filters; one that does starts a fresh search.
+    """
+    text = ' '.join(str(message or '').lower().split())
+    words = set(re.findall(r'[a-z]+', text))
+    filters = {}
+
+    try:
+        resolver = resolver_service.get_resolver()
+        city, area = _places(resolver.correct_typos(text), resolver)
+    except Exception:
+        city, area = None, None
+    if city:
+        filters['city'] = city
+    if area:
+        filters['area'] = area
+
+    match = _BEDS_RE.search(text)
+    if match:
+        filters['beds'] = NUMBER_WORDS.get(match.group(1)) or int(match.group(1))
+    elif _STUDIO_RE.search(text):
+        filters['beds'] = 0
+
+    for word, category in CATEGORY_WORDS.items():
+        if word in words:
+            filters['category'] = category
+            break
+
+    filters.update(_prices(text))
+
+    if words & RENT_WORDS:
+        filters['propertyType'] = 'rent'
+    elif words & BUY_WORDS:
+        filters['propertyType'] = 'buy'
+
+    if filters:
+        filters['isResidential'] = filters.get('category') != 'Office'
+    if context_filters and not (city or area):
+        filters = dict(context_filters, **filters)
+    return filters
+
+def speculative_plan(message, session_context=None):
+    """A searchPlan worth running before the LLM answers, or None when the message names no place."""
+    session_context = session_context or {}
+    filters = extract_filters(message, session_context.get('filters'))
+    if not (filters.get('city') or filters.get('area')):
+        return None
+    return {"primary": filters}
+
+def _unexplained_words(text, resolver):
+    """Words of the message the parser did not account for; each one lowers the confidence."""
+    for pattern in (_RANGE_RE, _MAX_RE, _MIN_RE, _BEDS_RE, _STUDIO_RE):
+        text = pattern.sub(' ', text)
+    corrected = ' ' + resolver.correct_typos(text) + ' '
+    for place in resolver.find_places(corrected):
+        corrected = corrected.replace(' ' + place['text'] + ' ', ' ', 1)
+    known = FILLER_WORDS | CONNECTOR_WORDS | RENT_WORDS | BUY_WORDS | STATS_WORDS | TABLE_WORDS | set(CATEGORY_WORDS)
+    return [word for word in corrected.split() if word not in known]
+
+def parse_query(message, session_context=None):
+    """
+    Deterministic parse of a chat message into the same intent JSON get_ai_intent returns
+    (type 'search' or 'stats' with a searchPlan), plus a `confidence` in [0, 1].
+
+    Confidence starts at 0.6 for a named city/area, gains 0.1 per structured filter
+    (beds, category, price, rent/buy) and loses 0.25 per word the parser could not
+    account for. Messages asking for judgement, or referring back to earlier turns,
+    score 0 and are left to the LLM.
+    """
+    session_context = session_context or {}
+    text = ' '.join(str(message or '').lower().split())
+    words = set(re.findall(r'[a-z]+', text))
+    filters = extract_filters(text)
+
+    intent = {"type": "search", "searchPlan": {"primary": filters}, "wantsTable": bool(words & TABLE_WORDS), "confidence": 0.0}
+    if not (filters.get('city') or filters.get('area')) or words & JUDGEMENT_WORDS:
+        return intent
+    if session_context.get('history') and words & REFERENTIAL_WORDS:
+        return intent
+    try:
+        unexplained = _unexplained_words(text, resolver_service.get_resolver())
+    except Exception:
+        return intent
+
+    structured = [key for key in ('beds', 'category', 'propertyType') if key in filters]
+    if 'minPrice' in filters or 'maxPrice' in filters:
+        structured.append('price')
+
+    if words & STATS_WORDS:
+        # Market stats only scope by city/area; anything narrower needs the LLM to explain
+        intent['type'] = 'stats'
+        intent['searchPlan'] = {"primary": {k: filters[k] for k in ('city', 'area') if k in filters}}
+        confidence = 0.9 - 0.25 * len([k for k in structured if k != 'propertyType'])
+    else:
+        confidence = 0.6 + 0.1 * len(structured)
+    confidence -= 0.25 * len(unexplained)
+
+    intent['confidence'] = round(min(max(confidence, 0.0), 1.0), 2)
+    intent['thought'] = f"Local parse ({intent['confidence']}): {json.dumps(intent['searchPlan']['primary'])}"
+    return intent
+
+def local_intent(message, session_context=None, threshold=None):
+    """parse_query's intent when it is confident enough to skip the LLM, else None."""
+    threshold = LOCAL_PARSER_THRESHOLD if threshold is None else threshold
+    try:
+        intent = parse_query(message, session_context)
+    except Exception:
+        return None
+    return intent if intent['confidence'] >= threshold else None
@@ -0,0 +1,265 @@
+import re
+import bisect
+import threading
+
+from . import db_service
+
+# Known misspellings and short forms, applied token by token before matching
+PLACE_ALIASES = {
+    'dubay': 'dubai',
+    'shrajh': 'sharjah',
+    'anjnm': 'ajman',
+    'abudhabi': 'abu dhabi',
+    'dxb': 'dubai',
+    'auh': 'abu dhabi',
+    'shj': 'sharjah',
+    'rak': 'ras al khaimah',
+    'uaq': 'umm al quwain',
+}
+
+# Minimum token length before fuzzy (edit-distance) matching is attempted
+FUZZY_MIN_LENGTH = 4
+
+def normalize_place(text):
+    """Lowercases, strips punctuation and collapses whitespace: 'JLT (Cluster B)' -> 'jlt cluster b'."""
+    text = re.sub(r'[^\w\s]', ' ', str(text or '').lower().replace('&', ' and '))
+    return ' '.join(text.split())
+
+def _expand_aliases(norm):
+    return ' '.join(PLACE_ALIASES.get(token, token) for token in norm.split())
+
+def _max_distance(length):
+    return 1 if length <= 5 else 2 if length <= 10 else 3
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a, b, limit=None):
+    """Optimal string alignment distance (Levenshtein plus adjacent transpositions).
+    Returns limit + 1 as soon as the distance is known to exceed `limit`."""
+    if limit is not None and abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if limit is not None and min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class _NameIndex:
+    """Token + trigram index over a set of place names (one entry may have several variants)."""
+
+    def __init__(self, entries):
+        # entries: [(id, display_name, city_id)]
+        self.entries = {}
+        self.full_names = {}
+        self.variants = {}
+        self.postings = {}
+        self.trigrams = {}
+        for entry_id, name, city_id in entries:
+            norm = normalize_place(name)
+            if not norm:
+                continue
+            self.entries[entry_id] = {"id": entry_id, "name": name, "cityId": city_id}
+            self.full_names[entry_id] = norm
+            for variant in self._variants(name, norm):
+                self.variants.setdefault(variant, set()).add(entry_id)
+            for token in norm.split():
+                self.postings.setdefault(token, set()).add(entry_id)
+        for variant in self.variants:
+            for gram in _trigrams(variant):
+                self.trigrams.setdefault(gram, set()).add(variant)
+        self.tokens = sorted(self.postings)
+
+    @staticmethod
+    def _variants(name, norm):
+        """'JLT (Jumeirah Lake Towers)' -> full name, 'jlt', 'jumeirah lake towers';
+        'Marina Gate, Dubai Marina' -> full name and 'marina gate'."""
+        variants = {norm}
+        for inner in re.findall(r'\(([^)]*)\)', name):
+            variants.add(normalize_place(inner))
+        outer = re.sub(r'\([^)]*\)', ' ', name)
+        variants.add(normalize_place(outer))
+        variants.add(normalize_place(outer.split(',')[0]))
+        variants.discard('')
+        return variants
+
+    def _prefix_ids(self, prefix):
+        ids = set()
+        i = bisect.bisect_left(self.tokens, prefix)
+        while i < len(self.tokens) and self.tokens[i].startswith(prefix):
+            ids |= self.postings[self.tokens[i]]
+            i += 1
+        return ids
+
+    def word_matches(self, norm):
+        """Entries whose name contains `norm` as a run of whole words (last word may be a prefix)."""
+        tokens = norm.split()
+        if not tokens:
+            return set()
+        candidates = self._prefix_ids(tokens[-1])
+        for token in tokens[:-1]:
+            candidates &= self.postings.get(token, set())
+            if not candidates:
+                return set()
+        needle = ' ' + norm
+        return {i for i in candidates if needle in ' ' + self.full_names[i]}
+
+    def fuzzy_matches(self, norm):
+        """[(distance, variant)] for variants within the edit-distance budget, closest first."""
+        if len(norm.replace(' ', '')) < FUZZY_MIN_LENGTH:
+            return []
+        grams = _trigrams(norm)
+        counts = {}
+        for gram in grams:
+            for variant in self.trigrams.get(gram, ()):
+                counts[variant] = counts.get(variant, 0) + 1
+        limit = _max_distance(len(norm))
+        matches = []
+        for variant, shared in counts.items():
+            # Cheap trigram filter before the O(n*m) distance
+            if shared * 2 < len(grams) - limit * 3:
+                continue
+            distance = edit_distance(norm, variant, limit)
+            if distance <= limit:
+                matches.append((distance, variant))
+        return sorted(matches)
+
+
+class PlaceResolver:
+    """
+    In-memory resolver from free text ("Marina", "JLT", "dubay") to ranked area/city ids.
+    Built once per process from the areas/cities tables; see get_resolver().
+    """
+
+    def __init__(self, cities, areas, core_city_names=()):
+        self.cities = _NameIndex(cities)
+        self.areas = _NameIndex(areas)
+        # Words of the top-level city names (the emirates) that free-text typo correction may target
+        self.city_vocabulary = sorted({t for name in core_city_names for t in normalize_place(name).split() if len(t) > 2})
+
+    def _resolve(self, index, text, suffix_match=False):
+        norm = _expand_aliases(normalize_place(text))
+        if not norm:
+            return []
+
+        ranked = {}
+        def add(entry_id, score, match):
+            if score > ranked.get(entry_id, (0, None))[0]:
+                ranked[entry_id] = (score, match)
+
+        for entry_id in index.variants.get(norm, ()):
+            add(entry_id, 1.0, 'exact')
+        for entry_id in index.word_matches(norm):
+            full = index.full_names[entry_id]
+            if suffix_match and full.endswith(' ' + norm):
+                add(entry_id, 0.95, 'suffix')
+            else:
+                # Shorter names containing the term rank above long compound names
+                add(entry_id, 0.6 + 0.3 * len(norm) / len(full), 'word')
+        if not ranked:
+            for distance, variant in index.fuzzy_matches(norm):
+                for entry_id in index.variants[variant]:
+                    add(entry_id, 0.5 * (1 - distance / max(len(norm), 1)), 'fuzzy')
+
+        results = [dict(index.entries[i], score=round(score, 3), match=match) for i, (score, match) in ranked.items()]
+        return sorted(results, key=lambda r: (-r['score'], r['id']))
+
+    def resolve_area(self, text):
+        return self._resolve(self.areas, text)
+
+    def resolve_city(self, text):
+        # 'Dubai' also covers the sub-city rows named '..., Dubai'
+        return self._resolve(self.cities, text, suffix_match=True)
+
+    @staticmethod
+    def _ids(matches, kinds):
+        matches = [m for m in matches if m['match'] in kinds]
+        if matches and matches[0]['match'] == 'fuzzy':
+            # Only the closest spelling(s), not every name within the edit budget
+            matches = [m for m in matches if m['score'] == matches[0]['score']]
+        return [m['id'] for m in matches]
+
+    def area_ids(self, text):
+        """Every area containing the term (the old LIKE '%term%' semantics), or the closest fuzzy hits."""
+        return self._ids(self.resolve_area(text), ('exact', 'word', 'fuzzy'))
+
+    def city_ids(self, text, exact=False):
+        """Ids for a city name; unless `exact`, also the '..., Dubai' sub-city rows."""
+        kinds = ('exact', 'fuzzy') if exact else ('exact', 'suffix', 'fuzzy')
+        return self._ids(self.resolve_city(text), kinds)
+
+    def find_places(self, text, max_words=5):
+        """Longest runs of words in free text that exactly name a city or area (or a variant),
+        left to right: [{"text": 'dubai marina', "kind": 'city', "entries": [...]}]."""
+        tokens = _expand_aliases(normalize_place(text)).split()
+        found, i = [], 0
+        while i < len(tokens):
+            for n in range(min(max_words, len(tokens) - i), 0, -1):
+                phrase = ' '.join(tokens[i:i + n])
+                # Single words must look like names, not unit codes ('a', 'c1')
+                if n == 1 and (len(phrase) < 3 or not phrase.isalpha()):
+                    continue
+                for kind, index in (('city', self.cities), ('area', self.areas)):
+                    ids = index.variants.get(phrase)
+                    if ids:
+                        found.append({"text": phrase, "kind": kind, "entries": [index.entries[x] for x in sorted(ids)]})
+                        break
+                else:
+                    continue
+                i += n
+                break
+            else:
+                i += 1
+        return found
+
+    def correct_typos(self, text):
+        """Rewrites misspelled city words ('dubay', 'shrajh') in free text, leaving everything else alone."""
+        words = []
+        for token in normalize_place(text).split():
+            if token in PLACE_ALIASES:
+                token = PLACE_ALIASES[token]
+            elif len(token) > FUZZY_MIN_LENGTH and token not in self.city_vocabulary:
+                # Same first two letters keeps ordinary words ('rental', 'villas') untouched
+                limit = _max_distance(len(token))
+                candidates = [(edit_distance(token, word, limit), word) for word in self.city_vocabulary if word[:2] == token[:2]]
+                best = min(candidates, default=None)
+                if best and best[0] <= limit:
+                    token = best[1]
+            words.append(token)
+        return ' '.join(words)
+
+
+def _is_placeholder_city(name):
+    """The seed data's 'No City' row has a country but names no place; its words are not city vocabulary."""
+    return str(name or '').lower().startswith('no ')
+
+_resolver = None
+_resolver_generation = None
+_resolver_lock = threading.Lock()
+
+def get_resolver():
+    """Process-wide resolver, rebuilt only when the pooled DB connections are reset."""
+    global _resolver, _resolver_generation
+    generation = db_service._pool_generation
+    if _resolver is not None and _resolver_generation == generation:
+        return _resolver
+    with _resolver_lock:
+        if _resolver is None or _resolver_generation != generation:
+            cities = db_service.execute_query("SELECT id, name, country_id FROM cities")
+            areas = db_service.execute_query("SELECT id, name, city_id FROM areas")
+            _resolver = PlaceResolver(
+                [(r['id'], r['name'], None) for r in cities],
+                [(r['id'], r['name'], r['city_id']) for r in areas],
+                core_city_names=[r['name'] for r in cities if r['country_id'] is not None and not _is_placeholder_city(r['name'])],
+            )
+            _resolver_generation = generation
+    return _resolver
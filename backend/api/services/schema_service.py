@@ -0,0 +1,54 @@
+import sqlite3
+from pathlib import Path
+
+from .db_service import get_write_connection, close_db_connections
+
+# Ordered SQL migrations for the listings database (houser.db), applied by
+# `python manage.py migrate_houser_db`. Django's own migrations only cover db.sqlite3.
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / 'sql'
+
+def list_migrations():
+    return sorted(MIGRATIONS_DIR.glob('[0-9][0-9][0-9][0-9]_*.sql'))
+
+def get_applied_migrations(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS houser_schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TEXT NOT NULL
+        )
+    """)
+    return {row['name'] for row in conn.execute("SELECT name FROM houser_schema_migrations")}
+
+def apply_migrations(log=print):
+    """Applies every pending migration in its own transaction. Returns the names applied."""
+    conn = get_write_connection()
+    applied_now = []
+    try:
+        applied = get_applied_migrations(conn)
+        for path in list_migrations():
+            if path.stem in applied:
+                continue
+            log(f"Applying {path.stem}...")
+            script = path.read_text(encoding='utf-8')
+            try:
+                conn.executescript(
+                    "BEGIN;\n" + script +
+                    f"\nINSERT INTO houser_schema_migrations (name, applied_at) VALUES ('{path.stem}', datetime('now'));\nCOMMIT;"
+                )
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            applied_now.append(path.stem)
+
+        if applied_now:
+            # Fresh planner statistics, so the new indexes are actually picked
+            conn.execute("ANALYZE")
+            conn.commit()
+    finally:
+        conn.close()
+
+    if applied_now:
+        # Pooled readers may hold statements prepared against the old schema
+        close_db_connections()
+    return applied_now
@@ -0,0 +1,63 @@
+import os
+import json
+import gzip
+
+# Optional fast paths: orjson for encoding, brotli for compression. Without them the
+# stdlib json/gzip are used and the output is equivalent.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_BACKEND = 'orjson' if orjson else 'json'
+
+# Responses smaller than this are sent as is: the headers would eat most of the saving
+COMPRESS_MIN_BYTES = int(os.environ.get('HOUSER_COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Narrative tokens that arrive within this window (ms) go out as one text_chunk frame,
+# up to TEXT_CHUNK_MAX_CHARS characters; 0 still merges tokens that queued up meanwhile
+SSE_FLUSH_MS = float(os.environ.get('HOUSER_SSE_FLUSH_MS', 20))
+TEXT_CHUNK_MAX_CHARS = int(os.environ.get('HOUSER_SSE_MAX_CHUNK', 256))
+
+if orjson:
+    def dumps(payload):
+        """Compact JSON as UTF-8 bytes."""
+        return orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(payload):
+        """Compact JSON as UTF-8 bytes."""
+        return json.dumps(payload, default=str, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def sse_frame(payload):
+    """One server-sent event frame (`data: <json>\\n\\n`) as bytes."""
+    return b'data: ' + dumps(payload) + b'\n\n'
+
+_TEXT_CHUNK_PREFIX = b'data: {"type":"text_chunk","content":'
+
+def text_chunk_frame(content):
+    """sse_frame({"type": "text_chunk", "content": content}), without building the dict."""
+    return _TEXT_CHUNK_PREFIX + dumps(content) + b'}\n\n'
+
+FINAL_FRAME = sse_frame({"type": "final", "done": True})
+
+def compress(body, accept_encoding):
+    """
+    (body, content-encoding) for a client's Accept-Encoding header: brotli when the
+    client takes it and the module is installed, else gzip, else the body unchanged
+    (encoding None). Small bodies are never compressed.
+    """
+    if len(body) < COMPRESS_MIN_BYTES or not accept_encoding:
+        return body, None
+    accepted = {part.split(';')[0].strip().lower() for part in accept_encoding.split(',')}
+    if brotli and 'br' in accepted:
+        return brotli.compress(body, quality=BROTLI_QUALITY), 'br'
+    if 'gzip' in accepted:
+        # mtime=0 keeps the output stable for identical bodies
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), 'gzip'
+    return body, None
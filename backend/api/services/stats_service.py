@@ -0,0 +1,271 @@
+import json
+import math
+import itertools
+from datetime import datetime, timezone
+
+from . import db_service
+
+# Prices are bucketed on a log scale (24 buckets per decade, ~10% wide) so that
+# segment histograms can be merged into rollups and still give usable percentiles.
+HISTOGRAM_FLOOR = 1000.0
+HISTOGRAM_BUCKETS_PER_DECADE = 24
+PERCENTILES = (('p25', 0.25), ('median', 0.5), ('p75', 0.75), ('p90', 0.9))
+
+# Sentinels used in market_stats keys (see api/sql/0003_market_stats.sql)
+ALL_ID = -2
+ALL_MARKET = '*'
+DIMENSIONS = ('city_id', 'area_id', 'category_id', 'bedrooms_int', 'market')
+ROLLUP_LEVELS = {
+    'city': ('city_id',),
+    'area': ('area_id',),
+    'city_area': ('city_id', 'area_id'),
+    'all': (),
+}
+
+def _bucket(price):
+    if price <= HISTOGRAM_FLOOR:
+        return 0
+    return int(math.log10(price / HISTOGRAM_FLOOR) * HISTOGRAM_BUCKETS_PER_DECADE) + 1
+
+def _bucket_bounds(bucket):
+    if bucket == 0:
+        return 0.0, HISTOGRAM_FLOOR
+    lo = HISTOGRAM_FLOOR * 10 ** ((bucket - 1) / HISTOGRAM_BUCKETS_PER_DECADE)
+    return lo, lo * 10 ** (1 / HISTOGRAM_BUCKETS_PER_DECADE)
+
+def build_histogram(prices):
+    histogram = {}
+    for price in prices:
+        bucket = _bucket(price)
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+    return histogram
+
+def merge_histograms(histograms):
+    merged = {}
+    for histogram in histograms:
+        for bucket, count in histogram.items():
+            merged[bucket] = merged.get(bucket, 0) + count
+    return merged
+
+def histogram_percentile(histogram, q, min_price, max_price):
+    """Approximate percentile: geometric interpolation inside the bucket, clamped to [min, max]."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    target = q * total
+    seen = 0
+    for bucket in sorted(histogram):
+        count = histogram[bucket]
+        if seen + count >= target:
+            lo, hi = _bucket_bounds(bucket)
+            lo, hi = max(lo, min_price), min(hi, max_price)
+            frac = (target - seen) / count
+            value = lo * (hi / lo) ** frac if lo > 0 else lo + (hi - lo) * frac
+            return min(max(value, min_price), max_price)
+        seen += count
+    return max_price
+
+def exact_percentile(sorted_prices, q):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_prices:
+        return None
+    pos = (len(sorted_prices) - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_prices) - 1)
+    return sorted_prices[lower] + (sorted_prices[upper] - sorted_prices[lower]) * (pos - lower)
+
+def summarize_prices(prices):
+    """Stats for one leaf segment, with exact percentiles."""
+    prices = sorted(prices)
+    summary = {
+        "listings": len(prices),
+        "min_price": prices[0],
+        "max_price": prices[-1],
+        "sum_price": float(sum(prices)),
+        "histogram": build_histogram(prices),
+    }
+    for name, q in PERCENTILES:
+        summary[name] = exact_percentile(prices, q)
+    return summary
+
+def combine_summaries(rows):
+    """Merges stored rows (leaves or rollups) into one summary with histogram percentiles."""
+    rows = list(rows)
+    if not rows:
+        return None
+    # A single stored row already has its percentiles, unless the caller selected only the histogram
+    if len(rows) == 1 and 'median' in rows[0].keys():
+        row = dict(rows[0])
+        if isinstance(row['histogram'], str):
+            row['histogram'] = {int(k): v for k, v in json.loads(row['histogram']).items()}
+        return row
+    histogram = merge_histograms(
+        {int(k): v for k, v in json.loads(r['histogram']).items()} if isinstance(r['histogram'], str) else r['histogram']
+        for r in rows
+    )
+    summary = {
+        "listings": sum(r['listings'] for r in rows),
+        "min_price": min(r['min_price'] for r in rows),
+        "max_price": max(r['max_price'] for r in rows),
+        "sum_price": sum(r['sum_price'] for r in rows),
+        "histogram": histogram,
+    }
+    for name, q in PERCENTILES:
+        summary[name] = histogram_percentile(histogram, q, summary['min_price'], summary['max_price'])
+    return summary
+
+# --- Refresh (write side) ---------------------------------------------------
+
+def _upsert(conn, level, key, summary, now):
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO market_stats
+            (level, city_id, area_id, category_id, bedrooms_int, market,
+             listings, min_price, max_price, sum_price, p25, median, p75, p90, histogram, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (level, *key, summary['listings'], summary['min_price'], summary['max_price'], summary['sum_price'],
+         summary['p25'], summary['median'], summary['p75'], summary['p90'],
+         json.dumps(summary['histogram'], separators=(',', ':')), now),
+    )
+
+def _rollup_key(level, values):
+    grouped = dict(zip(ROLLUP_LEVELS[level], values))
+    return tuple(grouped.get(dim, ALL_MARKET if dim == 'market' else ALL_ID) for dim in DIMENSIONS)
+
+def _refresh_rollups(conn, level, keys, now):
+    """Recomputes the given rollup rows of one level from the leaf rows beneath them."""
+    dims = ROLLUP_LEVELS[level]
+    for values in keys:
+        where = ' AND '.join(f"{dim} = ?" for dim in dims)
+        leaves = conn.execute(
+            f"SELECT listings, min_price, max_price, sum_price, histogram FROM market_stats WHERE level = 'leaf'"
+            + (f" AND {where}" if where else ""),
+            values,
+        ).fetchall()
+        key = _rollup_key(level, values)
+        summary = combine_summaries(leaves)
+        if summary:
+            _upsert(conn, level, key, summary, now)
+        else:
+            conn.execute(
+                "DELETE FROM market_stats WHERE level = ? AND city_id = ? AND area_id = ? AND category_id = ? AND bedrooms_int = ? AND market = ?",
+                (level, *key),
+            )
+
+def refresh_market_stats(full=False, log=None):
+    """
+    Brings market_stats up to date. Incremental by default: only the segments the
+    properties triggers marked dirty are recomputed, followed by their rollups.
+    Returns {"segments": <leaves recomputed>, "version": <new stats version>}.
+    """
+    now = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    conn = db_service.get_write_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        segment_sql = """
+            SELECT IFNULL(city_id, 0) AS city_id, IFNULL(area_id, 0) AS area_id, IFNULL(category_id, 0) AS category_id,
+                   IFNULL(bedrooms_int, -1) AS bedrooms_int, IFNULL(market, '') AS market, price
+            FROM properties
+            WHERE status = 'active' AND price > 0
+        """
+        if full:
+            conn.execute("DELETE FROM market_stats")
+            rows = conn.execute(segment_sql + " ORDER BY 1, 2, 3, 4, 5")
+            segments = 0
+            for key, group in itertools.groupby(rows, key=lambda r: tuple(r[:5])):
+                _upsert(conn, 'leaf', key, summarize_prices([r['price'] for r in group]), now)
+                segments += 1
+            dirty = [tuple(r) for r in conn.execute(
+                "SELECT city_id, area_id, category_id, bedrooms_int, market FROM market_stats WHERE level = 'leaf'"
+            )]
+        else:
+            dirty = [tuple(r) for r in conn.execute("SELECT city_id, area_id, category_id, bedrooms_int, market FROM market_stats_dirty")]
+            for key in dirty:
+                # Decode the sentinels back to NULLs so the IS comparisons can use the search indexes
+                city_id, area_id, category_id, beds, market = key
+                prices = [r['price'] for r in conn.execute(
+                    segment_sql + " AND city_id IS ? AND area_id IS ? AND category_id IS ? AND bedrooms_int IS ? AND market IS ?",
+                    (city_id or None, area_id or None, category_id or None, None if beds == -1 else beds, market or None),
+                )]
+                if prices:
+                    _upsert(conn, 'leaf', key, summarize_prices(prices), now)
+                else:
+                    conn.execute(
+                        "DELETE FROM market_stats WHERE level = 'leaf' AND city_id = ? AND area_id = ? AND category_id = ? AND bedrooms_int = ? AND market = ?",
+                        key,
+                    )
+            segments = len(dirty)
+
+        if dirty or full:
+            _refresh_rollups(conn, 'city', {(k[0],) for k in dirty}, now)
+            _refresh_rollups(conn, 'area', {(k[1],) for k in dirty}, now)
+            _refresh_rollups(conn, 'city_area', {(k[0], k[1]) for k in dirty}, now)
+            _refresh_rollups(conn, 'all', {()}, now)
+
+        conn.execute("DELETE FROM market_stats_dirty")
+        row = conn.execute("SELECT value FROM market_stats_meta WHERE key = 'version'").fetchone()
+        version = (int(row['value']) if row else 0) + 1
+        conn.execute("INSERT OR REPLACE INTO market_stats_meta (key, value) VALUES ('version', ?)", (str(version),))
+        conn.execute("INSERT OR REPLACE INTO market_stats_meta (key, value) VALUES ('refreshed_at', ?)", (now,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if log:
+        log(f"Refreshed {segments} market segment(s); stats version {version}.")
+    return {"segments": segments, "version": version}
+
+# --- Lookups (read side) ----------------------------------------------------
+
+def stats_version():
+    """Current materialized stats version, or None if market_stats was never refreshed."""
+    if not db_service.table_exists('market_stats_meta'):
+        return None
+    row = db_service.execute_query("SELECT value FROM market_stats_meta WHERE key = 'version'", fetch_all=False)
+    return int(row['value']) if row else None
+
+def lookup_market_stats(city_ids=None, area_ids=None):
+    """Summary over the precomputed rollup rows for the given id sets (None = no filter)."""
+    params = []
+    if city_ids is not None and area_ids is not None:
+        level = 'city_area'
+        clause = f" AND city_id IN ({', '.join(['?'] * len(city_ids))}) AND area_id IN ({', '.join(['?'] * len(area_ids))})"
+        params = list(city_ids) + list(area_ids)
+    elif city_ids is not None:
+        level = 'city'
+        clause = f" AND city_id IN ({', '.join(['?'] * len(city_ids))})"
+        params = list(city_ids)
+    elif area_ids is not None:
+        level = 'area'
+        clause = f" AND area_id IN ({', '.join(['?'] * len(area_ids))})"
+        params = list(area_ids)
+    else:
+        level, clause = 'all', ""
+
+    rows = db_service.execute_query(
+        "SELECT listings, min_price, max_price, sum_price, p25, median, p75, p90, histogram FROM market_stats WHERE level = ?" + clause,
+        [level] + params,
+    )
+    return combine_summaries(rows)
+
+def city_breakdown(limit=5):
+    """Top cities by active listings, merged by display name like the old GROUP BY c.name."""
+    rows = db_service.execute_query("""
+        SELECT c.name, s.listings, s.min_price, s.max_price, s.sum_price
+        FROM market_stats s
+        JOIN cities c ON c.id = s.city_id
+        WHERE s.level = 'city'
+    """)
+    by_name = {}
+    for r in rows:
+        entry = by_name.setdefault(r['name'], {"name": r['name'], "count": 0, "sum": 0.0, "min": r['min_price'], "max": r['max_price']})
+        entry['count'] += r['listings']
+        entry['sum'] += r['sum_price']
+        entry['min'] = min(entry['min'], r['min_price'])
+        entry['max'] = max(entry['max'], r['max_price'])
+    top = sorted(by_name.values(), key=lambda e: e['count'], reverse=True)[:limit]
+    return [{"name": e['name'], "count": e['count'], "avg": e['sum'] / e['count'], "min": e['min'], "max": e['max']} for e in top]
@@ -0,0 +1,233 @@
+import json
+import time
+from datetime import date, timedelta
+
+from . import db_service, resolver_service
+from .cache_service import CACHE
+from .metrics_service import PHASE_SECONDS
+from .stats_service import ALL_ID, summarize_prices, combine_summaries
+
+# Time-bucketed asking prices (see api/sql/0005_market_trends.sql). The refresh only
+# recomputes the buckets the properties triggers marked dirty, each from an index range
+# scan over its own dates; older buckets are never rescanned.
+
+PERIODS = ('month', 'week')
+DEFAULT_PERIODS = 12
+MAX_PERIODS = {'month': 60, 'week': 104}
+# Buckets thinner than this are reported but not used for the change figures
+MIN_TREND_LISTINGS = 5
+TREND_MARKETS = ('buy', 'rent')
+
+LISTED_AT = "COALESCE(created_at, updated_at)"
+BUCKET_SQL = {
+    'month': f"strftime('%Y-%m-01', {LISTED_AT})",
+    'week': f"date({LISTED_AT}, 'weekday 0', '-6 days')",
+}
+LEAF_DIMENSIONS = ('city_id', 'area_id', 'category_id', 'market')
+ROLLUP_LEVELS = {
+    'city': ('city_id',),
+    'area': ('area_id',),
+    'all': (),
+}
+
+def _shift(period, bucket, steps):
+    """The bucket `steps` periods after (negative: before) `bucket`."""
+    start = date.fromisoformat(bucket)
+    if period == 'week':
+        return (start + timedelta(weeks=steps)).isoformat()
+    months = start.year * 12 + start.month - 1 + steps
+    return date(months // 12, months % 12 + 1, 1).isoformat()
+
+# --- Refresh (write side) ---------------------------------------------------
+
+def _insert_rows(conn, rows):
+    conn.executemany(
+        """
+        INSERT INTO market_trends
+            (period, level, city_id, area_id, category_id, market, bucket,
+             listings, min_price, max_price, sum_price, median, histogram)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+
+def _row(period, level, key, bucket, summary):
+    return (
+        period, level, *key, bucket, summary['listings'], summary['min_price'], summary['max_price'],
+        summary['sum_price'], summary['median'], json.dumps(summary['histogram'], separators=(',', ':')),
+    )
+
+def _refresh_bucket(conn, period, bucket):
+    """Recomputes every row of one bucket: leaves from the bucket's listings, rollups from the leaves."""
+    conn.execute("DELETE FROM market_trends WHERE period = ? AND bucket = ?", (period, bucket))
+    prices = {}
+    for r in conn.execute(
+        f"""
+        SELECT IFNULL(city_id, 0), IFNULL(area_id, 0), IFNULL(category_id, 0), IFNULL(market, ''), price
+        FROM properties
+        WHERE {LISTED_AT} >= ? AND {LISTED_AT} < ? AND price > 0
+        """,
+        (bucket, _shift(period, bucket, 1)),
+    ):
+        prices.setdefault(tuple(r[:4]), []).append(r[4])
+    if not prices:
+        return
+
+    leaves = {key: summarize_prices(values) for key, values in prices.items()}
+    rows = [_row(period, 'leaf', key, bucket, summary) for key, summary in leaves.items()]
+    for level, dims in ROLLUP_LEVELS.items():
+        groups = {}
+        for key, summary in leaves.items():
+            values = dict(zip(LEAF_DIMENSIONS, key))
+            rollup_key = tuple(values[dim] if dim in dims or dim in ('category_id', 'market') else ALL_ID for dim in LEAF_DIMENSIONS)
+            groups.setdefault(rollup_key, []).append(summary)
+        rows.extend(_row(period, level, key, bucket, combine_summaries(summaries)) for key, summaries in groups.items())
+    _insert_rows(conn, rows)
+
+def refresh_market_trends(full=False, log=None):
+    """
+    Brings market_trends up to date. Incremental by default: only the buckets marked
+    dirty (new, changed or deleted listings in them) are recomputed; `full` rebuilds all.
+    Returns {"buckets": <buckets recomputed>, "version": <new trends version>}.
+    """
+    conn = db_service.get_write_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if full:
+            conn.execute("DELETE FROM market_trends")
+            for period in PERIODS:
+                conn.execute(
+                    f"INSERT OR IGNORE INTO market_trends_dirty SELECT DISTINCT ?, {BUCKET_SQL[period]} FROM properties WHERE price > 0",
+                    (period,),
+                )
+        dirty = [tuple(r) for r in conn.execute("SELECT period, bucket FROM market_trends_dirty ORDER BY period, bucket")]
+        for period, bucket in dirty:
+            _refresh_bucket(conn, period, bucket)
+
+        conn.execute("DELETE FROM market_trends_dirty")
+        row = conn.execute("SELECT value FROM market_stats_meta WHERE key = 'trends_version'").fetchone()
+        version = (int(row['value']) if row else 0) + 1
+        conn.execute("INSERT OR REPLACE INTO market_stats_meta (key, value) VALUES ('trends_version', ?)", (str(version),))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if log:
+        log(f"Refreshed {len(dirty)} trend bucket(s); trends version {version}.")
+    return {"buckets": len(dirty), "version": version}
+
+# --- Lookups (read side) ----------------------------------------------------
+
+def trends_version():
+    """Current trends version, or None before the first refresh_market_trends."""
+    if not db_service.table_exists('market_trends'):
+        return None
+    row = db_service.execute_query("SELECT value FROM market_stats_meta WHERE key = 'trends_version'", fetch_all=False)
+    return int(row['value']) if row else None
+
+def _in(column, values):
+    return f" AND {column} IN ({', '.join(['?'] * len(values))})", list(values)
+
+def lookup_trend(period, since, city_ids=None, area_ids=None, category_ids=None):
+    """{market: [(bucket, summary), ...]} from `since` on, merged over the matching rollup rows."""
+    if city_ids is not None and area_ids is not None:
+        level = 'leaf'
+    elif city_ids is not None:
+        level = 'city'
+    elif area_ids is not None:
+        level = 'area'
+    else:
+        level = 'all'
+
+    query = "SELECT market, bucket, listings, min_price, max_price, sum_price, median, histogram FROM market_trends WHERE period = ? AND level = ?"
+    params = [period, level]
+    for column, values in (('city_id', city_ids), ('area_id', area_ids), ('category_id', category_ids)):
+        if values is not None:
+            clause, clause_params = _in(column, values)
+            query += clause
+            params.extend(clause_params)
+    clause, clause_params = _in('market', TREND_MARKETS)
+    query += clause + " AND bucket >= ?"
+    params.extend(clause_params + [since])
+
+    grouped = {}
+    for r in db_service.execute_query(query, params):
+        grouped.setdefault((r['market'], r['bucket']), []).append(r)
+    series = {}
+    for (market, bucket), rows in sorted(grouped.items()):
+        series.setdefault(market, []).append((bucket, combine_summaries(rows)))
+    return series
+
+def _change(points):
+    """Percent change in avg and median between the first and last well-populated buckets."""
+    solid = [p for p in points if p['listings'] >= MIN_TREND_LISTINGS]
+    if len(solid) < 2:
+        return None
+    first, last = solid[0], solid[-1]
+
+    def pct(key):
+        return round((last[key] - first[key]) / first[key] * 100, 1) if first[key] and last[key] else None
+    return {"from": first['bucket'], "to": last['bucket'], "avg": pct('avg'), "median": pct('median')}
+
+def get_price_trend(filters=None, period='month', periods=DEFAULT_PERIODS):
+    """
+    Asking-price trend for the city/area/category in `filters` over the last `periods`
+    weeks or months of data: {"period", "from", "to", "series": {market: [point, ...]},
+    "change": {market: {...}}}. The window ends at the newest bucket in market_trends,
+    not today. None before the first refresh or when nothing matches.
+    """
+    filters = filters or {}
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    periods = max(1, min(int(periods), MAX_PERIODS[period]))
+    version = trends_version()
+    if not version:
+        return None
+
+    cache_key = f"trend_{period}_{periods}_{filters.get('city')}_{filters.get('area')}_{filters.get('category')}_v{version}"
+    cached = CACHE.get(cache_key)
+    if cached:
+        return cached
+
+    started = time.perf_counter()
+    resolver = resolver_service.get_resolver()
+    city_ids = resolver.city_ids(filters['city'], exact=True) if filters.get('city') else None
+    area_ids = resolver.area_ids(filters['area']) if filters.get('area') else None
+    category_ids = None
+    if filters.get('category'):
+        category_ids = [r['id'] for r in db_service.execute_query(
+            "SELECT id FROM categories WHERE LOWER(name) = ?", (str(filters['category']).lower(),)
+        )]
+    latest = db_service.execute_query(
+        "SELECT MAX(bucket) AS bucket FROM market_trends WHERE period = ? AND level = 'all'", (period,), fetch_all=False
+    )
+    if not latest or not latest['bucket'] or [] in (city_ids, area_ids, category_ids):
+        return None
+
+    since = _shift(period, latest['bucket'], -(periods - 1))
+    series = {}
+    for market, points in lookup_trend(period, since, city_ids, area_ids, category_ids).items():
+        series[market] = [{
+            "bucket": bucket,
+            "listings": s['listings'],
+            "avg": round(s['sum_price'] / s['listings'], 2),
+            "median": round(s['median'], 2) if s['median'] is not None else None,
+            "min": s['min_price'],
+            "max": s['max_price'],
+        } for bucket, s in points]
+    PHASE_SECONDS.observe(time.perf_counter() - started, 'db', 'trend')
+    if not series:
+        return None
+
+    result = {
+        "period": period,
+        "from": since,
+        "to": latest['bucket'],
+        "series": series,
+        "change": {market: _change(points) for market, points in series.items()},
+    }
+    CACHE.set(cache_key, result, ttl=24 * 3600)
+    return result
@@ -0,0 +1,30 @@
+# Word lists shared by the local query parser and the plan cache. Kept in a module of
+# their own (no imports) so both can depend on it without importing each other.
+
+# Words that carry no search meaning; two messages that differ only in these share a plan
+FILLER_WORDS = {
+    'a', 'an', 'the', 'i', 'im', 'me', 'my', 'we', 'us', 'you', 'can', 'could', 'would', 'please', 'pls',
+    'show', 'find', 'get', 'give', 'list', 'search', 'looking', 'look', 'want', 'need', 'like', 'some',
+    'any', 'for', 'to', 'of', 'is', 'are', 'there', 'what', 'which', 'do', 'have', 'has', 'with', 'and',
+    'hi', 'hello', 'hey', 'thanks', 'thank', 'kindly', 'just', 'all', 'available', 'options', 'properties',
+}
+# Words that point back at earlier turns; such messages are only reused within the same history
+REFERENTIAL_WORDS = {
+    'more', 'another', 'other', 'others', 'cheaper', 'bigger', 'smaller', 'larger', 'those', 'these',
+    'that', 'them', 'it', 'same', 'similar', 'next', 'again', 'instead', 'also', 'else', 'previous',
+    'above', 'ones', 'first', 'last', 'second',
+}
+
+# Words that flip a plan however similar the rest of the message is ('villa not apartment')
+NEGATION_WORDS = {'not', 'no', 'without', 'except', 'excluding', 'but'}
+
+# Category and rent/buy words the parser turns into filters
+CATEGORY_WORDS = {
+    'apartment': 'Apartment', 'apartments': 'Apartment', 'apt': 'Apartment', 'flat': 'Apartment', 'flats': 'Apartment',
+    'villa': 'Villa', 'villas': 'Villa',
+    'townhouse': 'Townhouse', 'townhouses': 'Townhouse',
+    'penthouse': 'Penthouse', 'penthouses': 'Penthouse',
+    'office': 'Office', 'offices': 'Office',
+}
+RENT_WORDS = {'rent', 'rental', 'rentals', 'renting', 'lease', 'leasing', 'yearly', 'annual', 'monthly', 'tenant'}
+BUY_WORDS = {'buy', 'buying', 'purchase', 'sale', 'sell', 'own', 'invest', 'investment', 'freehold', 'offplan'}
@@ -0,0 +1,86 @@
+-- Normalized, index-friendly copies of the columns query_properties filters on.
+--   bedrooms_int   integer bedrooms ('Studio' -> 0), instead of comparing TEXT
+--   is_residential 1 when the category is one of the residential categories
+--   market         'rent' / 'buy', or 'both' for the price-based cross matches
+--                  (rent above 2M reads as a sale, buy below 200k reads as a rental)
+--   location_lc    lowercase free-text location
+
+ALTER TABLE properties ADD COLUMN bedrooms_int INTEGER;
+ALTER TABLE properties ADD COLUMN is_residential INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE properties ADD COLUMN market TEXT;
+ALTER TABLE properties ADD COLUMN location_lc TEXT;
+
+UPDATE properties SET
+  bedrooms_int = CASE
+    WHEN TRIM(bedrooms) GLOB '[0-9]*' THEN CAST(TRIM(bedrooms) AS INTEGER)
+    WHEN LOWER(TRIM(bedrooms)) = 'studio' THEN 0
+  END,
+  is_residential = COALESCE((
+    SELECT cat.name IN ('Apartment', 'Villa', 'Townhouse', 'Penthouse', 'Duplex', 'Compound', 'Bungalow', 'Hotel & Hotel Apartment')
+    FROM categories cat WHERE cat.id = properties.category_id
+  ), 0),
+  market = CASE
+    WHEN (property_type = 'rent' AND price > 2000000) OR (property_type = 'buy' AND price < 200000) THEN 'both'
+    WHEN property_type IN ('rent', 'buy') THEN property_type
+  END,
+  location_lc = LOWER(location);
+
+-- Keep the normalized columns in sync for rows written after the migration
+CREATE TRIGGER IF NOT EXISTS trg_properties_search_columns_insert
+AFTER INSERT ON properties
+BEGIN
+  UPDATE properties SET
+    bedrooms_int = CASE
+      WHEN TRIM(NEW.bedrooms) GLOB '[0-9]*' THEN CAST(TRIM(NEW.bedrooms) AS INTEGER)
+      WHEN LOWER(TRIM(NEW.bedrooms)) = 'studio' THEN 0
+    END,
+    is_residential = COALESCE((
+      SELECT cat.name IN ('Apartment', 'Villa', 'Townhouse', 'Penthouse', 'Duplex', 'Compound', 'Bungalow', 'Hotel & Hotel Apartment')
+      FROM categories cat WHERE cat.id = NEW.category_id
+    ), 0),
+    market = CASE
+      WHEN (NEW.property_type = 'rent' AND NEW.price > 2000000) OR (NEW.property_type = 'buy' AND NEW.price < 200000) THEN 'both'
+      WHEN NEW.property_type IN ('rent', 'buy') THEN NEW.property_type
+    END,
+    location_lc = LOWER(NEW.location)
+  WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_properties_search_columns_update
+AFTER UPDATE OF bedrooms, category_id, property_type, price, location ON properties
+BEGIN
+  UPDATE properties SET
+    bedrooms_int = CASE
+      WHEN TRIM(NEW.bedrooms) GLOB '[0-9]*' THEN CAST(TRIM(NEW.bedrooms) AS INTEGER)
+      WHEN LOWER(TRIM(NEW.bedrooms)) = 'studio' THEN 0
+    END,
+    is_residential = COALESCE((
+      SELECT cat.name IN ('Apartment', 'Villa', 'Townhouse', 'Penthouse', 'Duplex', 'Compound', 'Bungalow', 'Hotel & Hotel Apartment')
+      FROM categories cat WHERE cat.id = NEW.category_id
+    ), 0),
+    market = CASE
+      WHEN (NEW.property_type = 'rent' AND NEW.price > 2000000) OR (NEW.property_type = 'buy' AND NEW.price < 200000) THEN 'both'
+      WHEN NEW.property_type IN ('rent', 'buy') THEN NEW.property_type
+    END,
+    location_lc = LOWER(NEW.location)
+  WHERE id = NEW.id;
+END;
+
+-- Partial indexes matching the search/stats predicates (status = 'active' AND price > 0).
+-- Price comes last so SQLite can walk rows in ORDER BY price order and stop at LIMIT.
+CREATE INDEX IF NOT EXISTS idx_properties_search_city
+  ON properties(city_id, is_residential, bedrooms_int, price, market)
+  WHERE status = 'active' AND price > 0;
+CREATE INDEX IF NOT EXISTS idx_properties_search_beds
+  ON properties(bedrooms_int, is_residential, price, market)
+  WHERE status = 'active' AND price > 0;
+CREATE INDEX IF NOT EXISTS idx_properties_search_residential
+  ON properties(is_residential, market, price)
+  WHERE status = 'active' AND price > 0;
+CREATE INDEX IF NOT EXISTS idx_properties_search_category
+  ON properties(category_id, city_id, price, market)
+  WHERE status = 'active' AND price > 0;
+-- Covering index for get_property_stats aggregates per city
+CREATE INDEX IF NOT EXISTS idx_properties_stats_city
+  ON properties(city_id, status, price)
+  WHERE status = 'active' AND price > 0;
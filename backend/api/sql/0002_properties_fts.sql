@@ -0,0 +1,43 @@
+-- FTS5 index over the listing text, used by query_properties for area/location
+-- terms and planner keywords ("sea view", "near metro") with BM25 ranking.
+-- External-content table: the text lives in properties, the index is kept in
+-- sync by the triggers below.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS properties_fts USING fts5(
+  title,
+  description,
+  location,
+  content = 'properties',
+  content_rowid = 'id',
+  tokenize = 'unicode61 remove_diacritics 2'
+);
+
+INSERT INTO properties_fts(properties_fts) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS trg_properties_fts_insert
+AFTER INSERT ON properties
+BEGIN
+  INSERT INTO properties_fts(rowid, title, description, location)
+  VALUES (NEW.id, NEW.title, NEW.description, NEW.location);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_properties_fts_delete
+AFTER DELETE ON properties
+BEGIN
+  INSERT INTO properties_fts(properties_fts, rowid, title, description, location)
+  VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.location);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_properties_fts_update
+AFTER UPDATE OF title, description, location ON properties
+BEGIN
+  INSERT INTO properties_fts(properties_fts, rowid, title, description, location)
+  VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.location);
+  INSERT INTO properties_fts(rowid, title, description, location)
+  VALUES (NEW.id, NEW.title, NEW.description, NEW.location);
+END;
+
+-- Area matches now resolve to area ids, so give area_id its own search index
+CREATE INDEX IF NOT EXISTS idx_properties_search_area
+  ON properties(area_id, is_residential, price, market)
+  WHERE status = 'active' AND price > 0;
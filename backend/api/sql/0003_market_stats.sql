@@ -0,0 +1,67 @@
+-- Materialized market statistics, served by get_property_stats / /api/stats.
+--
+-- level = 'leaf' rows hold one segment (city, area, category, beds, rent/buy);
+-- 'city', 'area', 'city_area' and 'all' rows are rollups over those leaves.
+-- Dimensions a row does not group by hold -2 ('*' for market); NULL dimensions
+-- are stored as 0 (ids), -1 (bedrooms_int) and '' (market) so they can be keys.
+-- Only active listings with a price are counted.
+CREATE TABLE IF NOT EXISTS market_stats (
+  level TEXT NOT NULL,
+  city_id INTEGER NOT NULL,
+  area_id INTEGER NOT NULL,
+  category_id INTEGER NOT NULL,
+  bedrooms_int INTEGER NOT NULL,
+  market TEXT NOT NULL,
+  listings INTEGER NOT NULL,
+  min_price REAL NOT NULL,
+  max_price REAL NOT NULL,
+  sum_price REAL NOT NULL,
+  p25 REAL,
+  median REAL,
+  p75 REAL,
+  p90 REAL,
+  histogram TEXT NOT NULL,
+  updated_at TEXT NOT NULL,
+  PRIMARY KEY (level, city_id, area_id, category_id, bedrooms_int, market)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_market_stats_area ON market_stats(level, area_id);
+
+-- Segments touched since the last refresh (same sentinel encoding as market_stats)
+CREATE TABLE IF NOT EXISTS market_stats_dirty (
+  city_id INTEGER NOT NULL,
+  area_id INTEGER NOT NULL,
+  category_id INTEGER NOT NULL,
+  bedrooms_int INTEGER NOT NULL,
+  market TEXT NOT NULL,
+  PRIMARY KEY (city_id, area_id, category_id, bedrooms_int, market)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS market_stats_meta (
+  key TEXT PRIMARY KEY,
+  value TEXT
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_market_stats_dirty_insert
+AFTER INSERT ON properties
+BEGIN
+  INSERT OR IGNORE INTO market_stats_dirty
+  VALUES (IFNULL(NEW.city_id, 0), IFNULL(NEW.area_id, 0), IFNULL(NEW.category_id, 0), IFNULL(NEW.bedrooms_int, -1), IFNULL(NEW.market, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_market_stats_dirty_delete
+AFTER DELETE ON properties
+BEGIN
+  INSERT OR IGNORE INTO market_stats_dirty
+  VALUES (IFNULL(OLD.city_id, 0), IFNULL(OLD.area_id, 0), IFNULL(OLD.category_id, 0), IFNULL(OLD.bedrooms_int, -1), IFNULL(OLD.market, ''));
+END;
+
+-- bedrooms_int/market are written by the 0001 triggers, which fire this one in turn
+CREATE TRIGGER IF NOT EXISTS trg_market_stats_dirty_update
+AFTER UPDATE OF price, status, city_id, area_id, category_id, bedrooms_int, market ON properties
+BEGIN
+  INSERT OR IGNORE INTO market_stats_dirty
+  VALUES (IFNULL(OLD.city_id, 0), IFNULL(OLD.area_id, 0), IFNULL(OLD.category_id, 0), IFNULL(OLD.bedrooms_int, -1), IFNULL(OLD.market, ''));
+  INSERT OR IGNORE INTO market_stats_dirty
+  VALUES (IFNULL(NEW.city_id, 0), IFNULL(NEW.area_id, 0), IFNULL(NEW.category_id, 0), IFNULL(NEW.bedrooms_int, -1), IFNULL(NEW.market, ''));
+END;
@@ -0,0 +1,12 @@
+-- Support for `python manage.py ingest_listings`.
+--
+-- Feed listings are matched to existing rows by source_url. The index is not UNIQUE:
+-- older loads may hold duplicate URLs, and the ingester updates every copy.
+CREATE INDEX IF NOT EXISTS idx_properties_source_url ON properties(source_url);
+
+-- Secondary indexes dropped for a full load, with the SQL to recreate them. A load
+-- that dies half way leaves its rows here; the next ingest run rebuilds them first.
+CREATE TABLE IF NOT EXISTS ingest_deferred_indexes (
+  name TEXT PRIMARY KEY,
+  sql TEXT NOT NULL
+);
@@ -0,0 +1,69 @@
+-- Price trends: asking prices of listings grouped by the week/month they came to market,
+-- served by trend_service.get_price_trend (/api/stats with trend=month|week).
+--
+-- A listing belongs to the bucket of its created_at (updated_at when created_at is
+-- missing), whatever its current status, so history is kept after listings go inactive.
+-- bucket is the period's first day ('YYYY-MM-DD'; weeks start on Monday).
+-- level = 'leaf' rows hold one (city, area, category, rent/buy) segment per bucket;
+-- 'city', 'area' and 'all' rows roll the leaves up, keeping category and market.
+-- Sentinels as in market_stats: NULL ids are 0, rolled-up ids -2, NULL market ''.
+CREATE TABLE IF NOT EXISTS market_trends (
+  period TEXT NOT NULL,
+  level TEXT NOT NULL,
+  city_id INTEGER NOT NULL,
+  area_id INTEGER NOT NULL,
+  category_id INTEGER NOT NULL,
+  market TEXT NOT NULL,
+  bucket TEXT NOT NULL,
+  listings INTEGER NOT NULL,
+  min_price REAL NOT NULL,
+  max_price REAL NOT NULL,
+  sum_price REAL NOT NULL,
+  median REAL,
+  histogram TEXT NOT NULL,
+  PRIMARY KEY (period, level, city_id, area_id, category_id, market, bucket)
+) WITHOUT ROWID;
+
+-- A bucket refresh replaces all of its rows
+CREATE INDEX IF NOT EXISTS idx_market_trends_bucket ON market_trends(period, bucket);
+
+-- Buckets touched since the last refresh; each is recomputed from its own date range
+CREATE TABLE IF NOT EXISTS market_trends_dirty (
+  period TEXT NOT NULL,
+  bucket TEXT NOT NULL,
+  PRIMARY KEY (period, bucket)
+) WITHOUT ROWID;
+
+-- The date range scan behind a bucket refresh (same expression as the queries)
+CREATE INDEX IF NOT EXISTS idx_properties_listed_at ON properties(COALESCE(created_at, updated_at));
+
+-- Listings without any date have no bucket; OR IGNORE skips their NULL keys
+CREATE TRIGGER IF NOT EXISTS trg_market_trends_dirty_insert
+AFTER INSERT ON properties
+BEGIN
+  INSERT OR IGNORE INTO market_trends_dirty VALUES ('month', strftime('%Y-%m-01', COALESCE(NEW.created_at, NEW.updated_at)));
+  INSERT OR IGNORE INTO market_trends_dirty VALUES ('week', date(COALESCE(NEW.created_at, NEW.updated_at), 'weekday 0', '-6 days'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_market_trends_dirty_delete
+AFTER DELETE ON properties
+BEGIN
+  INSERT OR IGNORE INTO market_trends_dirty VALUES ('month', strftime('%Y-%m-01', COALESCE(OLD.created_at, OLD.updated_at)));
+  INSERT OR IGNORE INTO market_trends_dirty VALUES ('week', date(COALESCE(OLD.created_at, OLD.updated_at), 'weekday 0', '-6 days'));
+END;
+
+-- market is written by the 0001 triggers after an insert, which fires this one as well
+CREATE TRIGGER IF NOT EXISTS trg_market_trends_dirty_update
+AFTER UPDATE OF price, city_id, area_id, category_id, market, created_at, updated_at ON properties
+BEGIN
+  INSERT OR IGNORE INTO market_trends_dirty VALUES ('month', strftime('%Y-%m-01', COALESCE(OLD.created_at, OLD.updated_at)));
+  INSERT OR IGNORE INTO market_trends_dirty VALUES ('week', date(COALESCE(OLD.created_at, OLD.updated_at), 'weekday 0', '-6 days'));
+  INSERT OR IGNORE INTO market_trends_dirty VALUES ('month', strftime('%Y-%m-01', COALESCE(NEW.created_at, NEW.updated_at)));
+  INSERT OR IGNORE INTO market_trends_dirty VALUES ('week', date(COALESCE(NEW.created_at, NEW.updated_at), 'weekday 0', '-6 days'));
+END;
+
+-- Existing listings: every bucket starts dirty, so the first refresh builds the history
+INSERT OR IGNORE INTO market_trends_dirty
+SELECT DISTINCT 'month', strftime('%Y-%m-01', COALESCE(created_at, updated_at)) FROM properties WHERE price > 0;
+INSERT OR IGNORE INTO market_trends_dirty
+SELECT DISTINCT 'week', date(COALESCE(created_at, updated_at), 'weekday 0', '-6 days') FROM properties WHERE price > 0;
@@ -0,0 +1,71 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..services import dataset_service, db_service, pricing_service, stats_service, trend_service
+from ..services.cache_service import CACHE
+from ..services.schema_service import apply_migrations
+
+
+def quiet(*args, **kwargs):
+    pass
+
+
+class ListingsDatabaseTestCase(SimpleTestCase):
+    """Runs against a small generated houser.db (seed tables, migrations, market stats and trends)."""
+
+    ROWS = 2000
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._tmpdir = tempfile.mkdtemp(prefix='houser-test-')
+        path = Path(cls._tmpdir) / 'houser.db'
+        dataset_service.build_dataset(path, cls.ROWS, seed=7, log=quiet)
+        cls._db_path = mock.patch.object(db_service, 'DB_PATH', path)
+        cls._db_path.start()
+        db_service.close_db_connections()
+        # Price segments are cached by stats version, which restarts with every test database
+        pricing_service._state.update(version=None, segments=None, checked=0.0)
+        apply_migrations(log=quiet)
+        stats_service.refresh_market_stats(full=True)
+        trend_service.refresh_market_trends(full=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        db_service.close_db_connections()
+        cls._db_path.stop()
+        shutil.rmtree(cls._tmpdir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        CACHE.clear()
+
+    def execute(self, sql, params=(), many=False):
+        """Runs one write statement on the test database."""
+        conn = db_service.get_write_connection()
+        try:
+            with conn:
+                (conn.executemany if many else conn.execute)(sql, params)
+        finally:
+            conn.close()
+
+    def insert_generated(self, count, seed=99, created_at=None):
+        """Inserts `count` generated listings; `created_at` overrides the first one's date."""
+        conn = db_service.get_write_connection()
+        try:
+            rows = list(dataset_service.generate_rows(conn, count, seed=seed))
+        finally:
+            conn.close()
+        if created_at:
+            rows[0] = rows[0][:15] + (created_at,) + rows[0][16:]
+        self.execute(dataset_service.INSERT_SQL, rows, many=True)
+
+    def assertSummaryEqual(self, summary, live):
+        self.assertEqual(summary['listings'], live['listings'])
+        self.assertEqual(summary['min_price'], live['min_price'])
+        self.assertEqual(summary['max_price'], live['max_price'])
+        self.assertAlmostEqual(summary['sum_price'], live['sum_price'], places=2)
@@ -0,0 +1,110 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..services.cache_service import BoundedCache, SharedCache, TieredCache, _check_shared_path
+
+
+class BoundedCacheTests(SimpleTestCase):
+    def make(self, **kwargs):
+        return BoundedCache(sweep_interval=0, **kwargs)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = self.make(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_entry_expires_after_its_ttl(self):
+        cache = self.make()
+        with mock.patch('api.services.cache_service.time.time', return_value=1000.0):
+            cache.set('short', 'x', ttl=5)
+            cache.set('long', 'y', ttl=60)
+        with mock.patch('api.services.cache_service.time.time', return_value=1010.0):
+            self.assertIsNone(cache.get('short'))
+            self.assertEqual(cache.get('long'), 'y')
+            self.assertEqual(cache.stats()['expirations'], 1)
+        with mock.patch('api.services.cache_service.time.time', return_value=1100.0):
+            self.assertEqual(cache.sweep(), 1)
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_byte_limit_evicts_and_skips_oversized_values(self):
+        cache = self.make(max_bytes=80)
+        cache.set('a', 'x' * 40)
+        cache.set('b', 'y' * 40)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 'y' * 40)
+        self.assertLessEqual(cache.stats()['bytes'], 80)
+
+        cache.set('huge', 'z' * 200)
+        self.assertIsNone(cache.get('huge'))
+        self.assertEqual(cache.get('b'), 'y' * 40)
+
+    def test_overwrite_keeps_byte_count_exact(self):
+        cache = self.make()
+        cache.set('a', 'x' * 50)
+        cache.set('a', 'x')
+        self.assertEqual(cache.stats()['bytes'], BoundedCache._estimate_size('a', 'x'))
+        cache.delete('a')
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+
+class SharedCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir)
+        self.path = os.path.join(self.tempdir, 'cache.db')
+
+    def worker(self):
+        # One TieredCache per simulated worker process, all on the same shared file
+        return TieredCache(BoundedCache(sweep_interval=0), SharedCache(self.path), generation_check=0)
+
+    def test_values_are_shared_between_workers(self):
+        first, second = self.worker(), self.worker()
+        first.set('plan', {"city": "Dubai"})
+        self.assertEqual(second.get('plan'), {"city": "Dubai"})
+        self.assertEqual(second.l1.get('plan'), {"city": "Dubai"})
+
+    def test_clear_in_one_worker_empties_every_l1(self):
+        first, second = self.worker(), self.worker()
+        first.set('plan', 1)
+        self.assertEqual(second.get('plan'), 1)
+
+        first.clear()
+        self.assertIsNone(second.get('plan'))
+        self.assertEqual(second.l1.stats()['entries'], 0)
+
+    def test_clear_tolerates_a_failing_shared_tier(self):
+        cache = self.worker()
+        cache.set('plan', 1)
+        with mock.patch.object(cache.l2, '_connect', side_effect=sqlite3.OperationalError("database is locked")):
+            with self.assertLogs('api.services.cache_service', 'WARNING'):
+                cache.clear()
+        self.assertIsNone(cache.l1.get('plan'))
+        self.assertEqual(cache.l2.stats()['errors'], 1)
+
+    def test_shared_path_is_created_owner_only(self):
+        _check_shared_path(self.path)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_shared_path_writable_by_others_is_refused(self):
+        open(self.path, 'w').close()
+        os.chmod(self.path, 0o666)
+        with self.assertRaises(PermissionError):
+            _check_shared_path(self.path)
+
+    def test_shared_path_owned_by_another_user_is_refused(self):
+        open(self.path, 'w').close()
+        os.chmod(self.path, 0o600)
+        with mock.patch('api.services.cache_service.os.getuid', return_value=os.getuid() + 1):
+            with self.assertRaises(PermissionError):
+                _check_shared_path(self.path)
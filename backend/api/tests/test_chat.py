@@ -0,0 +1,97 @@
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import AsyncClient
+
+from .. import views
+from ..services import ai_service
+from .support import ListingsDatabaseTestCase
+
+PLAN = {
+    "type": "search",
+    "thought": "Buyer looking in Dubai",
+    "searchPlan": {"primary": {"city": "Dubai", "propertyType": "buy", "isResidential": True}},
+}
+
+
+def _events(body):
+    return [json.loads(frame[len('data: '):]) for frame in body.decode().split('\n\n') if frame]
+
+
+class FakeAsyncClient:
+    """AsyncOpenAI stand-in: a JSON intent for plain calls, a token stream for stream=True."""
+
+    def __init__(self, intent, tokens=("Here ", "are ", "your homes.")):
+        self.intent = intent
+        self.tokens = tokens
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get('stream'):
+            return self.stream()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(self.intent)))])
+
+    async def stream(self):
+        for token in self.tokens:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+
+class AsyncChatTests(ListingsDatabaseTestCase):
+    ROWS = 200
+
+    def setUp(self):
+        super().setUp()
+        # The sync client must never be reached on the ASGI path
+        patcher = mock.patch.object(ai_service, 'get_client', side_effect=AssertionError("sync client used"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def chat(self, message, **extra):
+        response = await AsyncClient().post('/api/chat', dict(message=message, **extra), content_type='application/json')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        return _events(body)
+
+    async def test_llm_intent_streams_results_and_narrative(self):
+        client = FakeAsyncClient(PLAN)
+        with mock.patch.object(ai_service, 'get_async_client', return_value=client), \
+                mock.patch.object(views, 'local_intent', return_value=None):
+            events = await self.chat("something to buy in dubai, surprise me")
+
+        types = [e['type'] for e in events]
+        self.assertEqual(types[0], 'intent')
+        self.assertEqual(events[0]['filters'], PLAN['searchPlan']['primary'])
+        self.assertIn('results', types)
+        self.assertEqual(types[-2:], ['final', 'timing'])
+        results = next(e for e in events if e['type'] == 'results')['results']
+        self.assertTrue(results)
+        self.assertTrue(all(r['city'] == 'Dubai' for r in results if r['isExactMatch']))
+        narrative = ''.join(e['content'] for e in events if e['type'] == 'text_chunk')
+        self.assertEqual(narrative, "Here are your homes.")
+        self.assertEqual([bool(c.get('stream')) for c in client.calls], [False, True])
+
+    async def test_field_projection_applies_to_streamed_results(self):
+        with mock.patch.object(ai_service, 'get_async_client', return_value=FakeAsyncClient(PLAN)), \
+                mock.patch.object(views, 'local_intent', return_value=None):
+            events = await self.chat("something to buy in dubai", fields=['id', 'price'])
+        results = next(e for e in events if e['type'] == 'results')['results']
+        self.assertTrue(results)
+        self.assertEqual({key for r in results for key in r}, {'id', 'price'})
+
+    async def test_info_intent_ends_after_the_reply(self):
+        intent = {"type": "info", "response": "Hello! Which area interests you?"}
+        with mock.patch.object(ai_service, 'get_async_client', return_value=FakeAsyncClient(intent)), \
+                mock.patch.object(views, 'local_intent', return_value=None):
+            events = await self.chat("hi there")
+        self.assertEqual([e['type'] for e in events], ['text_chunk', 'final', 'timing'])
+        self.assertEqual(events[0]['content'].strip(), intent['response'])
+
+    async def test_missing_client_streams_an_error_event(self):
+        with mock.patch.object(ai_service, 'get_async_client', return_value=None), \
+                mock.patch.object(views, 'local_intent', return_value=None):
+            events = await self.chat("tell me something")
+        self.assertEqual([e['type'] for e in events], ['error', 'timing'])
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+
+from ..services.coalesce_service import AsyncSingleFlight, SingleFlight
+
+
+class SingleFlightTests(SimpleTestCase):
+    FOLLOWERS = 4
+
+    def run_concurrently(self, flight, fn):
+        """Starts a leader and FOLLOWERS callers on one key, releasing fn once all have joined."""
+        release = threading.Event()
+        calls = []
+
+        def blocking():
+            calls.append(1)
+            release.wait(5)
+            return fn()
+
+        def call():
+            try:
+                return flight.do('key', blocking)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.FOLLOWERS + 1) as pool:
+            futures = [pool.submit(call)]
+            self.wait_for(lambda: flight.stats()['in_flight'] == 1)
+            futures += [pool.submit(call) for _ in range(self.FOLLOWERS)]
+            self.wait_for(lambda: flight.stats()['coalesced'] == self.FOLLOWERS)
+            release.set()
+            results = [f.result(5) for f in futures]
+        return calls, results
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out waiting for callers")
+            time.sleep(0.001)
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight('test')
+        result = {"total": 3}
+        calls, results = self.run_concurrently(flight, lambda: result)
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r is result for r in results))
+        self.assertEqual(flight.stats(), {"calls": self.FOLLOWERS + 1, "coalesced": self.FOLLOWERS, "in_flight": 0})
+
+    def test_error_reaches_every_caller_and_is_not_cached(self):
+        flight = SingleFlight('test')
+
+        def fail():
+            raise ValueError("db down")
+
+        calls, results = self.run_concurrently(flight, fail)
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+        # The failed call is forgotten: the next caller runs the function again
+        self.assertEqual(flight.do('key', lambda: 'ok'), 'ok')
+
+
+class AsyncSingleFlightTests(SimpleTestCase):
+    def test_concurrent_coroutines_share_one_task(self):
+        flight = AsyncSingleFlight('test')
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"type": "search"}
+
+        async def main():
+            return await asyncio.gather(*(flight.do('key', fetch) for _ in range(5)))
+
+        results = asyncio.run(main())
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_cancelled_caller_does_not_cancel_the_others(self):
+        flight = AsyncSingleFlight('test')
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return 'plan'
+
+        async def main():
+            first = asyncio.ensure_future(flight.do('key', fetch))
+            second = asyncio.ensure_future(flight.do('key', fetch))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(main()), 'plan')
+
+    def test_error_reaches_every_coroutine(self):
+        flight = AsyncSingleFlight('test')
+
+        async def fail():
+            await asyncio.sleep(0)
+            raise ValueError("upstream error")
+
+        async def main():
+            return await asyncio.gather(*(flight.do('key', fail) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(main())
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
@@ -0,0 +1,72 @@
+import time
+from unittest import mock, skipIf
+
+from ..services import columnar_service, db_service
+from .support import ListingsDatabaseTestCase
+
+
+@skipIf(not columnar_service.available(), "NumPy is not installed")
+class ColumnarSearchTests(ListingsDatabaseTestCase):
+    SINGLE_TIER = {"primary": {"city": "Dubai", "propertyType": "rent"}}
+    TIERED = {"primary": {"city": "Dubai", "area": "Dubai Marina", "propertyType": "buy"}}
+
+    def setUp(self):
+        super().setUp()
+        self.engine = columnar_service.ColumnarEngine()
+        self.engine.build()
+        # Queries keep this snapshot: no background rebuild during a test
+        self.engine._checked = time.monotonic()
+        patches = (
+            mock.patch.object(columnar_service, 'CHECK_INTERVAL', 3600),
+            mock.patch.object(columnar_service, 'get_engine', return_value=self.engine),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def pages(self, plan, columnar, page_size=7):
+        ids, cursor = [], None
+        while True:
+            page = db_service.query_properties(plan, page_size=page_size, cursor=cursor, columnar=columnar)
+            if columnar:
+                self.assertEqual(page['timing']['engine'], 'columnar')
+            ids.extend(r['id'] for r in page['results'])
+            cursor = page['nextCursor']
+            if not cursor:
+                return ids
+
+    def test_pages_match_sql(self):
+        for plan in (self.SINGLE_TIER, self.TIERED):
+            with self.subTest(plan=plan):
+                self.assertEqual(self.pages(plan, columnar=True), self.pages(plan, columnar=False))
+
+    def test_listings_deactivated_after_the_build_do_not_end_paging(self):
+        before = self.pages(self.SINGLE_TIER, columnar=False)
+        # A whole page's worth, so a page can come back empty before it is topped up
+        gone = before[5:20]
+        conn = db_service.get_write_connection()
+        try:
+            with conn:
+                conn.execute(f"UPDATE properties SET status = 'inactive' WHERE id IN ({', '.join(['?'] * len(gone))})", gone)
+        finally:
+            conn.close()
+        expected = [i for i in before if i not in gone]
+        self.assertEqual(self.pages(self.SINGLE_TIER, columnar=True), expected)
+        self.assertEqual(self.pages(self.SINGLE_TIER, columnar=False), expected)
+
+
+class ColumnarEngineTests(ListingsDatabaseTestCase):
+    ROWS = 10
+
+    def test_no_version_probe_while_a_rebuild_runs(self):
+        engine = columnar_service.ColumnarEngine()
+        engine._building = True
+        with mock.patch.object(engine, '_data_version', side_effect=AssertionError("probed during a rebuild")):
+            self.assertIsNone(engine.snapshot())
+
+    def test_one_background_build_at_a_time(self):
+        engine = columnar_service.ColumnarEngine()
+        with mock.patch.object(engine, '_build_in_background') as build:
+            engine._start_build()
+            engine._start_build()
+        self.assertEqual(build.call_count, 1)
@@ -0,0 +1,115 @@
+import csv
+import gzip
+import json
+from pathlib import Path
+
+from ..services import db_service, ingest_service
+from .support import ListingsDatabaseTestCase, quiet
+
+
+def _listing(n, **overrides):
+    record = {
+        "source_url": f"https://feed.example/listing/{n}",
+        "source": "examplefeed",
+        "title": f"Apartment {n}",
+        "price": "AED 1,200,000",
+        "beds": 2,
+        "type": "for sale",
+        "city": "Dubai",
+        "area": "Dubai Marina",
+        "category": "Apartment",
+    }
+    record.update(overrides)
+    return record
+
+
+class IngestTests(ListingsDatabaseTestCase):
+    ROWS = 10
+
+    def setUp(self):
+        super().setUp()
+        self.execute("DELETE FROM properties WHERE source = 'examplefeed'")
+
+    def write_feed(self, name, records):
+        path = Path(self._tmpdir) / name
+        with open(path, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+        return path
+
+    def ingest(self, records, **kwargs):
+        path = self.write_feed('feed.jsonl', records)
+        return ingest_service.ingest_feeds([path], log=quiet, **kwargs)
+
+    def listings(self):
+        return {row['source_url']: row for row in db_service.execute_query(
+            "SELECT * FROM properties WHERE source = 'examplefeed'"
+        )}
+
+    def test_upsert_matches_by_source_url(self):
+        summary = self.ingest([_listing(n) for n in range(5)])
+        self.assertEqual((summary['inserted'], summary['updated'], summary['unchanged']), (5, 0, 0))
+        row = self.listings()[_listing(0)['source_url']]
+        self.assertEqual((row['price'], row['bedrooms'], row['property_type'], row['status']), (1200000.0, '2', 'buy', 'active'))
+        self.assertEqual(row['location'], 'Dubai Marina, Dubai')
+        self.assertIsNotNone(row['area_id'])
+        self.assertIsNotNone(row['category_id'])
+
+        summary = self.ingest([_listing(n) for n in range(4)] + [_listing(4, price=990000)])
+        self.assertEqual((summary['inserted'], summary['updated'], summary['unchanged']), (0, 1, 4))
+        listings = self.listings()
+        self.assertEqual(len(listings), 5)
+        self.assertEqual(listings[_listing(4)['source_url']]['price'], 990000.0)
+
+    def test_records_without_source_url_are_skipped(self):
+        summary = self.ingest([_listing(0), _listing(1, source_url=None)])
+        self.assertEqual((summary['read'], summary['skipped'], summary['inserted']), (2, 1, 1))
+
+    def test_gzipped_csv_and_json_array_feeds(self):
+        csv_path = Path(self._tmpdir) / 'feed.csv.gz'
+        with gzip.open(csv_path, 'wt', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(_listing(0)))
+            writer.writeheader()
+            writer.writerows([_listing(0), _listing(1)])
+        json_path = Path(self._tmpdir) / 'feed.json'
+        json_path.write_text(json.dumps([_listing(2), _listing(3)]))
+
+        summary = ingest_service.ingest_feeds([csv_path, json_path], log=quiet)
+        self.assertEqual(summary['inserted'], 4)
+        self.assertEqual(len(self.listings()), 4)
+
+    def test_missing_listings_are_deactivated_within_the_ratio(self):
+        self.ingest([_listing(n) for n in range(10)])
+
+        summary = self.ingest([_listing(n) for n in range(8)], mark_missing=True)
+        self.assertEqual(summary['deactivated'], 2)
+        statuses = {url: row['status'] for url, row in self.listings().items()}
+        self.assertEqual(statuses[_listing(9)['source_url']], 'inactive')
+        self.assertEqual(sum(status == 'active' for status in statuses.values()), 8)
+
+    def test_truncated_feed_does_not_deactivate_the_source(self):
+        self.ingest([_listing(n) for n in range(10)])
+
+        summary = self.ingest([_listing(n) for n in range(5)], mark_missing=True)
+        self.assertEqual(summary['deactivated'], 0)
+        self.assertTrue(all(row['status'] == 'active' for row in self.listings().values()))
+
+        summary = self.ingest([_listing(n) for n in range(5)], mark_missing=True, max_deactivate_ratio=None)
+        self.assertEqual(summary['deactivated'], 5)
+
+    def test_other_sources_are_never_deactivated(self):
+        before = db_service.execute_query("SELECT COUNT(*) AS n FROM properties WHERE status = 'active'")[0]['n']
+        self.ingest([_listing(0)], mark_missing=True)
+        after = db_service.execute_query("SELECT COUNT(*) AS n FROM properties WHERE status = 'active'")[0]['n']
+        self.assertEqual(after, before + 1)
+
+    def test_full_load_rebuilds_deferred_indexes(self):
+        def indexes():
+            return {row['name'] for row in db_service.execute_query(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'properties' AND sql IS NOT NULL"
+            )}
+
+        before = indexes()
+        self.ingest([_listing(n) for n in range(3)], full=True)
+        self.assertEqual(indexes(), before)
+        self.assertFalse(db_service.execute_query("SELECT name FROM ingest_deferred_indexes"))
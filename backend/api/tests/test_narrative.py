@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .. import views
+from ..services import ai_service
+
+STATS = {"area": "Dubai Marina", "prices": {"avg": 1500000}, "counts": {"total": 40}}
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def _tokens(*texts, fail=False):
+    for text in texts:
+        yield _chunk(text)
+    if fail:
+        raise ConnectionError("stream reset")
+
+
+async def _atokens(*texts, fail=False):
+    for chunk in _tokens(*texts, fail=fail):
+        yield chunk
+
+
+def _client(create):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+class NarrativeFailureTests(SimpleTestCase):
+    def test_failure_before_the_first_token_falls_back(self):
+        client = _client(mock.Mock(side_effect=ConnectionError("refused")))
+        with mock.patch.object(ai_service, 'get_client', return_value=client):
+            text = "".join(ai_service.stream_stats_narrative("stats", STATS))
+        self.assertIn("AED 1,500,000", text)
+
+    def test_failure_after_tokens_is_raised(self):
+        client = _client(mock.Mock(return_value=_tokens("The market ", "is", fail=True)))
+        with mock.patch.object(ai_service, 'get_client', return_value=client):
+            stream = ai_service.stream_professional_response("villas", [], {})
+            self.assertEqual(next(stream), "The market ")
+            self.assertEqual(next(stream), "is")
+            with self.assertRaises(ConnectionError):
+                next(stream)
+
+    def test_async_failure_after_tokens_is_raised(self):
+        async def create(**kwargs):
+            return _atokens("Prices ", fail=True)
+
+        async def collect():
+            chunks = []
+            async for chunk in ai_service.astream_stats_narrative("stats", STATS):
+                chunks.append(chunk)
+            return chunks
+
+        with mock.patch.object(ai_service, 'get_async_client', return_value=_client(create)):
+            with self.assertRaises(ConnectionError):
+                asyncio.run(collect())
+
+    def test_background_stream_reraises_after_the_arrived_chunks(self):
+        def chunks():
+            yield "a"
+            yield "b"
+            raise ConnectionError("stream reset")
+
+        received = []
+        with self.assertRaises(ConnectionError):
+            for chunk in views._BackgroundStream(chunks()):
+                received.append(chunk)
+        self.assertEqual("".join(received), "ab")
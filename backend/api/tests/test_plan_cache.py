@@ -0,0 +1,57 @@
+from ..services.cache_service import CACHE
+from ..services.plan_cache_service import PlanCache, context_fingerprint
+from ..services.resolver_service import get_resolver
+from .support import ListingsDatabaseTestCase
+
+
+class PlanCacheTests(ListingsDatabaseTestCase):
+    ROWS = 10
+    BASE = "2 bed apartment for rent in dubai marina with balcony and parking"
+    PLAN = {"type": "search", "searchPlan": {"primary": {"city": "Dubai", "area": "Dubai Marina"}}}
+
+    def setUp(self):
+        super().setUp()
+        self.cache = PlanCache()
+        self.store(self.BASE, self.PLAN)
+
+    def store(self, message, plan):
+        normalized = get_resolver().correct_typos(message)
+        self.cache.store(normalized, context_fingerprint(normalized, {}), plan)
+
+    def lookup(self, message):
+        normalized = get_resolver().correct_typos(message)
+        return self.cache.lookup(normalized, context_fingerprint(normalized, {}))
+
+    def test_filler_words_hit_exactly(self):
+        self.assertEqual(self.lookup(self.BASE + " please"), self.PLAN)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_near_duplicate_hits(self):
+        self.assertEqual(self.lookup("2 bed apartment for rent in dubai marina with a balcony and covered parking"), self.PLAN)
+        self.assertEqual(self.cache.stats()['near_hits'], 1)
+
+    def test_changed_decisive_slot_misses(self):
+        for message in (
+            "2 bed apartment for sale in dubai marina with balcony and parking",
+            "2 bed villa for rent in dubai marina with balcony and parking",
+            "3 bed apartment for rent in dubai marina with balcony and parking",
+            "2 bed apartment for rent in jvc with balcony and parking",
+        ):
+            with self.subTest(message=message):
+                self.assertIsNone(self.lookup(message))
+
+    def test_word_order_of_negations_is_kept(self):
+        self.store("villa not apartment in dubai marina", self.PLAN)
+        self.assertIsNone(self.lookup("apartment not villa in dubai marina"))
+
+    def test_price_direction_is_decisive(self):
+        message = "looking for a 2 bed apartment for rent in dubai marina with balcony parking gym pool and sea view {} 120k"
+        self.store(message.format("under"), self.PLAN)
+        self.assertEqual(self.lookup(message.format("below")), self.PLAN)
+        self.assertIsNone(self.lookup(message.format("over")))
+
+    def test_expired_near_duplicate_is_a_miss_and_dropped(self):
+        CACHE.clear()
+        self.assertIsNone(self.lookup("2 bed apartment for rent in dubai marina with a balcony and covered parking"))
+        stats = self.cache.stats()
+        self.assertEqual((stats['near_hits'], stats['misses'], stats['entries']), (0, 1, 0))
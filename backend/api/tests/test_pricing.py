@@ -0,0 +1,116 @@
+from django.test import SimpleTestCase
+
+from ..services import db_service, pricing_service, stats_service
+from ..services.pricing_service import BACKOFF, MIN_SEGMENT_LISTINGS, SCOPES, Segment, insight_label, price_positions
+from .support import ListingsDatabaseTestCase
+
+ROW = {"price": 1000000, "city_id": 1, "area_id": 5, "category_id": 2, "bedrooms_int": 2, "market": 'buy'}
+
+
+def _segment(prices):
+    return Segment(stats_service.build_histogram(prices), min(prices), max(prices))
+
+
+class SegmentTests(SimpleTestCase):
+    PRICES = [500000 + 25000 * i for i in range(80)]
+
+    def test_percentile_bounds_and_order(self):
+        segment = _segment(self.PRICES)
+        self.assertEqual(segment.listings, len(self.PRICES))
+        self.assertEqual(segment.percentile(100), 0.0)
+        self.assertEqual(segment.percentile(self.PRICES[0]), 0.0)
+        self.assertEqual(segment.percentile(self.PRICES[-1]), 100.0)
+        self.assertEqual(segment.percentile(10 ** 9), 100.0)
+        ranks = [segment.percentile(p) for p in range(500000, 2500000, 10000)]
+        self.assertEqual(ranks, sorted(ranks))
+
+    def test_percentile_is_close_to_the_exact_rank(self):
+        segment = _segment(self.PRICES)
+        for price in (600000, 1000000, 1490000, 2200000):
+            with self.subTest(price=price):
+                exact = sum(p < price for p in self.PRICES) / len(self.PRICES) * 100
+                self.assertAlmostEqual(segment.percentile(price), exact, delta=5)
+
+
+class InsightLabelTests(SimpleTestCase):
+    def test_labels_at_the_thresholds(self):
+        scope = SCOPES[0]
+        self.assertEqual(insight_label(0, scope), f"Great Deal: priced below 99% of {scope}")
+        self.assertEqual(insight_label(9.2, scope), f"Great Deal: priced below 90% of {scope}")
+        self.assertEqual(insight_label(pricing_service.DEAL_PERCENTILE, scope), f"Great Deal: priced below 85% of {scope}")
+        self.assertIsNone(insight_label(15.1, scope))
+        self.assertIsNone(insight_label(50, scope))
+        self.assertIsNone(insight_label(84.9, scope))
+        self.assertEqual(insight_label(pricing_service.PREMIUM_PERCENTILE, scope), f"Premium: priced above 85% of {scope}")
+        self.assertEqual(insight_label(100, scope), f"Premium: priced above 99% of {scope}")
+
+
+class PricePositionTests(SimpleTestCase):
+    def segments(self, *levels):
+        """{segment key: Segment} with `listings` prices at each given BACKOFF level."""
+        return {
+            pricing_service._key(ROW, BACKOFF[level]): _segment([400000 + 100000 * i for i in range(listings)])
+            for level, listings in levels
+        }
+
+    def test_most_specific_segment_wins(self):
+        segments = self.segments((0, MIN_SEGMENT_LISTINGS), (4, 100))
+        [(percentile, scope)] = price_positions([ROW], segments)
+        self.assertEqual(scope, SCOPES[0])
+        self.assertGreater(percentile, 50)
+
+    def test_thin_segments_back_off(self):
+        for level in range(1, len(BACKOFF)):
+            with self.subTest(level=level):
+                segments = self.segments(*[(thin, MIN_SEGMENT_LISTINGS - 1) for thin in range(level)], (level, 20))
+                [(_, scope)] = price_positions([ROW], segments)
+                self.assertEqual(scope, SCOPES[level])
+
+    def test_no_position_without_a_price_or_a_large_enough_segment(self):
+        segments = self.segments(*[(level, MIN_SEGMENT_LISTINGS - 1) for level in range(len(BACKOFF))])
+        self.assertEqual(price_positions([ROW, dict(ROW, price=0)], segments), [None, None])
+        self.assertEqual(price_positions([dict(ROW, price=None)], self.segments((0, 20))), [None])
+
+    def test_missing_dimensions_use_the_stats_sentinels(self):
+        row = dict(ROW, area_id=None, bedrooms_int=None, market=None)
+        key = pricing_service._key({"city_id": 1, "area_id": 0, "category_id": 2, "bedrooms_int": -1, "market": ''}, BACKOFF[0])
+        [(_, scope)] = price_positions([row], {key: _segment([1000000] * 10 + [2000000])})
+        self.assertEqual(scope, SCOPES[0])
+
+
+class SearchPricePositionTests(ListingsDatabaseTestCase):
+    def test_search_percentiles_fall_in_their_bucket(self):
+        results = db_service.query_properties({"primary": {"city": "Dubai", "propertyType": "buy"}}, page_size=30, fields='full')['results']
+        ids = [r['id'] for r in results]
+        rows = db_service.execute_query(
+            f"SELECT id, price, city_id, area_id, category_id, bedrooms_int, market FROM properties WHERE id IN ({', '.join('?' * len(ids))})",
+            ids,
+        )
+        by_id = {row['id']: row for row in rows}
+        ranked = 0
+        for result, position in zip(results, price_positions([by_id[r['id']] for r in results])):
+            if position is None:
+                self.assertIsNone(result['pricePercentile'])
+                continue
+            ranked += 1
+            percentile, scope = position
+            self.assertEqual(result['pricePercentile'], round(percentile))
+            if result['isExactMatch']:
+                self.assertEqual(result['priceInsight'], insight_label(percentile, scope))
+
+            # The percentile interpolates inside the listing's bucket, so it lies between the
+            # share of the segment priced in lower buckets and the share up to its own bucket
+            dims = BACKOFF[SCOPES.index(scope)]
+            row = by_id[result['id']]
+            clause = ' AND '.join(f"IFNULL({dim}, {default}) = ?" for dim, default in
+                                  (('city_id', 0), ('area_id', 0), ('category_id', 0), ('bedrooms_int', -1), ('market', "''")) if dim in dims)
+            params = [row[dim] if row[dim] is not None else (-1 if dim == 'bedrooms_int' else '' if dim == 'market' else 0) for dim in
+                      ('city_id', 'area_id', 'category_id', 'bedrooms_int', 'market') if dim in dims]
+            prices = [r['price'] for r in db_service.execute_query(
+                f"SELECT price FROM properties WHERE status = 'active' AND price > 0 AND {clause}", params)]
+            self.assertGreaterEqual(len(prices), MIN_SEGMENT_LISTINGS)
+            bucket = stats_service._bucket(row['price'])
+            lower = sum(stats_service._bucket(p) < bucket for p in prices) / len(prices) * 100
+            upper = sum(stats_service._bucket(p) <= bucket for p in prices) / len(prices) * 100
+            self.assertTrue(lower - 1e-6 <= percentile <= upper + 1e-6, (lower, percentile, upper))
+        self.assertGreater(ranked, 0)
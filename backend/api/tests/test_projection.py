@@ -0,0 +1,81 @@
+from django.test import Client
+
+from ..services import db_service
+from ..services.db_service import CARD_FIELDS, DETAIL_FIELDS, MAX_DETAIL_IDS, RESULT_FIELDS, project, resolve_fields
+from .support import ListingsDatabaseTestCase
+
+
+class ResolveFieldsTests(ListingsDatabaseTestCase):
+    ROWS = 10
+
+    def test_presets_and_lists(self):
+        self.assertEqual(resolve_fields(None), CARD_FIELDS)
+        self.assertEqual(resolve_fields('card'), CARD_FIELDS)
+        self.assertEqual(resolve_fields('full'), RESULT_FIELDS)
+        self.assertEqual(resolve_fields('price, title'), ('id', 'title', 'price'))
+        self.assertEqual(resolve_fields(['price', 'bogus']), ('id', 'price'))
+
+    def test_project_keeps_only_the_fields(self):
+        rows = [{"id": 1, "title": "Villa", "price": 5.0, "description": "long"}]
+        self.assertEqual(project(rows, ('id', 'price', 'city')), [{"id": 1, "price": 5.0}])
+
+
+class SearchProjectionTests(ListingsDatabaseTestCase):
+    ROWS = 200
+    PLAN = {"primary": {"city": "Dubai", "propertyType": "buy"}}
+
+    def test_card_results_carry_a_snippet_not_the_description(self):
+        results = db_service.query_properties(self.PLAN, page_size=20)['results']
+        self.assertTrue(results)
+        for r in results:
+            self.assertEqual(set(r) - {'fallbackReason'}, set(CARD_FIELDS) - {'fallbackReason'})
+            self.assertLessEqual(len(r['snippet']), db_service.SNIPPET_CHARS + 1)
+
+    def test_projection_matches_the_full_records(self):
+        full = db_service.query_properties(self.PLAN, page_size=20, fields='full')['results']
+        narrow = db_service.query_properties(self.PLAN, page_size=20, fields=['price', 'city'])['results']
+        self.assertEqual(narrow, project(full, ('id', 'price', 'city')))
+
+    def test_search_endpoint_takes_fields(self):
+        response = Client().post('/api/search', {"q": "apartment to buy", "filters": {"city": "Dubai"}, "fields": "id,price"},
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertTrue(results)
+        self.assertEqual({key for r in results for key in r}, {'id', 'price'})
+
+
+class PropertyDetailTests(ListingsDatabaseTestCase):
+    ROWS = 10
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.ids = [row['id'] for row in db_service.execute_query("SELECT id FROM properties ORDER BY id LIMIT 3")]
+
+    def test_single_property(self):
+        response = self.client.get(f'/api/property/{self.ids[0]}')
+        self.assertEqual(response.status_code, 200)
+        record = response.json()['property']
+        self.assertEqual(record['id'], self.ids[0])
+        self.assertLessEqual(set(record), set(DETAIL_FIELDS))
+        self.assertIn('description', record)
+
+    def test_unknown_property_is_404(self):
+        self.assertEqual(self.client.get('/api/property/999999999').status_code, 404)
+
+    def test_batch_keeps_order_and_reports_missing(self):
+        ids = [self.ids[2], 999999999, self.ids[0]]
+        response = self.client.get('/api/property', {"ids": ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([r['id'] for r in body['results']], [self.ids[2], self.ids[0]])
+        self.assertEqual(body['missing'], [999999999])
+
+    def test_bad_batch_requests_are_400(self):
+        for ids in ('', '1,x', ','.join(['1'] * (MAX_DETAIL_IDS + 1))):
+            with self.subTest(ids=ids[:20]):
+                self.assertEqual(self.client.get('/api/property', {"ids": ids}).status_code, 400)
+
+    def test_post_is_not_allowed(self):
+        self.assertEqual(self.client.post(f'/api/property/{self.ids[0]}').status_code, 405)
@@ -0,0 +1,46 @@
+from ..services.query_parser_service import local_intent, parse_query
+from .support import ListingsDatabaseTestCase
+
+
+class QueryParserTests(ListingsDatabaseTestCase):
+    ROWS = 10
+
+    def test_fully_structured_search_is_confident(self):
+        intent = parse_query("2 bed apartment for rent in dubai marina")
+        self.assertEqual(intent['type'], 'search')
+        self.assertEqual(intent['confidence'], 0.9)
+        primary = intent['searchPlan']['primary']
+        self.assertEqual((primary['area'], primary['beds'], primary['category'], primary['propertyType']),
+                         ('Dubai Marina', 2, 'Apartment', 'rent'))
+
+    def test_place_with_one_filter_meets_the_threshold(self):
+        self.assertEqual(parse_query("apartments in dubai marina")['confidence'], 0.7)
+        self.assertEqual(parse_query("villas in dubia")['searchPlan']['primary']['city'], 'Dubai')
+
+    def test_price_words_count_as_structure(self):
+        intent = parse_query("studio in jvc under 60k per year")
+        self.assertEqual(intent['confidence'], 0.8)
+        self.assertEqual(intent['searchPlan']['primary']['maxPrice'], 60000.0)
+
+    def test_stats_question(self):
+        intent = parse_query("average price in dubai marina")
+        self.assertEqual(intent['type'], 'stats')
+        self.assertEqual(intent['confidence'], 0.9)
+        self.assertEqual(intent['searchPlan']['primary'], {'city': 'Dubai', 'area': 'Dubai Marina'})
+
+    def test_stats_narrower_than_an_area_is_left_to_the_llm(self):
+        self.assertLess(parse_query("average price of 2 bed villas in dubai marina")['confidence'], 0.7)
+
+    def test_unexplained_words_lower_the_confidence(self):
+        self.assertLess(parse_query("villa with pool and garden in jvc")['confidence'], 0.7)
+
+    def test_judgement_referential_and_placeless_messages_score_zero(self):
+        history = {"history": [{"role": "user", "content": "villas in jvc"}]}
+        self.assertEqual(parse_query("best villa in jvc")['confidence'], 0.0)
+        self.assertEqual(parse_query("show me more like that in jvc", history)['confidence'], 0.0)
+        self.assertEqual(parse_query("2 bed apartment")['confidence'], 0.0)
+
+    def test_local_intent_applies_the_threshold(self):
+        self.assertIsNotNone(local_intent("apartments in dubai marina"))
+        self.assertIsNone(local_intent("villa with pool and garden in jvc"))
+        self.assertIsNone(local_intent("apartments in dubai marina", threshold=0.95))
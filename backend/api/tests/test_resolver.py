@@ -0,0 +1,45 @@
+from django.test import SimpleTestCase
+
+from ..services.resolver_service import PlaceResolver, get_resolver
+from .support import ListingsDatabaseTestCase
+
+
+class PlaceResolverTests(SimpleTestCase):
+    def setUp(self):
+        self.resolver = PlaceResolver(
+            [(1, 'Dubai', None), (2, 'Abu Dhabi', None), (4, 'Sharjah', None), (30, 'Dubai Marina, Dubai', None)],
+            [(10, 'Dubai Marina', 1), (11, 'Jumeirah Village Circle (JVC)', 1), (12, 'Al Nahda', 4)],
+            core_city_names=['Dubai', 'Abu Dhabi', 'Sharjah'],
+        )
+
+    def test_typos_in_city_words_are_corrected(self):
+        self.assertEqual(self.resolver.correct_typos('villas in dubia'), 'villas in dubai')
+        self.assertEqual(self.resolver.correct_typos('rentals in shrajh and dxb'), 'rentals in sharjah and dubai')
+
+    def test_ordinary_words_are_left_alone(self):
+        self.assertEqual(self.resolver.correct_typos('cities with rentals'), 'cities with rentals')
+
+    def test_aliases_and_misspellings_resolve_to_city_ids(self):
+        self.assertEqual(self.resolver.city_ids('dubay'), [1, 30])
+        self.assertEqual(self.resolver.city_ids('Dubai', exact=True), [1])
+        self.assertEqual(self.resolver.city_ids('abudhabi'), [2])
+        self.assertEqual(self.resolver.city_ids('sharjh'), [4])
+
+    def test_area_short_forms_and_typos(self):
+        self.assertEqual(self.resolver.area_ids('jvc'), [11])
+        self.assertEqual(self.resolver.area_ids('dubai marnia'), [10])
+        self.assertEqual(self.resolver.area_ids('nahda'), [12])
+        self.assertEqual(self.resolver.area_ids('zzzz'), [])
+
+    def test_find_places_takes_the_longest_names(self):
+        places = self.resolver.find_places('2 bed in jvc near dubai marina')
+        self.assertEqual([p['text'] for p in places], ['jvc', 'dubai marina'])
+
+
+class PlaceholderCityTests(ListingsDatabaseTestCase):
+    ROWS = 10
+
+    def test_placeholder_city_is_not_typo_vocabulary(self):
+        resolver = get_resolver()
+        self.assertNotIn('city', resolver.city_vocabulary)
+        self.assertEqual(resolver.correct_typos('cities with villas in dubia'), 'cities with villas in dubai')
@@ -0,0 +1,41 @@
+from ..services import db_service
+from .support import ListingsDatabaseTestCase
+
+
+class KeysetPagingTests(ListingsDatabaseTestCase):
+    SINGLE_TIER = {"primary": {"city": "Dubai", "propertyType": "rent"}}
+    TIERED = {"primary": {"city": "Dubai", "area": "Dubai Marina", "propertyType": "buy"}}
+
+    def pages(self, plan, page_size=7, columnar=False):
+        ids, cursor = [], None
+        while True:
+            page = db_service.query_properties(plan, page_size=page_size, cursor=cursor, columnar=columnar)
+            ids.extend(r['id'] for r in page['results'])
+            cursor = page['nextCursor']
+            if not cursor:
+                return ids
+
+    def test_pages_are_complete_without_duplicates(self):
+        everything = db_service.query_properties(self.SINGLE_TIER, page_size=100000, columnar=False)['results']
+        self.assertGreater(len(everything), 50)
+        paged = self.pages(self.SINGLE_TIER)
+        self.assertEqual(len(paged), len(set(paged)))
+        self.assertEqual(paged, [r['id'] for r in everything])
+
+    def test_fallback_tiers_do_not_repeat_listings(self):
+        paged = self.pages(self.TIERED, page_size=5)
+        self.assertEqual(len(paged), len(set(paged)))
+        exact = [r['id'] for r in db_service.query_properties(self.TIERED, page_size=100000, columnar=False)['results'] if r['isExactMatch']]
+        self.assertTrue(set(exact) <= set(paged))
+
+    def test_cursor_from_another_plan_starts_over(self):
+        cursor = db_service.query_properties(self.SINGLE_TIER, page_size=5, columnar=False)['nextCursor']
+        other = {"primary": {"city": "Dubai", "propertyType": "buy"}}
+        first = db_service.query_properties(other, page_size=5, columnar=False)['results']
+        reused = db_service.query_properties(other, page_size=5, cursor=cursor, columnar=False)['results']
+        self.assertEqual([r['id'] for r in reused], [r['id'] for r in first])
+
+    def test_malformed_cursor_starts_over(self):
+        first = db_service.query_properties(self.SINGLE_TIER, page_size=5, columnar=False)['results']
+        reused = db_service.query_properties(self.SINGLE_TIER, page_size=5, cursor='not-a-cursor', columnar=False)['results']
+        self.assertEqual([r['id'] for r in reused], [r['id'] for r in first])
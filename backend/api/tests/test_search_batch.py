@@ -0,0 +1,51 @@
+from django.test import Client
+
+from .. import views
+from ..services import db_service
+from .support import ListingsDatabaseTestCase
+
+
+class SearchBatchTests(ListingsDatabaseTestCase):
+    SEARCHES = [
+        {"city": "Dubai", "propertyType": "rent"},
+        {"city": "Dubai", "area": "Dubai Marina", "beds": 2},
+        {"city": "Sharjah", "maxPrice": 1500000},
+    ]
+
+    def post(self, body):
+        return Client().post('/api/search/batch', body, content_type='application/json')
+
+    def ids(self, results):
+        return [r['id'] for r in results]
+
+    def test_each_item_matches_its_own_search(self):
+        response = self.post({"searches": self.SEARCHES, "pageSize": 5})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['cached'], 0)
+        for index, filters in enumerate(self.SEARCHES):
+            with self.subTest(filters=filters):
+                expected = db_service.query_properties({"primary": filters}, page_size=5)
+                item = body['results'][str(index)]
+                self.assertEqual(self.ids(item['results']), self.ids(expected['results']))
+                self.assertEqual(item['nextCursor'], expected['nextCursor'])
+
+    def test_cached_and_fresh_items_mix(self):
+        first = self.post({"searches": self.SEARCHES[:2], "pageSize": 5}).json()
+        body = self.post({"searches": self.SEARCHES, "pageSize": 5}).json()
+        self.assertEqual(body['cached'], 2)
+        self.assertEqual([body['results'][str(i)]['cached'] for i in range(3)], [True, True, False])
+        for i in range(2):
+            self.assertEqual(self.ids(body['results'][str(i)]['results']), self.ids(first['results'][str(i)]['results']))
+
+    def test_limits_and_bad_input_are_rejected(self):
+        for body in (
+            {"searches": []},
+            {"searches": [{}] * (views.MAX_BATCH_SEARCHES + 1)},
+            {"searches": ["Dubai"]},
+            {"searches": self.SEARCHES, "pageSize": "ten"},
+            {"searches": self.SEARCHES, "pageSize": views.MAX_BATCH_PAGE_SIZE + 1},
+            {"searches": self.SEARCHES, "pageSize": 0},
+        ):
+            with self.subTest(body={k: v for k, v in body.items() if k != 'searches'}):
+                self.assertEqual(self.post(body).status_code, 400)
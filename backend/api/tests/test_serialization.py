@@ -0,0 +1,99 @@
+import asyncio
+import gzip
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from ..middleware import compression_middleware
+from ..services import serialization_service
+from ..services.serialization_service import COMPRESS_MIN_BYTES, FINAL_FRAME, compress, sse_frame, text_chunk_frame
+
+BIG = {"results": [{"id": i, "title": f"Apartment {i} in Dubai Marina"} for i in range(200)]}
+
+
+class SseFrameTests(SimpleTestCase):
+    def parse(self, frame):
+        self.assertTrue(frame.startswith(b'data: ') and frame.endswith(b'\n\n'))
+        return json.loads(frame[len(b'data: '):])
+
+    def test_frame_is_one_json_event(self):
+        payload = {"type": "intent", "filters": {"area": "Jumeirah Village Circle"}, "price": 1.5}
+        self.assertEqual(self.parse(sse_frame(payload)), payload)
+        self.assertEqual(self.parse(FINAL_FRAME), {"type": "final", "done": True})
+
+    def test_text_chunk_matches_the_generic_frame(self):
+        for content in ("Hello ", 'quotes " and \\ slashes', "newline\nand unicode: دبي ✓"):
+            with self.subTest(content=content):
+                frame = text_chunk_frame(content)
+                self.assertEqual(frame, sse_frame({"type": "text_chunk", "content": content}))
+                self.assertEqual(frame.count(b'\n\n'), 1)
+
+
+class CompressTests(SimpleTestCase):
+    def test_small_bodies_and_unsupported_clients_are_left_alone(self):
+        self.assertEqual(compress(b'{}', 'gzip'), (b'{}', None))
+        body = b'x' * COMPRESS_MIN_BYTES
+        self.assertEqual(compress(body, ''), (body, None))
+        self.assertEqual(compress(body, 'deflate'), (body, None))
+
+    def test_gzip_round_trip(self):
+        body = json.dumps(BIG).encode()
+        compressed, encoding = compress(body, 'deflate, gzip;q=0.8')
+        self.assertEqual(encoding, 'gzip')
+        self.assertEqual(gzip.decompress(compressed), body)
+        self.assertEqual(compress(body, 'gzip')[0], compressed)
+
+    def test_brotli_is_preferred_when_installed(self):
+        fake = SimpleNamespace(compress=lambda body, quality: b'br:' + body[:4])
+        body = json.dumps(BIG).encode()
+        with mock.patch.object(serialization_service, 'brotli', fake):
+            self.assertEqual(compress(body, 'gzip, br'), (b'br:' + body[:4], 'br'))
+            self.assertEqual(compress(body, 'gzip')[1], 'gzip')
+        with mock.patch.object(serialization_service, 'brotli', None):
+            self.assertEqual(compress(body, 'br, gzip')[1], 'gzip')
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def respond(self, response, accept='gzip'):
+        request = RequestFactory().get('/api/search', HTTP_ACCEPT_ENCODING=accept)
+        return compression_middleware(lambda request: response)(request)
+
+    def test_json_is_gzipped(self):
+        response = self.respond(JsonResponse(BIG))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), BIG)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_etag_becomes_weak(self):
+        response = JsonResponse(BIG)
+        response['ETag'] = '"abc"'
+        self.assertEqual(self.respond(response)['ETag'], 'W/"abc"')
+
+    def test_streams_are_never_compressed(self):
+        frames = [sse_frame(BIG), FINAL_FRAME]
+        response = self.respond(StreamingHttpResponse(iter(frames), content_type='text/event-stream'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), b''.join(frames))
+
+    def test_other_types_and_encoded_bodies_are_left_alone(self):
+        body = b'\x89PNG' + b'x' * 4096
+        self.assertFalse(self.respond(HttpResponse(body, content_type='image/png')).has_header('Content-Encoding'))
+
+        encoded = HttpResponse(b'y' * 4096, content_type='text/plain')
+        encoded['Content-Encoding'] = 'identity'
+        self.assertEqual(self.respond(encoded).content, b'y' * 4096)
+
+    def test_async_chain(self):
+        async def get_response(request):
+            return JsonResponse(BIG)
+
+        async def run():
+            request = RequestFactory().get('/api/search', HTTP_ACCEPT_ENCODING='gzip')
+            return await compression_middleware(get_response)(request)
+
+        response = asyncio.run(run())
+        self.assertEqual(response['Content-Encoding'], 'gzip')
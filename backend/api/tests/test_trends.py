@@ -0,0 +1,53 @@
+from django.test import Client
+
+from ..services import db_service, trend_service
+from .support import ListingsDatabaseTestCase
+
+
+class TrendRefreshTests(ListingsDatabaseTestCase):
+    def assertMatchesLive(self):
+        live = {(r['market'], r['bucket']): r for r in db_service.execute_query(f"""
+            SELECT market, {trend_service.BUCKET_SQL['month']} AS bucket, COUNT(*) AS listings,
+                   MIN(price) AS min_price, MAX(price) AS max_price, SUM(price) AS sum_price
+            FROM properties WHERE price > 0 AND market IN ('buy', 'rent') GROUP BY 1, 2
+        """)}
+        trends = {
+            (market, bucket): summary
+            for market, points in trend_service.lookup_trend('month', '0000-00-00').items()
+            for bucket, summary in points
+        }
+        self.assertEqual(set(trends), set(live))
+        for key, row in live.items():
+            with self.subTest(bucket=key):
+                self.assertSummaryEqual(trends[key], row)
+
+    def test_full_refresh_matches_live(self):
+        self.assertMatchesLive()
+
+    def test_incremental_refresh_after_inserts_and_deletes(self):
+        # The first new listing opens a month no other listing is in
+        self.insert_generated(60, created_at='2027-03-15 10:00:00')
+        self.assertGreater(trend_service.refresh_market_trends()['buckets'], 0)
+        self.assertMatchesLive()
+
+        self.execute("DELETE FROM properties WHERE id IN (SELECT id FROM properties WHERE price > 0 ORDER BY id LIMIT 40)")
+        self.execute("DELETE FROM properties WHERE created_at >= '2027-03-01'")
+        trend_service.refresh_market_trends()
+        self.assertMatchesLive()
+
+
+class StatsTrendViewTests(ListingsDatabaseTestCase):
+    def post(self, body):
+        return Client().post('/api/stats', body, content_type='application/json')
+
+    def test_trend_series(self):
+        response = self.post({"city": "Dubai", "trend": "month", "periods": "6"})
+        self.assertEqual(response.status_code, 200)
+        trend = response.json()['trend']
+        self.assertEqual(trend['period'], 'month')
+        self.assertTrue(all(len(points) <= 6 for points in trend['series'].values()))
+
+    def test_bad_trend_arguments_are_rejected(self):
+        for body in ({"trend": "year"}, {"trend": "month", "periods": "abc"}, {"trend": "month", "periods": -2}):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
@@ -1,14 +1,41 @@
+import os
 import json
-from django.http import JsonResponse
+import time
+import queue
+import asyncio
+import logging
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, HttpResponseNotAllowed
+from django.core.handlers.asgi import ASGIRequest
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 
-from .services.db_service import query_properties, get_property_stats, calculate_results_stats
-from .services.ai_service import get_ai_intent, get_simple_response
+from .services.db_service import (
+    query_properties, query_properties_batch, get_properties, get_property_stats, calculate_results_stats, canonical_plan,
+    resolve_fields, project, CARD_FIELDS, MAX_DETAIL_IDS,
+)
+from .services.ai_service import (
+    get_ai_intent, get_simple_response, stream_professional_response, stream_stats_narrative,
+    aget_ai_intent, astream_professional_response, astream_stats_narrative,
+)
 from .services.cache_service import CACHE
+from .services.resolver_service import get_resolver
+from .services.plan_cache_service import get_cached_intent, aget_cached_intent
+from .services.query_parser_service import speculative_plan, local_intent
+from .services.metrics_service import RequestTimer, INTENT_SOURCE, SPECULATION, render_prometheus
+from .services.trend_service import get_price_trend, PERIODS as TREND_PERIODS, DEFAULT_PERIODS as TREND_DEFAULT_PERIODS
+from .services.serialization_service import (
+    dumps, sse_frame, text_chunk_frame, FINAL_FRAME, SSE_FLUSH_MS, TEXT_CHUNK_MAX_CHARS,
+)
+
+logger = logging.getLogger(__name__)
 
 # Constants
 REAL_ESTATE_KEYWORDS = ['apartment','villa','rent','buy','property','dubai','uae','bed','price','area','studio','townhouse','penthouse']
+MAX_BATCH_SEARCHES = 100
+MAX_BATCH_PAGE_SIZE = 50
 
 @require_http_methods(["GET"]) 
 def hello(request):
@@ -45,38 +72,113 @@ def search(request):
             
     page = int(data.get('page', 1))
     page_size = int(data.get('pageSize', 20))
+    cursor = data.get('cursor')
+    # Compact card schema by default; 'full' or a field list for more (see db_service.resolve_fields)
+    fields = resolve_fields(data.get('fields'))
     
-    cache_key = f"search_{json.dumps(filters, sort_keys=True)}_{page}"
-    cached_results = CACHE.get(cache_key)
+    timer = RequestTimer('search')
+    cache_key = _search_cache_key(filters, page_size, cursor, fields)
+    with timer.phase('cache'):
+        cached = CACHE.get(cache_key)
     
-    if cached_results:
-        return JsonResponse({
-            "summary": f"Found {len(cached_results)} properties (cached)",
-            "results": cached_results,
-            "sources": ["Bayut", "Propertyfinder", "Propsearch"],
-            "cached": True
-        })
+    if cached:
+        with timer.phase('serialize'):
+            response = _json_response({
+                "summary": f"Found {len(cached['results'])} properties (cached)",
+                "results": cached['results'],
+                "sources": ["Bayut", "Propertyfinder", "Propsearch"],
+                "page": page,
+                "pageSize": page_size,
+                "nextCursor": cached['nextCursor'],
+                "hasMore": cached['hasMore'],
+                "cached": True
+            })
+        response['Server-Timing'] = timer.server_timing()
+        return response
     
     try:
-        db_data = query_properties(filters, page, page_size)
+        with timer.phase('db'):
+            db_data = query_properties({"primary": filters}, page, page_size, cursor=cursor, fields=fields)
         results = db_data['results']
-        CACHE.set(cache_key, results)
+        CACHE.set(cache_key, {"results": results, "nextCursor": db_data['nextCursor'], "hasMore": db_data['hasMore']})
         
         summary = f"Found {len(results)} properties"
         if filters.get('city'): summary += f" in {filters['city']}"
         
-        return JsonResponse({
-            "summary": summary,
-            "results": results,
-            "sources": ["Bayut", "Propertyfinder", "Propsearch"],
-            "page": page,
-            "pageSize": page_size,
-            "hasMore": len(results) == page_size,
-            "cached": False
-        })
+        with timer.phase('serialize'):
+            response = _json_response({
+                "summary": summary,
+                "results": results,
+                "sources": ["Bayut", "Propertyfinder", "Propsearch"],
+                "page": page,
+                "pageSize": page_size,
+                "nextCursor": db_data['nextCursor'],
+                "hasMore": db_data['hasMore'],
+                "cached": False
+            })
+        response['Server-Timing'] = timer.server_timing()
+        return response
     except Exception as e:
         return JsonResponse({"message": f"Search error: {str(e)}", "results": []}, status=500)
 
+def _search_cache_key(filters, page_size, cursor, fields):
+    return f"search_{json.dumps(filters, sort_keys=True)}_{page_size}_{cursor or ''}_{','.join(fields)}"
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def search_batch(request):
+    """
+    First result pages for many filter sets in one request (comparison and landing pages):
+    {"searches": [filters, ...], "pageSize": 10, "fields": ...}, at most MAX_BATCH_SEARCHES
+    searches of at most MAX_BATCH_PAGE_SIZE results each. Items already in the search
+    cache are served from it; the rest run in one DB pass (db_service.query_properties_batch).
+    Results are keyed by the item's index in `searches`.
+    """
+    data = json.loads(request.body.decode('utf-8')) if request.body else {}
+    searches = data.get('searches')
+    if not isinstance(searches, list) or not searches:
+        return JsonResponse({"message": "searches must be a non-empty list of filter objects."}, status=400)
+    if len(searches) > MAX_BATCH_SEARCHES:
+        return JsonResponse({"message": f"At most {MAX_BATCH_SEARCHES} searches per batch."}, status=400)
+    if not all(isinstance(filters, dict) for filters in searches):
+        return JsonResponse({"message": "Every search must be a filter object."}, status=400)
+    page_size = _positive_int(data.get('pageSize'), 10)
+    if page_size is None or page_size > MAX_BATCH_PAGE_SIZE:
+        return JsonResponse({"message": f"pageSize must be an integer from 1 to {MAX_BATCH_PAGE_SIZE}."}, status=400)
+    fields = resolve_fields(data.get('fields'))
+
+    timer = RequestTimer('search_batch')
+    items, pending = {}, []
+    with timer.phase('cache'):
+        for index, filters in enumerate(searches):
+            cached = CACHE.get(_search_cache_key(filters, page_size, None, fields))
+            if cached:
+                items[str(index)] = dict(cached, cached=True)
+            else:
+                pending.append(index)
+
+    try:
+        with timer.phase('db'):
+            outcomes = query_properties_batch([{"primary": searches[i]} for i in pending], page_size, fields=fields) if pending else []
+    except Exception as e:
+        return JsonResponse({"message": f"Search error: {str(e)}", "results": {}}, status=500)
+    for index, outcome in zip(pending, outcomes):
+        if 'error' in outcome:
+            items[str(index)] = {"error": outcome['error']}
+            continue
+        entry = {"results": outcome['results'], "nextCursor": outcome['nextCursor'], "hasMore": outcome['hasMore']}
+        CACHE.set(_search_cache_key(searches[index], page_size, None, fields), entry)
+        items[str(index)] = dict(entry, cached=False)
+
+    with timer.phase('serialize'):
+        response = _json_response({
+            "results": {str(i): items[str(i)] for i in range(len(searches))},
+            "pageSize": page_size,
+            "cached": len(searches) - len(pending),
+        })
+    response['Server-Timing'] = timer.server_timing()
+    return response
+
 @csrf_exempt
 @require_http_methods(["POST"]) 
 def stats(request):
@@ -85,13 +187,42 @@ def stats(request):
         "area": data.get('area'),
         "city": data.get('city')
     }
+    # trend: 'month' / 'week' (true means 'month') adds the price trend over `periods` buckets
+    trend = 'month' if data.get('trend') is True else data.get('trend')
+    if trend and trend not in TREND_PERIODS:
+        return JsonResponse({"message": f"trend must be one of {', '.join(TREND_PERIODS)}."}, status=400)
+    periods = _positive_int(data.get('periods'), TREND_DEFAULT_PERIODS)
+    if periods is None:
+        return JsonResponse({"message": "periods must be a positive integer."}, status=400)
     
+    timer = RequestTimer('stats')
     try:
-        stats_data = get_property_stats(filters)
-        return JsonResponse(stats_data)
+        with timer.phase('stats'):
+            stats_data = get_property_stats(filters)
+        if trend:
+            with timer.phase('trend'):
+                trend_data = get_price_trend(dict(filters, category=data.get('category')), trend, periods)
+            # Cached stats are shared, so the trend goes on a copy
+            stats_data = dict(stats_data or {}, trend=trend_data)
+        with timer.phase('serialize'):
+            response = _json_response(stats_data)
+        response['Server-Timing'] = timer.server_timing()
+        return response
     except Exception as e:
         return JsonResponse({"message": f"Stats error: {str(e)}"}, status=500)
 
+def _positive_int(value, default):
+    """value as an int >= 1 (default when missing), or None when it is not one."""
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number >= 1 else None
+
 def format_response(text, stats_data=None, count=0):
     if not text: return text
     if stats_data:
@@ -102,189 +233,614 @@ def format_response(text, stats_data=None, count=0):
     text = text.replace("{count}", str(count))
     return text
 
-from django.http import StreamingHttpResponse
-from concurrent.futures import ThreadPoolExecutor
+# Workers are long-lived, so each keeps its own warm pooled SQLite connection (see db_service).
+# On the ASGI path this is also the bound on concurrent DB work: streams wait on it without holding a thread.
+executor = ThreadPoolExecutor(max_workers=10, thread_name_prefix="houser-db")
 
-executor = ThreadPoolExecutor(max_workers=10)
+# Narrative streams are consumed here so the LLM request starts while result events are still being sent.
+# Under WSGI an open chat stream holds its request thread plus one of these workers until the
+# narrative ends, so HOUSER_LLM_WORKERS should be at least the server's thread count; streams
+# beyond it wait for a free worker (their narrative starts late). ASGI streams use no worker.
+llm_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('HOUSER_LLM_WORKERS', 32)), thread_name_prefix="houser-llm")
 
-def chat_stream_generator(user_message, session_context, cache_key):
+async def run_in_db_pool(fn, *args, **kwargs):
+    """Runs blocking DB/cache work on the bounded executor from async code."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+# Start the DB work for locally extracted filters while the LLM is still planning
+SPECULATIVE_PREFETCH = os.environ.get('HOUSER_SPECULATIVE_PREFETCH', 'on').lower() not in ('0', 'off', 'false')
+
+def _result_fields(session_context):
+    """Fields the client asked for in the results frame; None sends the card schema."""
+    fields = session_context.get('fields')
+    return resolve_fields(fields) if fields else None
+
+def _page_args(session_context):
+    # The highlights, table and narrative read card fields, so those are always fetched
+    return {
+        "page": session_context.get('page', 1),
+        "page_size": 10,
+        "seen_ids": session_context.get('seen_ids', []),
+        "cursor": session_context.get('cursor'),
+        "fields": resolve_fields(CARD_FIELDS + (_result_fields(session_context) or ())),
+    }
+
+def _with_trend(stats_data, plan):
+    """Stats plus the monthly price trend for the same scope, for the stats narrative."""
+    if not stats_data:
+        return stats_data
+    try:
+        trend = get_price_trend({key: plan.get(key) for key in ('city', 'area', 'category')}, 'month')
+    except Exception:
+        trend = None
+    return dict(stats_data, trend=trend) if trend else stats_data
+
+def _stats_scope(filters):
+    return tuple(str(filters.get(key) or '').strip().lower() for key in ('city', 'area'))
+
+def _speculative_plan(user_message, session_context):
+    if not SPECULATIVE_PREFETCH:
+        return None
+    try:
+        return speculative_plan(user_message, session_context)
+    except Exception:
+        return None
+
+def _speculate(user_message, session_context):
+    """Starts the search and stats queries for the locally extracted plan (threaded path)."""
+    plan = _speculative_plan(user_message, session_context)
+    if not plan:
+        return None
+    return {
+        "plan": plan,
+        "search": executor.submit(query_properties, plan, **_page_args(session_context)),
+        "stats": executor.submit(get_property_stats, plan['primary']),
+    }
+
+async def _aspeculate(user_message, session_context):
+    """_speculate for the ASGI path; the queries run as tasks on the same bounded executor."""
+    plan = await run_in_db_pool(_speculative_plan, user_message, session_context)
+    if not plan:
+        return None
+    speculation = {
+        "plan": plan,
+        "search": asyncio.ensure_future(run_in_db_pool(query_properties, plan, **_page_args(session_context))),
+        "stats": asyncio.ensure_future(run_in_db_pool(get_property_stats, plan['primary'])),
+    }
+    for task in (speculation['search'], speculation['stats']):
+        # A discarded task's error is never awaited; retrieve it so asyncio does not warn
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return speculation
+
+def _claim(speculation, kind, plan):
+    """The speculative 'search' future if it ran the same plan as the LLM's, or the 'stats'
+    future if it covers the same city/area; None otherwise."""
+    if speculation is None:
+        return None
+    if kind == 'search':
+        matches = canonical_plan(speculation['plan']) == canonical_plan(plan)
+    else:
+        matches = _stats_scope(speculation['plan']['primary']) == _stats_scope(plan)
+    return speculation[kind] if matches else None
+
+def _discard(speculation, keep=None):
+    """Cancels speculative queries that are not used (a no-op for ones already running)."""
+    if speculation is not None:
+        SPECULATION.inc('reused' if keep is not None else 'discarded')
+        for future in (speculation['search'], speculation['stats']):
+            if future is not keep:
+                future.cancel()
+
+class _BackgroundStream:
+    """
+    Drains a blocking chunk generator on llm_executor as soon as it is created.
+    ready() returns the chunks that have arrived so far without blocking; iterating
+    blocks for the rest. close() stops the pump early (e.g. the client went away).
+
+    Iteration coalesces: each item is a waiting chunk joined with the ones that arrive
+    within SSE_FLUSH_MS after it (up to TEXT_CHUNK_MAX_CHARS), so a fast token stream
+    becomes a few frames rather than one per token. If the generator fails, iteration
+    raises its exception after the chunks that arrived before it.
+    """
+    _END = object()
+
+    def __init__(self, chunks):
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._error = None
+        llm_executor.submit(self._pump, chunks)
+
+    def _pump(self, chunks):
+        try:
+            for chunk in chunks:
+                if self._stopped.is_set():
+                    break
+                self._queue.put(chunk)
+        except Exception as e:
+            logger.exception("Narrative stream failed")
+            self._error = e
+        finally:
+            chunks.close()
+            self._queue.put(self._END)
+
+    def ready(self):
+        arrived = []
+        while True:
+            try:
+                chunk = self._queue.get_nowait()
+            except queue.Empty:
+                return arrived
+            if chunk is self._END:
+                self._queue.put(chunk)
+                return arrived
+            arrived.append(chunk)
+
+    def __iter__(self):
+        window = SSE_FLUSH_MS / 1000
+        while True:
+            chunk = self._queue.get()
+            if chunk is self._END:
+                self._queue.put(chunk)
+                if self._error is not None:
+                    raise self._error
+                return
+            parts, size = [chunk], len(chunk)
+            deadline = time.monotonic() + window
+            while size < TEXT_CHUNK_MAX_CHARS:
+                try:
+                    chunk = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if chunk is self._END:
+                    self._queue.put(chunk)
+                    break
+                parts.append(chunk)
+                size += len(chunk)
+            yield ''.join(parts)
+
+    def close(self):
+        self._stopped.set()
+
+class _AsyncBackgroundStream:
+    """_BackgroundStream for async generators: pumped by its own task on the event loop."""
+    _END = object()
+
+    def __init__(self, chunks):
+        self._queue = asyncio.Queue()
+        self._error = None
+        self._task = asyncio.ensure_future(self._pump(chunks))
+
+    async def _pump(self, chunks):
+        try:
+            async for chunk in chunks:
+                self._queue.put_nowait(chunk)
+        except Exception as e:
+            logger.exception("Narrative stream failed")
+            self._error = e
+        finally:
+            await chunks.aclose()
+            self._queue.put_nowait(self._END)
+
+    def ready(self):
+        arrived = []
+        while not self._queue.empty():
+            chunk = self._queue.get_nowait()
+            if chunk is self._END:
+                self._queue.put_nowait(chunk)
+                break
+            arrived.append(chunk)
+        return arrived
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        window = SSE_FLUSH_MS / 1000
+        while True:
+            chunk = await self._queue.get()
+            if chunk is self._END:
+                self._queue.put_nowait(chunk)
+                if self._error is not None:
+                    raise self._error
+                return
+            parts, size = [chunk], len(chunk)
+            deadline = loop.time() + window
+            while size < TEXT_CHUNK_MAX_CHARS:
+                if self._queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        chunk = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    chunk = self._queue.get_nowait()
+                if chunk is self._END:
+                    self._queue.put_nowait(chunk)
+                    break
+                parts.append(chunk)
+                size += len(chunk)
+            yield ''.join(parts)
+
+    def close(self):
+        self._task.cancel()
+
+def _sse(payload):
+    # Frames go out as bytes, so the response does not re-encode every event
+    return sse_frame(payload)
+
+def _json_response(payload, status=200):
+    """JsonResponse equivalent on the fast encoder (orjson when installed)."""
+    return HttpResponse(dumps(payload), status=status, content_type='application/json')
+
+def _stats_table(stats_data):
+    table_data = []
+    if stats_data:
+        breakdown = stats_data.get('city_breakdown', [])
+        if breakdown:
+            for b in breakdown:
+                table_data.append([b['name'], f"AED {int(b['avg']):,}", f"AED {int(b['min']):,}", f"AED {int(b['max']):,}"])
+        else:
+            table_data.append([stats_data.get('area', 'Selected'), f"AED {int(stats_data['prices']['avg']):,}", f"AED {int(stats_data['prices']['min']):,}", f"AED {int(stats_data['prices']['max']):,}"])
+    return table_data
+
+def _search_result_events(search_plan, db_data, fields=None):
+    """SSE frames sent once the DB results are in: stats block, key highlights, results
+    (narrowed to `fields` when the client asked for a projection)."""
+    results = db_data['results']
+
+    # 3. COMPUTE AND PUSH A STRUCTURED STATS BLOCK (clean, organized)
+    try:
+        primary = search_plan.get('primary', {})
+        area_name = primary.get('area') or primary.get('city') or 'Selection'
+        results_stats = calculate_results_stats(results, area_name=area_name)
+    except Exception:
+        results_stats = None
+
+    if results_stats:
+        yield _sse({
+            "type": "search_stats",
+            "stats": results_stats,
+            "summary": f"{results_stats['counts']['total']} listings — Avg: AED {int(results_stats['prices']['avg']):,}"
+        })
+
+    # 3.b Generate concise key highlights for quick client display
+    try:
+        count = len(results)
+        prices = [r.get('price', 0) for r in results if r.get('price')]
+        avg_price = int(results_stats['prices']['avg']) if results_stats and results_stats.get('prices') else (int(sum(prices)/len(prices)) if prices else 0)
+        lowest = int(min(prices)) if prices else 0
+        highest = int(max(prices)) if prices else 0
+
+        # Best deals: prefer explicit priceInsight mentions, else lowest priced
+        best_deals = [r for r in results if r.get('priceInsight')]
+        if not best_deals:
+            best_deals = sorted(results, key=lambda x: x.get('price', float('inf')))[:3]
+        else:
+            best_deals = sorted(best_deals, key=lambda x: x.get('price', float('inf')))[:3]
+
+        top_areas = {}
+        for r in results:
+            a = r.get('area') or r.get('location') or 'Unknown'
+            top_areas[a] = top_areas.get(a, 0) + 1
+        top_areas_list = sorted([{"area": k, "count": v} for k, v in top_areas.items()], key=lambda x: x['count'], reverse=True)[:3]
+
+        highlights_list = []
+        for bd in best_deals:
+            highlights_list.append({
+                "title": bd.get('title'),
+                "price": f"AED {int(bd.get('price',0)):,}",
+                "beds": bd.get('beds'),
+                "location": bd.get('location')
+            })
+
+        key_highlights = {
+            "type": "key_highlights",
+            "highlights": {
+                "count": count,
+                "avg_price": f"AED {avg_price:,}",
+                "lowest_price": f"AED {lowest:,}",
+                "highest_price": f"AED {highest:,}",
+                "best_deals": highlights_list,
+                "top_areas": top_areas_list
+            }
+        }
+        yield _sse(key_highlights)
+    except Exception:
+        pass
+
+    # 4. PUSH RESULTS
+    yield _sse({"type": "results", "results": project(results, fields) if fields else results, "isFallback": db_data["isFallback"], "nextCursor": db_data["nextCursor"], "hasMore": db_data["hasMore"]})
+
+def _final_event(ai_output, results):
+    table_data = []
+    if ai_output.get('wantsTable') and results:
+        for r in results[:10]:
+            table_data.append([
+                r.get('beds', '-'),
+                f"{int(r['price']):,}",
+                r.get('location', '')[:30],
+                r.get('title', '')[:40] + '...'
+            ])
+    return _sse({"type": "final", "tableData": table_data, "tableTitle": "Property Summary:", "done": True})
+
+def _intent_source(ai_output, local):
+    if local:
+        return 'local'
+    if ai_output.get('type') == 'error':
+        return 'error'
+    return 'plan_cache' if ai_output.get('planCached') else 'llm'
+
+def _timing_event(timer, db_timing=None):
+    """Trailing SSE event with this turn's phase timings (ms); also feeds /api/metrics."""
+    payload = {"type": "timing", "phases": timer.finish()}
+    if db_timing:
+        payload["db"] = db_timing
+    return _sse(payload)
+
+def chat_stream_generator(user_message, session_context, normalized_message):
     """
     High-Speed Agentic Engine: Executes AI Intent planning, DB Search, and Narrative in parallel.
+    Threaded (WSGI) variant; see achat_stream_generator for the ASGI one.
     """
-    import time
-    start_time = time.time()
+    timer = RequestTimer('chat')
+
+    # 0. LOCAL PARSER: common, unambiguous searches are planned in-process without the LLM
+    with timer.phase('local_parse'):
+        ai_output = local_intent(user_message, session_context)
+    local = ai_output is not None
+
+    # SPECULATIVE PREFETCH: otherwise search/stats for locally extracted filters overlap the LLM call
+    speculation = None if local else _speculate(user_message, session_context)
     
-    # 1. AI SEARCH ARCHITECT PHASE
-    ai_output = get_ai_intent(user_message, session_context)
+    # 1. AI SEARCH ARCHITECT PHASE (near-duplicate messages reuse a cached plan)
+    if not local:
+        with timer.phase('intent'):
+            ai_output = get_cached_intent(user_message, session_context, normalized_message, get_ai_intent)
+    INTENT_SOURCE.inc(_intent_source(ai_output, local))
     intent_type = ai_output.get('type')
     thought = ai_output.get('thought', 'Analyzing request...')
-    print(f"🧠 AI ARCHITECT: {thought}")
+    logger.info(f"Intent thought: {thought}")
     
     if intent_type == 'error':
-        yield f'data: {json.dumps({"response": ai_output.get("response"), "type": "error"})}\n\n'
+        _discard(speculation)
+        yield _sse({"response": ai_output.get("response"), "type": "error"})
+        yield _timing_event(timer)
         return
 
     # Yield the initial greeting/response from the AI for non-search intents only
     # (Search intents produce a plan internally; we avoid exposing that planning sentence to clients.)
     if ai_output.get('response') and intent_type in ['info', 'clarification', 'stats']:
-        yield f'data: {json.dumps({"type": "text_chunk", "content": ai_output["response"] + " "})}\n\n'
+        yield text_chunk_frame(ai_output["response"] + " ")
 
     if intent_type in ['info', 'clarification']:
-        yield f'data: {json.dumps({"type": "final", "done": True})}\n\n'
+        _discard(speculation)
+        yield FINAL_FRAME
+        yield _timing_event(timer)
         return
 
     if intent_type == 'stats':
-        from .services.db_service import get_property_stats
-        from .services.ai_service import generate_stats_narrative
-        
         # Stats logic remains similar but uses the new structured plan if available
         plan = ai_output.get('searchPlan', {}).get('primary', {})
-        stats_data = get_property_stats(plan)
-        narrative = generate_stats_narrative(user_message, stats_data, session_context)
+        speculated = _claim(speculation, 'stats', plan)
+        _discard(speculation, keep=speculated)
+        with timer.phase('stats'):
+            stats_data = speculated.result(timeout=7) if speculated else get_property_stats(plan)
+            stats_data = _with_trend(stats_data, plan)
         
-        table_data = []
-        if stats_data:
-            breakdown = stats_data.get('city_breakdown', [])
-            if breakdown:
-                for b in breakdown:
-                    table_data.append([b['name'], f"AED {int(b['avg']):,}", f"AED {int(b['min']):,}", f"AED {int(b['max']):,}"])
-            else:
-                table_data.append([stats_data.get('area', 'Selected'), f"AED {int(stats_data['prices']['avg']):,}", f"AED {int(stats_data['prices']['min']):,}", f"AED {int(stats_data['prices']['max']):,}"])
-        
-        yield f'data: {json.dumps({"type": "stats", "stats": stats_data, "response": narrative, "tableData": table_data, "tableTitle": "Market Comparison Matrix"})}\n\n'
-        yield f'data: {json.dumps({"type": "final", "done": True})}\n\n'
+        # The figures go out first; the analyst narrative follows token by token
+        yield _sse({"type": "stats", "stats": stats_data, "tableData": _stats_table(stats_data), "tableTitle": "Market Comparison Matrix"})
+        narrative = _BackgroundStream(stream_stats_narrative(user_message, stats_data, session_context))
+        try:
+            for chunk in narrative:
+                timer.mark('first_token')
+                yield text_chunk_frame(chunk)
+            timer.mark('last_token')
+            yield FINAL_FRAME
+        except Exception as e:
+            yield _sse({"response": f"System Speed Error: {str(e)}", "type": "error"})
+        finally:
+            narrative.close()
+        yield _timing_event(timer)
         return
 
     # 2. PARALLEL SEARCH & NARRATIVE
     search_plan = ai_output.get('searchPlan', {})
-    page = session_context.get('page', 1)
-    seen_ids = session_context.get('seen_ids', [])
     
-    # Execute the Search Plan
-    db_future = executor.submit(query_properties, search_plan, page=page, page_size=10, seen_ids=seen_ids)
+    # Execute the Search Plan (the cursor is ignored automatically if the plan changed),
+    # unless the speculative search already ran the same plan
+    db_future = _claim(speculation, 'search', search_plan)
+    _discard(speculation, keep=db_future)
+    if db_future is None:
+        db_future = executor.submit(query_properties, search_plan, **_page_args(session_context))
     
     # Tell UI we are searching
-    yield f'data: {json.dumps({"type": "intent", "filters": search_plan.get("primary", {}), "processing": True})}\n\n'
+    yield _sse({"type": "intent", "filters": search_plan.get("primary", {}), "processing": True})
     
+    narrative = None
+    db_timing = None
     try:
-        db_data = db_future.result(timeout=7)
+        with timer.phase('db'):
+            db_data = db_future.result(timeout=7)
         results = db_data['results']
+        db_timing = db_data.get('timing')
 
-        # 3. COMPUTE AND PUSH A STRUCTURED STATS BLOCK (clean, organized)
-        try:
-            primary = search_plan.get('primary', {})
-            area_name = primary.get('area') or primary.get('city') or 'Selection'
-            results_stats = calculate_results_stats(results, area_name=area_name)
-        except Exception:
-            results_stats = None
-
-        if results_stats:
-            stats_chunk = {
-                "type": "search_stats",
-                "stats": results_stats,
-                "summary": f"{results_stats['counts']['total']} listings — Avg: AED {int(results_stats['prices']['avg']):,}"
-            }
-            yield f'data: {json.dumps(stats_chunk)}\n\n'
-
-        # 3.b Generate concise key highlights for quick client display
-        try:
-            count = len(results)
-            prices = [r.get('price', 0) for r in results if r.get('price')]
-            avg_price = int(results_stats['prices']['avg']) if results_stats and results_stats.get('prices') else (int(sum(prices)/len(prices)) if prices else 0)
-            lowest = int(min(prices)) if prices else 0
-            highest = int(max(prices)) if prices else 0
-
-            # Best deals: prefer explicit priceInsight mentions, else lowest priced
-            best_deals = [r for r in results if r.get('priceInsight')]
-            if not best_deals:
-                best_deals = sorted(results, key=lambda x: x.get('price', float('inf')))[:3]
-            else:
-                best_deals = sorted(best_deals, key=lambda x: x.get('price', float('inf')))[:3]
-
-            top_areas = {}
-            for r in results:
-                a = r.get('area') or r.get('location') or 'Unknown'
-                top_areas[a] = top_areas.get(a, 0) + 1
-            top_areas_list = sorted([{"area": k, "count": v} for k, v in top_areas.items()], key=lambda x: x['count'], reverse=True)[:3]
-
-            highlights_list = []
-            for bd in best_deals:
-                highlights_list.append({
-                    "title": bd.get('title'),
-                    "price": f"AED {int(bd.get('price',0)):,}",
-                    "beds": bd.get('beds'),
-                    "location": bd.get('location')
-                })
-
-            key_highlights = {
-                "type": "key_highlights",
-                "highlights": {
-                    "count": count,
-                    "avg_price": f"AED {avg_price:,}",
-                    "lowest_price": f"AED {lowest:,}",
-                    "highest_price": f"AED {highest:,}",
-                    "best_deals": highlights_list,
-                    "top_areas": top_areas_list
-                }
-            }
-            yield f'data: {json.dumps(key_highlights)}\n\n'
-        except Exception:
-            pass
-
-        # 4. PUSH RESULTS
-        yield f'data: {json.dumps({"type": "results", "results": results, "isFallback": db_data["isFallback"]})}\n\n'
-        
-        # 4. STREAM ADVISORY NARRATIVE
-        from .services.ai_service import stream_professional_response
-        narrative_gen = stream_professional_response(
+        # 3. START THE ADVISORY NARRATIVE NOW, so the LLM works while the result events go out
+        narrative = _BackgroundStream(stream_professional_response(
             user_message, 
             results, 
             search_plan.get('primary', {}), 
             db_data['isFallback'], 
             len(results) > 0, 
             session_context
-        )
+        ))
+
+        # Stats block, highlights and results, JSON-encoded (the encoding is part of this phase)
+        with timer.phase('highlights'):
+            frames = list(_search_result_events(search_plan, db_data, _result_fields(session_context)))
+        for frame in frames:
+            yield frame
+            arrived = narrative.ready()
+            if arrived:
+                timer.mark('first_token')
+                yield text_chunk_frame(''.join(arrived))
         
-        for chunk in narrative_gen:
-            yield f'data: {json.dumps({"type": "text_chunk", "content": chunk})}\n\n'
+        # 4. STREAM THE REST OF THE NARRATIVE
+        for chunk in narrative:
+            timer.mark('first_token')
+            yield text_chunk_frame(chunk)
+        timer.mark('last_token')
             
         # 5. FINAL METADATA
-        table_data = []
-        if ai_output.get('wantsTable') and results:
-            for r in results[:10]:
-                table_data.append([
-                    r.get('beds', '-'),
-                    f"{int(r['price']):,}",
-                    r.get('location', '')[:30],
-                    r.get('title', '')[:40] + '...'
-                ])
-
-        yield f'data: {json.dumps({"type": "final", "tableData": table_data, "tableTitle": "Property Summary:", "done": True})}\n\n'
+        yield _final_event(ai_output, results)
         
     except Exception as e:
-        yield f'data: {json.dumps({"response": f"System Speed Error: {str(e)}", "type": "error"})}\n\n'
-        
+        yield _sse({"response": f"System Speed Error: {str(e)}", "type": "error"})
+    finally:
+        if narrative is not None:
+            narrative.close()
+    yield _timing_event(timer, db_timing)
+
+async def achat_stream_generator(user_message, session_context, normalized_message):
+    """
+    ASGI variant of chat_stream_generator: the same events, but the LLM calls use the
+    async client and DB work waits on the bounded executor, so an open stream costs a
+    coroutine rather than a worker thread.
+    """
+    timer = RequestTimer('chat')
+    with timer.phase('local_parse'):
+        ai_output = await run_in_db_pool(local_intent, user_message, session_context)
+    local = ai_output is not None
+    speculation = None
+    if not local:
+        speculation_task = asyncio.ensure_future(_aspeculate(user_message, session_context))
+        with timer.phase('intent'):
+            ai_output = await aget_cached_intent(user_message, session_context, normalized_message, aget_ai_intent, executor)
+        try:
+            speculation = await speculation_task
+        except Exception:
+            speculation = None
+    INTENT_SOURCE.inc(_intent_source(ai_output, local))
+    intent_type = ai_output.get('type')
+    logger.info(f"Intent thought: {ai_output.get('thought', 'Analyzing request...')}")
+
+    if intent_type == 'error':
+        _discard(speculation)
+        yield _sse({"response": ai_output.get("response"), "type": "error"})
+        yield _timing_event(timer)
+        return
+
+    if ai_output.get('response') and intent_type in ['info', 'clarification', 'stats']:
+        yield text_chunk_frame(ai_output["response"] + " ")
+
+    if intent_type in ['info', 'clarification']:
+        _discard(speculation)
+        yield FINAL_FRAME
+        yield _timing_event(timer)
+        return
+
+    if intent_type == 'stats':
+        plan = ai_output.get('searchPlan', {}).get('primary', {})
+        speculated = _claim(speculation, 'stats', plan)
+        _discard(speculation, keep=speculated)
+        with timer.phase('stats'):
+            stats_data = await (speculated or run_in_db_pool(get_property_stats, plan))
+            stats_data = await run_in_db_pool(_with_trend, stats_data, plan)
+
+        yield _sse({"type": "stats", "stats": stats_data, "tableData": _stats_table(stats_data), "tableTitle": "Market Comparison Matrix"})
+        narrative = _AsyncBackgroundStream(astream_stats_narrative(user_message, stats_data, session_context))
+        try:
+            async for chunk in narrative:
+                timer.mark('first_token')
+                yield text_chunk_frame(chunk)
+            timer.mark('last_token')
+            yield FINAL_FRAME
+        except Exception as e:
+            yield _sse({"response": f"System Speed Error: {str(e)}", "type": "error"})
+        finally:
+            narrative.close()
+        yield _timing_event(timer)
+        return
+
+    search_plan = ai_output.get('searchPlan', {})
+    db_task = _claim(speculation, 'search', search_plan)
+    _discard(speculation, keep=db_task)
+    if db_task is None:
+        db_task = asyncio.ensure_future(run_in_db_pool(query_properties, search_plan, **_page_args(session_context)))
+
+    yield _sse({"type": "intent", "filters": search_plan.get("primary", {}), "processing": True})
+
+    narrative = None
+    db_timing = None
+    try:
+        with timer.phase('db'):
+            db_data = await asyncio.wait_for(db_task, timeout=7)
+        results = db_data['results']
+        db_timing = db_data.get('timing')
+
+        narrative = _AsyncBackgroundStream(astream_professional_response(
+            user_message,
+            results,
+            search_plan.get('primary', {}),
+            db_data['isFallback'],
+            len(results) > 0,
+            session_context
+        ))
+
+        with timer.phase('highlights'):
+            frames = list(_search_result_events(search_plan, db_data, _result_fields(session_context)))
+        for frame in frames:
+            yield frame
+            # Let the narrative task run between frames even when sends complete without waiting
+            await asyncio.sleep(0)
+            arrived = narrative.ready()
+            if arrived:
+                timer.mark('first_token')
+                yield text_chunk_frame(''.join(arrived))
+
+        async for chunk in narrative:
+            timer.mark('first_token')
+            yield text_chunk_frame(chunk)
+        timer.mark('last_token')
+
+        yield _final_event(ai_output, results)
+
     except Exception as e:
-        yield f'data: {json.dumps({"response": f"System Speed Error: {str(e)}", "type": "error"})}\n\n'
+        yield _sse({"response": f"System Speed Error: {str(e)}", "type": "error"})
+    finally:
+        if narrative is not None:
+            narrative.close()
+    yield _timing_event(timer, db_timing)
 
-@csrf_exempt
-@require_http_methods(["POST"]) 
-def chat(request):
+async def chat(request):
     """Unified endpoint using the Hyper-Speed Parallel Engine"""
+    # csrf_exempt/require_http_methods only wrap sync views on Django 4.2, so both are done by hand here
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
     data = json.loads(request.body.decode('utf-8')) if request.body else {}
     user_message = data.get('message', '').strip()
     session_context = data.get('context', {})
+    if data.get('fields'):
+        session_context = dict(session_context, fields=data['fields'])
     
     if not user_message:
         return JsonResponse({"response": "How can I help you today?", "type": "info"})
     
     # SEMANTIC CACHE: Normalize message to increase hit rate
-    norm_msg = user_message.lower().replace("?", "").replace("!", "").strip()
-    norm_msg = norm_msg.replace("dubay", "dubai").replace("shrajh", "sharjah").replace("anjnm", "ajman")
-    cache_key = f"chat_{norm_msg}_{json.dumps(session_context.get('filters', {}), sort_keys=True)}"
+    try:
+        norm_msg = await run_in_db_pool(lambda: get_resolver().correct_typos(user_message))
+    except Exception:
+        norm_msg = user_message.lower().replace("?", "").replace("!", "").strip()
     
+    if isinstance(request, ASGIRequest):
+        stream = achat_stream_generator(user_message, session_context, norm_msg)
+    else:
+        # WSGI would buffer an async iterator completely, so keep the threaded generator there
+        stream = chat_stream_generator(user_message, session_context, norm_msg)
+
     # Note: For production streaming, use EventSource or fetch/stream on frontend
-    response = StreamingHttpResponse(chat_stream_generator(user_message, session_context, cache_key), content_type='text/event-stream')
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
     response['Cache-Control'] = 'no-cache'
     return response
             
@@ -351,8 +907,37 @@ def chat(request):
 
     return JsonResponse({"response": "I'm not sure how to help with that. Could you rephrase?", "type": "info"})
 
+chat.csrf_exempt = True
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def clear_cache(request):
     CACHE.clear()
     return JsonResponse({"status": "success", "message": "Cache cleared."})
+
+@require_http_methods(["GET"])
+def property_detail(request, property_id=None):
+    """Full listing record for the detail view; search results only carry the card fields.
+    /api/property/<id> returns {"property": ...}; /api/property?ids=1,2,3 returns a batch."""
+    if property_id is not None:
+        found = get_properties([property_id])
+        if not found:
+            return JsonResponse({"message": f"Property {property_id} not found."}, status=404)
+        return _json_response({"property": found[0]})
+
+    try:
+        ids = [int(i) for i in request.GET.get('ids', '').split(',') if i.strip()]
+    except ValueError:
+        return JsonResponse({"message": "ids must be a comma-separated list of integers."}, status=400)
+    if not ids:
+        return JsonResponse({"message": "Pass a property id or ?ids=1,2,3."}, status=400)
+    if len(ids) > MAX_DETAIL_IDS:
+        return JsonResponse({"message": f"At most {MAX_DETAIL_IDS} ids per request."}, status=400)
+    results = get_properties(ids)
+    found_ids = {r['id'] for r in results}
+    return _json_response({"results": results, "missing": [i for i in ids if i not in found_ids]})
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """Prometheus text exposition: phase latency histograms, cache hit ratios, coalescing."""
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
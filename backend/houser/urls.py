@@ -3,14 +3,18 @@ URL configuration for houser project.
 """
 from django.contrib import admin
 from django.urls import path
-from api.views import hello, intent, search, stats, chat, clear_cache
+from api.views import hello, intent, search, search_batch, stats, chat, clear_cache, metrics, property_detail
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/hello', hello, name='hello'),
     path('api/intent', intent, name='intent'),
     path('api/search', search, name='search'),
+    path('api/search/batch', search_batch, name='search_batch'),
     path('api/stats', stats, name='stats'),
+    path('api/property/<int:property_id>', property_detail, name='property_detail'),
+    path('api/property', property_detail, name='property_batch'),
     path('api/chat', chat, name='chat'),  # New unified endpoint
     path('api/clear-cache', clear_cache, name='clear_cache'),
+    path('api/metrics', metrics, name='metrics'),
 ]
@@ -29,6 +29,22 @@ function ChatApp() {
 
   const [selectedProperty, setSelectedProperty] = useState(null);
 
+  // Search results are compact cards (snippet, no full description); load the full record on open
+  useEffect(() => {
+    if (!selectedProperty || selectedProperty.description || selectedProperty.detailLoaded) return;
+    let cancelled = false;
+    fetch(`http://localhost:8000/api/property/${selectedProperty.id}`)
+      .then(res => res.ok ? res.json() : null)
+      .then(data => {
+        if (cancelled) return;
+        setSelectedProperty(prev => prev && prev.id === selectedProperty.id
+          ? { ...prev, ...(data?.property || {}), detailLoaded: true }
+          : prev);
+      })
+      .catch(() => {});
+    return () => { cancelled = true; };
+  }, [selectedProperty]);
+
   const PropertyModal = ({ property, onClose }) => {
     if (!property) return null;
     return (
@@ -57,7 +73,7 @@ function ChatApp() {
 
             <div className="modal-desc">
               <h3>PROPERTY OVERVIEW</h3>
-              <p>{property.description}</p>
+              <p>{property.description || property.snippet}</p>
             </div>
 
             <div className="modal-footer">
@@ -141,6 +157,8 @@ function ChatApp() {
               else if (data.type === 'results') {
                 botResults = data.results;
                 setMessages(prev => prev.map(m => m.id === tempId ? { ...m, results: botResults } : m));
+                // Opaque keyset cursor: "show me more" continues from here without resending seen ids
+                setSessionContext(prev => ({ ...prev, cursor: data.nextCursor || null }));
               }
               else if (data.type === 'search_stats') {
                 // attach stats to the temp bot message for non-intrusive display
@@ -150,6 +168,10 @@ function ChatApp() {
                 // structured highlights for quick display
                 setMessages(prev => prev.map(m => m.id === tempId ? { ...m, keyHighlights: data.highlights } : m));
               }
+              else if (data.type === 'stats') {
+                // market figures arrive first; the narrative follows as text_chunk events
+                setMessages(prev => prev.map(m => m.id === tempId ? { ...m, messageType: 'stats', stats: data.stats, tableData: data.tableData, tableTitle: data.tableTitle } : m));
+              }
               else if (data.type === 'text_chunk') {
                 botContent += data.content;
                 setMessages(prev => prev.map(m => m.id === tempId ? { ...m, content: botContent } : m));
@@ -167,8 +189,7 @@ function ChatApp() {
                   const resultSummary = botResults.slice(0, 5).map(r => `${r.title} (AED ${r.price.toLocaleString()})`).join(', ');
                   setSessionContext(prev => ({
                     ...prev,
-                    lastResultsSummary: resultSummary,
-                    seen_ids: [...new Set([...(prev.seen_ids || []), ...botResults.map(r => r.id)])]
+                    lastResultsSummary: resultSummary
                   }));
                 }
               }
@@ -265,10 +286,11 @@ function ChatApp() {
       // eslint-disable-next-line no-useless-escape
       if (typeof p.key_features === 'string') return p.key_features.split(/[,;|\/]+/).map(s=>s.trim()).filter(Boolean).slice(0,2);
     }
-    // Fallback: take first two comma-separated phrases from description
-    if (p.description) {
+    // Fallback: take first two comma-separated phrases from description (or the card snippet)
+    const text = p.description || p.snippet;
+    if (text) {
       // eslint-disable-next-line no-useless-escape
-      const parts = p.description.split(/[\.\n]+/)[0].split(/[,;|]+/).map(s=>s.trim()).filter(Boolean);
+      const parts = text.split(/[\.\n]+/)[0].split(/[,;|]+/).map(s=>s.trim()).filter(Boolean);
       return parts.slice(0,2);
     }
     return [];
@@ -1,4 +1,5 @@
 -- SQLite schema for Houser seeds (simplified)
+-- Search columns, triggers and indexes are layered on top by `python manage.py migrate_houser_db`
 
 PRAGMA foreign_keys = ON;
 